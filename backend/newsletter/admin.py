@@ -1,10 +1,89 @@
+import csv
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import (
+    ALL_VAR, ERROR_FLAG, IS_FACETS_VAR, IS_POPUP_VAR, ORDER_VAR, PAGE_VAR, SEARCH_VAR, TO_FIELD_VAR, ChangeList,
+)
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.utils.html import format_html
 from django.db.models import Count
-from django.urls import reverse
+from django.urls import path, reverse
 from django.utils.safestring import mark_safe
 
-from .models import NewsletterSubscription
+from .models import NewsletterSubscription, SubscriptionCounter
+from .pagination import KeysetPaginator
+from .search import search_subscriptions
+
+
+# Rows fetched from the database cursor per round trip when exporting
+EXPORT_CHUNK_SIZE = 2000
+
+# Changelist query parameter carrying a KeysetPaginator cursor
+CURSOR_VAR = 'cursor'
+
+# Changelist query parameters that do not filter the rows
+NON_FILTER_PARAMS = {
+    ALL_VAR, CURSOR_VAR, ERROR_FLAG, IS_FACETS_VAR, IS_POPUP_VAR, ORDER_VAR, PAGE_VAR, SEARCH_VAR, TO_FIELD_VAR,
+}
+
+# is_active filter value -> SubscriptionCounter.get_counts() key
+COUNTER_FILTERS = {
+    (): 'total',
+    (('is_active__exact', '1'),): 'active',
+    (('is_active__exact', '0'),): 'inactive',
+}
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer that hands each row back instead of storing it."""
+    
+    def write(self, value):
+        return value
+
+
+def stream_subscriptions_csv(queryset):
+    """Yield a CSV export of subscriptions one row at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Email', 'Active', 'Subscribed At', 'IP Address'])
+    
+    rows = queryset.values_list(
+        'email', 'is_active', 'subscribed_at', 'ip_address'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for email, is_active, subscribed_at, ip_address in rows:
+        yield writer.writerow([
+            email,
+            'Yes' if is_active else 'No',
+            subscribed_at.strftime('%Y-%m-%d %H:%M:%S'),
+            ip_address or 'N/A',
+        ])
+
+
+class SubscriptionChangeList(ChangeList):
+    """ChangeList whose next/previous links carry KeysetPaginator cursors."""
+    
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+    
+    def get_query_string(self, new_params=None, remove=None):
+        # A cursor only holds for the page it was issued on
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+    
+    def get_results(self, request):
+        super().get_results(request)
+        self.previous_page_url = self.next_page_url = None
+        paginated = self.multi_page and not (self.show_all and self.can_show_all)
+        if paginated and isinstance(self.paginator, KeysetPaginator):
+            # Evaluates the page here; the template reuses the cached rows
+            previous, following = self.paginator.page_cursors(self.page_num, list(self.result_list))
+            if previous:
+                self.previous_page_url = self.get_query_string({PAGE_VAR: self.page_num - 1, CURSOR_VAR: previous})
+            if following:
+                self.next_page_url = self.get_query_string({PAGE_VAR: self.page_num + 1, CURSOR_VAR: following})
 
 
 @admin.register(NewsletterSubscription)
@@ -80,6 +159,46 @@ class NewsletterSubscriptionAdmin(admin.ModelAdmin):
             )
     actions_column.short_description = 'Actions'
     
+    @property
+    def show_full_result_count(self):
+        # The unfiltered total is a second COUNT(*); skip it when estimating
+        return not settings.NEWSLETTER_ADMIN_ESTIMATED_COUNTS
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        """Count from SubscriptionCounter where possible and seek to deep pages by key."""
+        count = self.counter_result_count(request) if settings.NEWSLETTER_ADMIN_ESTIMATED_COUNTS else None
+        if not settings.NEWSLETTER_ADMIN_KEYSET_PAGINATION:
+            paginator = Paginator(queryset, per_page, orphans, allow_empty_first_page)
+            if count is not None:
+                paginator.count = count()
+            return paginator
+        return KeysetPaginator(
+            queryset, per_page, orphans, allow_empty_first_page, count=count, cursor=request.GET.get(CURSOR_VAR)
+        )
+    
+    def get_changelist(self, request, **kwargs):
+        return SubscriptionChangeList
+    
+    def counter_result_count(self, request):
+        """Return a callable reading the result count from SubscriptionCounter, or None if the filters need a COUNT(*)."""
+        if request.GET.get(SEARCH_VAR):
+            return None
+        filters = tuple(sorted(
+            (key, value) for key, value in request.GET.items() if key not in NON_FILTER_PARAMS
+        ))
+        key = COUNTER_FILTERS.get(filters)
+        if key is None:
+            return None
+        return lambda: SubscriptionCounter.get_counts()[key]
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Search the trigram index instead of LIKE scans when it can answer the term."""
+        if search_term and settings.NEWSLETTER_ADMIN_FTS_SEARCH:
+            results = search_subscriptions(queryset, search_term)
+            if results is not None:
+                return results, False
+        return super().get_search_results(request, queryset, search_term)
+    
     def get_queryset(self, request):
         """Optimize database queries."""
         queryset = super().get_queryset(request)
@@ -89,16 +208,8 @@ class NewsletterSubscriptionAdmin(admin.ModelAdmin):
         """Add summary statistics to the changelist view."""
         extra_context = extra_context or {}
         
-        # Calculate statistics
-        total_subscriptions = NewsletterSubscription.objects.count()
-        active_subscriptions = NewsletterSubscription.objects.filter(is_active=True).count()
-        inactive_subscriptions = NewsletterSubscription.objects.filter(is_active=False).count()
-        
-        extra_context['summary_stats'] = {
-            'total': total_subscriptions,
-            'active': active_subscriptions,
-            'inactive': inactive_subscriptions,
-        }
+        # Maintained counters instead of COUNT(*) scans
+        extra_context['summary_stats'] = SubscriptionCounter.get_counts()
         
         return super().changelist_view(request, extra_context=extra_context)
     
@@ -124,25 +235,33 @@ class NewsletterSubscriptionAdmin(admin.ModelAdmin):
     
     def export_as_csv(self, request, queryset):
         """Export subscriptions as CSV."""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
+        return self.csv_response(queryset)
+    export_as_csv.short_description = "Export selected as CSV"
+    
+    def csv_response(self, queryset):
+        """Stream a queryset as a CSV download without loading it into memory."""
+        response = StreamingHttpResponse(stream_subscriptions_csv(queryset), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="newsletter_subscriptions.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Email', 'Active', 'Subscribed At', 'IP Address'])
-        
-        for subscription in queryset:
-            writer.writerow([
-                subscription.email,
-                'Yes' if subscription.is_active else 'No',
-                subscription.subscribed_at.strftime('%Y-%m-%d %H:%M:%S'),
-                subscription.ip_address or 'N/A',
-            ])
-        
         return response
-    export_as_csv.short_description = "Export selected as CSV"
+    
+    def get_urls(self):
+        """Add the full-changelist CSV export URL."""
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_view),
+                name='newsletter_newslettersubscription_export',
+            ),
+        ]
+        return custom_urls + urls
+    
+    def export_view(self, request):
+        """Export every subscription matching the changelist's current filters and search."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        changelist = self.get_changelist_instance(request)
+        return self.csv_response(changelist.get_queryset(request))
 
 
 # Customize the admin site header
@@ -4,4 +4,13 @@ from django.apps import AppConfig
 class NewsletterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'newsletter'
-    verbose_name = 'Newsletter'
\ No newline at end of file
+    verbose_name = 'Newsletter'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .db import apply_sqlite_pragmas
+        from .metrics import install_query_timer
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='newsletter_sqlite_pragmas')
+        connection_created.connect(install_query_timer, dispatch_uid='newsletter_query_timer')
\ No newline at end of file
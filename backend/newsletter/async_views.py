@@ -0,0 +1,174 @@
+"""
+Native async versions of the hot views, for the ASGI deployment.
+
+Under ASGI every sync view is handed to a thread pool; these run on the
+event loop instead, using the async ORM and moving file system access and
+write transactions to threads. newsletter/urls.py routes to them when
+NEWSLETTER_ASYNC_VIEWS is on; the sync views in views.py remain for WSGI.
+"""
+
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import views
+from .bulk import is_valid_email, reactivate_subscription
+from .db import serialized_write
+from .dedup import ais_existing_subscriber, duplicate_filter_enabled
+from .models import NewsletterSubscription, SubscriptionCounter
+from .pages import freeze_page, get_frozen_page, get_rendered_page, resolve_html_path
+from .ratelimit import rate_limit
+from .spool import get_spool, spool_enabled
+from .utils import get_client_ip
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_subscription(email, ip_address, user_agent):
+    """Insert a subscription in a serialized write transaction."""
+    with serialized_write():
+        return NewsletterSubscription.objects.create(
+            email=email,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+
+
+def spool_signup(email, ip_address, user_agent):
+    """Append a signup to the spool (an fsync'd file write)."""
+    get_spool().append(email, ip_address, user_agent)
+
+
+async def serve_html_file(request, filename):
+    """Serve HTML files with Django template processing, without blocking the event loop."""
+    page = get_frozen_page(filename)
+    if page is None:
+        html_file_path, tried_paths = await sync_to_async(resolve_html_path, thread_sensitive=False)(filename)
+        if html_file_path is None:
+            return JsonResponse({
+                'error': 'File not found',
+                'tried_paths': tried_paths
+            }, status=404)
+
+        page = await sync_to_async(get_rendered_page, thread_sensitive=False)(html_file_path)
+        if page is None:
+            # Pages that use the request are rendered per hit by the sync view
+            return await sync_to_async(views.serve_html_file)(request, filename)
+        freeze_page(filename, page)
+
+    return views.rendered_page_response(request, page)
+
+
+async def home_view(request):
+    """Serve the index.html file."""
+    return await serve_html_file(request, 'index.html')
+
+
+@csrf_exempt
+@require_POST
+@rate_limit('subscribe_api')
+async def newsletter_subscribe_api(request):
+    """API endpoint for newsletter subscription (JSON)."""
+
+    try:
+        # Parse JSON data
+        data = json.loads(request.body)
+        email = data.get('email', '').strip().lower()
+
+        if not email:
+            return JsonResponse({
+                'success': False,
+                'message': 'Email address is required.'
+            }, status=400)
+
+        # Validate email format, as strictly as the spool replay does
+        if not is_valid_email(email):
+            return JsonResponse({
+                'success': False,
+                'message': 'Please enter a valid email address.'
+            }, status=400)
+
+        # Known subscribers are answered with a read, without an INSERT attempt;
+        # in spooled mode this is the only duplicate check before acknowledging
+        if (duplicate_filter_enabled() or spool_enabled()) and await ais_existing_subscriber(email):
+            return JsonResponse({
+                'success': False,
+                'message': 'This email is already subscribed to our newsletter.'
+            }, status=400)
+
+        # Get additional data
+        ip_address = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        # In spooled mode the signup is written to the database later
+        if spool_enabled():
+            await sync_to_async(spool_signup, thread_sensitive=False)(email, ip_address, user_agent)
+            logger.info(f"Spooled newsletter subscription via API: {email}")
+
+            return JsonResponse({
+                'success': True,
+                'message': 'Successfully subscribed to our newsletter!',
+                'queued': True
+            })
+
+        # Try to create the subscription
+        try:
+            subscription = await sync_to_async(create_subscription)(email, ip_address, user_agent)
+
+            logger.info(f"New newsletter subscription via API: {email}")
+
+            return JsonResponse({
+                'success': True,
+                'message': 'Successfully subscribed to our newsletter!',
+                'subscription_id': subscription.id
+            })
+
+        except IntegrityError:
+            # An address that unsubscribed is subscribed again
+            subscription_id = await sync_to_async(reactivate_subscription)(email)
+            if subscription_id is not None:
+                logger.info(f"Reactivated newsletter subscription via API: {email}")
+                return JsonResponse({
+                    'success': True,
+                    'message': 'Successfully subscribed to our newsletter!',
+                    'subscription_id': subscription_id
+                })
+            return JsonResponse({
+                'success': False,
+                'message': 'This email is already subscribed to our newsletter.'
+            }, status=400)
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid JSON data.'
+        }, status=400)
+
+    except Exception as e:
+        logger.error(f"Newsletter API subscription error: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'message': 'An error occurred. Please try again later.'
+        }, status=500)
+
+
+async def newsletter_stats(request):
+    """Simple stats view for newsletter subscriptions (admin use)."""
+
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    counts = await SubscriptionCounter.aget_counts()
+
+    return JsonResponse({
+        'total_subscriptions': counts['total'],
+        'active_subscriptions': counts['active'],
+        'inactive_subscriptions': counts['inactive']
+    })
@@ -0,0 +1,166 @@
+"""
+Small timing helpers shared by the benchmark management commands.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .models import NewsletterSubscription
+
+
+FIXTURE_DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'example.com', 'waxandwarmth.in']
+
+
+def percentile(sorted_values, pct):
+    """Return the pct-th percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """Summarize a list of durations (seconds) as milliseconds."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    count = len(ordered)
+    return {
+        'count': count,
+        'mean_ms': (total / count * 1000) if count else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'throughput': (count / total) if total else 0.0,
+    }
+
+
+def time_calls(func, iterations, warmup=0):
+    """Call func repeatedly and return the per-call durations in seconds."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextmanager
+def throwaway_database(path=None):
+    """
+    Point the default SQLite connection at a migrated scratch database.
+
+    A given path is kept (and reused) between runs; otherwise a temporary
+    file is created and removed afterwards.
+    """
+    keep = path is not None
+    if not keep:
+        path = os.path.join(tempfile.mkdtemp(prefix='newsletter-bench-'), 'bench.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+        if not keep:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def build_subscription_fixture(rows, batch_size=10000):
+    """
+    Top the subscriptions table up to rows benchmark subscriptions.
+
+    One per minute going back from now, spread over a few email domains and
+    IP ranges, 10% inactive. Returns the number of rows created.
+    """
+    existing = NewsletterSubscription.objects.count()
+    now = timezone.now()
+    for offset in range(existing, rows, batch_size):
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(
+                email=f'bench-{i}@{FIXTURE_DOMAINS[i % len(FIXTURE_DOMAINS)]}',
+                subscribed_at=now - timedelta(minutes=i),
+                is_active=i % 10 != 0,
+                ip_address=f'10.{i % 251}.{i // 251 % 256}.{i % 7}',
+            )
+            for i in range(offset, min(rows, offset + batch_size))
+        ])
+    return max(0, rows - existing)
+
+
+async def asgi_request(handler, method, request_path, body=b'', headers=(), query_string=b''):
+    """Run one HTTP request through an ASGI application; return the status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': request_path,
+        'raw_path': request_path.encode('ascii'),
+        'query_string': query_string,
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-length', str(len(body)).encode('ascii')), *headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client never disconnects; Django cancels this wait when done
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await handler(scope, receive, send)
+    return status
+
+
+class QueryCounter:
+    """
+    Count the queries run on every connection, from any thread.
+
+    Used as a context manager; installs itself as an execute wrapper on the
+    current thread's connection and on each connection opened meanwhile.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        self._install(None, connection)
+        connection_created.connect(self._install)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._install)
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
@@ -0,0 +1,151 @@
+"""
+Bulk import of newsletter subscriptions in chunked transactions.
+"""
+
+import csv
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+
+from .db import serialized_write
+from .models import LOOKUP_BATCH_SIZE, NewsletterSubscription
+
+
+# Rows normalized, validated and inserted per transaction
+DEFAULT_CHUNK_SIZE = 5000
+
+MAX_EMAIL_LENGTH = NewsletterSubscription._meta.get_field('email').max_length
+
+validate_email = EmailValidator()
+
+
+def normalize_email(value):
+    """Lower-case and strip an email address the way the signup views do."""
+    return str(value or '').strip().lower()
+
+
+def is_valid_email(email):
+    """Return True if email passes the model's email validation."""
+    if not email or len(email) > MAX_EMAIL_LENGTH:
+        return False
+    try:
+        validate_email(email)
+    except ValidationError:
+        return False
+    return True
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_csv_emails(lines):
+    """
+    Yield the email column from CSV lines.
+
+    A header row naming an "email" column selects that column; otherwise
+    the first column of every row is used.
+    """
+    reader = csv.reader(lines)
+    column = 0
+    for index, row in enumerate(reader):
+        if not row:
+            continue
+        if index == 0:
+            header = [cell.strip().lower() for cell in row]
+            if 'email' in header:
+                column = header.index('email')
+                continue
+        if column < len(row):
+            yield row[column]
+        else:
+            yield ''
+
+
+def iter_json_emails(items):
+    """Yield emails from a JSON array of strings or {"email": ...} objects."""
+    for item in items:
+        if isinstance(item, dict):
+            yield item.get('email', '')
+        else:
+            yield item
+
+
+def insert_subscriptions(subscriptions, reactivate=False):
+    """
+    Insert subscriptions for addresses that are not subscribed yet.
+
+    subscriptions maps a normalized email to extra model field values. With
+    reactivate, addresses that unsubscribed are subscribed again; bulk
+    imports leave them alone. Runs in a single transaction and returns
+    (created, duplicate, reactivated) counts.
+    """
+    reactivated = 0
+    with serialized_write():
+        existing = {}
+        for batch in chunked(subscriptions, LOOKUP_BATCH_SIZE):
+            existing.update(
+                NewsletterSubscription.objects.filter(email__in=batch).values_list('email', 'is_active')
+            )
+
+        new_subscriptions = [
+            NewsletterSubscription(email=email, **fields)
+            for email, fields in subscriptions.items() if email not in existing
+        ]
+        # SQLite lets no other writer commit between the lookup and this insert
+        NewsletterSubscription.objects.bulk_create(
+            new_subscriptions, ignore_conflicts=True,
+            known_new={subscription.email for subscription in new_subscriptions},
+        )
+
+        if reactivate:
+            inactive = [email for email, is_active in existing.items() if not is_active]
+            for batch in chunked(inactive, LOOKUP_BATCH_SIZE):
+                reactivated += NewsletterSubscription.objects.filter(email__in=batch, is_active=False).update(is_active=True)
+
+    return len(new_subscriptions), len(existing) - reactivated, reactivated
+
+
+def reactivate_subscription(email):
+    """Subscribe an address that unsubscribed again; returns its subscription id, or None if it is not inactive."""
+    with serialized_write():
+        if NewsletterSubscription.objects.filter(email=email, is_active=False).update(is_active=True):
+            return NewsletterSubscription.objects.filter(email=email).values_list('pk', flat=True).first()
+    return None
+
+
+def import_subscribers(emails, chunk_size=DEFAULT_CHUNK_SIZE, ip_address=None, user_agent=None):
+    """
+    Create subscriptions for an iterable of email addresses.
+
+    The input is consumed lazily, one chunk per transaction. Returns a dict
+    counting created, duplicate (already subscribed or repeated in the
+    input chunk) and invalid rows.
+    """
+    counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+    fields = {'ip_address': ip_address, 'user_agent': user_agent}
+
+    for chunk in chunked(emails, chunk_size):
+        # Normalize and validate, de-duplicating within the chunk
+        unique = {}
+        for value in chunk:
+            email = normalize_email(value)
+            if not is_valid_email(email):
+                counts['invalid'] += 1
+            elif email in unique:
+                counts['duplicate'] += 1
+            else:
+                unique[email] = fields
+
+        created, duplicate, _ = insert_subscriptions(unique)
+        counts['created'] += created
+        counts['duplicate'] += duplicate
+
+    return counts
@@ -0,0 +1,43 @@
+"""
+SQLite connection tuning and write serialization.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+
+# Serializes write transactions between the threads of one process, so they
+# queue here instead of contending for SQLite's database lock
+_write_lock = threading.Lock()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS to new SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def serialized_write(using=None):
+    """
+    Run a block in a transaction, holding the process-wide write lock if enabled.
+
+    Use around every write path; with SQLITE_WRITE_LOCK off it is a plain
+    transaction.atomic().
+    """
+    if getattr(settings, 'SQLITE_WRITE_LOCK', False) and not transaction.get_connection(using).in_atomic_block:
+        with _write_lock:
+            with transaction.atomic(using=using):
+                yield
+    else:
+        with transaction.atomic(using=using):
+            yield
@@ -0,0 +1,193 @@
+"""
+Per-process filter of subscribed emails for the signup hot path.
+
+A repeat signup used to cost an INSERT attempt that failed with
+IntegrityError while holding the database write lock. The signup views now
+check a Bloom filter of known emails first: a miss means the email is
+certainly new, and a hit is confirmed with an indexed read, so duplicates
+never reach the write path. The filter is loaded from the database once per
+process (in the background at startup, see wsgi.py/asgi.py, or on first use)
+and every insert adds its email. Deleted subscriptions, inserts made by other
+processes and rolled-back inserts only cost an extra read or a failed
+INSERT, exactly as before.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+
+logger = logging.getLogger(__name__)
+
+# Emails read from the database per round trip while loading
+LOAD_CHUNK_SIZE = 10000
+
+# Capacity of the first filter; more are added as it fills up
+MIN_CAPACITY = 10000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        # Unlocked: a bit lost to a concurrent add is only a false negative
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class EmailFilter:
+    """
+    Growable set of emails with no false negatives once loaded.
+
+    When the newest Bloom filter reaches its capacity a twice-as-large one
+    with half the error rate is added, keeping the overall false-positive
+    rate under twice the configured one.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(capacity, error_rate)]
+        self.ready = False
+        self._lock = threading.Lock()
+
+    def add(self, email):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            with self._lock:
+                if self.filters[-1] is current:
+                    self.filters.append(BloomFilter(current.capacity * 2, self.error_rate / (2 ** len(self.filters))))
+                current = self.filters[-1]
+        current.add(email)
+
+    def might_contain(self, email):
+        """Return False only if email is certainly not subscribed."""
+        if not self.ready:
+            return True
+        return any(email in bloom for bloom in self.filters)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def memory_bytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def duplicate_filter_enabled():
+    """Return True if signups should consult the email filter."""
+    return getattr(settings, 'NEWSLETTER_DUPLICATE_FILTER_ENABLED', False)
+
+
+def get_email_filter():
+    """Return the process-wide email filter, loading it from the database on first use."""
+    global _filter
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                from .models import NewsletterSubscription, SubscriptionCounter
+
+                capacity = max(MIN_CAPACITY, SubscriptionCounter.get_counts()['total'] * 2)
+                email_filter = EmailFilter(capacity, settings.NEWSLETTER_DUPLICATE_FILTER_ERROR_RATE)
+                # Published before loading, so inserts made meanwhile are recorded
+                _filter = email_filter
+                try:
+                    emails = NewsletterSubscription.objects.order_by().values_list('email', flat=True)
+                    for email in emails.iterator(chunk_size=LOAD_CHUNK_SIZE):
+                        email_filter.add(email)
+                except BaseException:
+                    # Never ready, it would pass every email to the database; load again next time
+                    _filter = None
+                    raise
+                email_filter.ready = True
+                logger.info(
+                    f"Loaded {len(email_filter)} subscriber emails into the duplicate filter "
+                    f"({email_filter.memory_bytes / 1024:.0f} KiB)"
+                )
+    return _filter
+
+
+def warm_email_filter():
+    """Load the email filter in a background thread, e.g. at server startup."""
+    if not duplicate_filter_enabled():
+        return
+
+    def load():
+        try:
+            get_email_filter()
+        except DatabaseError as e:
+            logger.warning(f"Could not load the newsletter duplicate filter: {str(e)}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=load, name='newsletter-duplicate-filter', daemon=True).start()
+
+
+def remember_emails(emails):
+    """Add newly inserted emails to the filter, if this process has one."""
+    email_filter = _filter
+    if email_filter is not None:
+        for email in emails:
+            email_filter.add(email)
+
+
+def reset_email_filter():
+    """Forget the filter; the next lookup reloads it from the database."""
+    global _filter
+    with _filter_lock:
+        _filter = None
+
+
+def is_existing_subscriber(email):
+    """
+    Return True if email is an active subscriber, without touching the write path.
+
+    With the filter enabled its misses are answered from memory; anything
+    else is an indexed read. An address that unsubscribed is not a
+    subscriber, so signing up again resubscribes it.
+    """
+    from .models import NewsletterSubscription
+
+    if duplicate_filter_enabled() and not get_email_filter().might_contain(email):
+        return False
+    return NewsletterSubscription.objects.filter(email=email, is_active=True).exists()
+
+
+async def ais_existing_subscriber(email):
+    """Async version of is_existing_subscriber(); loading the filter runs in a thread."""
+    from .models import NewsletterSubscription
+
+    if duplicate_filter_enabled():
+        email_filter = _filter
+        if email_filter is None:
+            email_filter = await sync_to_async(get_email_filter)()
+        if not email_filter.might_contain(email):
+            return False
+    return await NewsletterSubscription.objects.filter(email=email, is_active=True).aexists()
@@ -0,0 +1 @@
+# Management commands for the newsletter app
\ No newline at end of file
@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from newsletter.benchmarking import build_subscription_fixture, summarize, throwaway_database, time_calls
+
+
+CHANGELIST_URL = '/admin/newsletter/newslettersubscription/'
+
+# (label, NEWSLETTER_ADMIN_ESTIMATED_COUNTS, NEWSLETTER_ADMIN_KEYSET_PAGINATION)
+MODES = [
+    ('offset+count', False, False),
+    ('keyset+counters', True, True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Time the subscriptions admin changelist at shallow and deep pages over a large throwaway fixture.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Subscriptions in the fixture (default: 1000000)')
+        parser.add_argument('--pages', default='1,10000',
+                            help='Comma-separated changelist pages to load (default: 1,10000)')
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Timed loads per page and mode (default: 5)')
+        parser.add_argument('--database', default=None,
+                            help='SQLite file for the fixture, kept between runs (default: a temporary file)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+        try:
+            pages = [int(page) for page in options['pages'].split(',') if page.strip()]
+        except ValueError:
+            raise CommandError('--pages must be a comma-separated list of integers.')
+
+        with throwaway_database(options['database']):
+            start = time.perf_counter()
+            created = build_subscription_fixture(options['rows'])
+            if created:
+                self.stdout.write(f'Built {created} fixture row(s) in {time.perf_counter() - start:.1f}s')
+
+            user_model = get_user_model()
+            admin = user_model.objects.filter(username='bench-admin').first() \
+                or user_model.objects.create_superuser('bench-admin', 'bench-admin@example.com', 'bench')
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(admin)
+
+            for query in ('', 'is_active__exact=1'):
+                for page in pages:
+                    for label, estimated, keyset in MODES:
+                        with override_settings(NEWSLETTER_ADMIN_ESTIMATED_COUNTS=estimated,
+                                               NEWSLETTER_ADMIN_KEYSET_PAGINATION=keyset):
+                            self.time_page(client, label, page, query, options['iterations'])
+
+    def time_page(self, client, label, page, query, iterations):
+        url = f'{CHANGELIST_URL}?{query}&p={page}' if query else f'{CHANGELIST_URL}?p={page}'
+
+        def load():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+
+        summary = summarize(time_calls(load, iterations, warmup=1))
+        self.stdout.write(
+            f"{label:<16} page {page:<6} {query or 'unfiltered':<18} "
+            f"p50 {summary['p50_ms']:8.1f} ms, p95 {summary['p95_ms']:8.1f} ms"
+        )
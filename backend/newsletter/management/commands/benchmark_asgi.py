@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import path
+
+from newsletter import async_views, views
+from newsletter.benchmarking import asgi_request, build_subscription_fixture, summarize, throwaway_database
+from newsletter.dedup import reset_email_filter
+
+
+# This module doubles as the URLconf, with each view under /sync/ and /async/
+MODES = {'sync': views, 'async': async_views}
+
+urlpatterns = [
+    pattern
+    for mode, module in MODES.items()
+    for pattern in (
+        path(f'{mode}/page/', module.serve_html_file, {'filename': 'about.html'}),
+        path(f'{mode}/subscribe/', module.newsletter_subscribe_api),
+        path(f'{mode}/stats/', module.newsletter_stats),
+    )
+]
+
+
+class Command(BaseCommand):
+    help = 'Load-test the pages, subscribe API and stats in process through the ASGI handler, sync vs native async views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests per endpoint and mode (default: 2000)')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Requests in flight at once (default: 50)')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Existing subscriptions in the fixture (default: 10000)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+
+        with throwaway_database():
+            build_subscription_fixture(options['rows'])
+            staff = get_user_model().objects.create_user('bench-staff', password='unused', is_staff=True)
+            client = Client()
+            client.force_login(staff)
+            session_cookie = f"sessionid={client.cookies['sessionid'].value}".encode('ascii')
+            connection.close()
+
+            with override_settings(ROOT_URLCONF=__name__, NEWSLETTER_RATE_LIMIT_ENABLED=False,
+                                   NEWSLETTER_SPOOL_ENABLED=False, HTML_TEMPLATE_CACHE_FROZEN=True):
+                reset_email_filter()
+                for endpoint in ('page', 'subscribe', 'stats'):
+                    for mode in MODES:
+                        self.run_endpoint(mode, endpoint, options['requests'], options['concurrency'], session_cookie)
+            reset_email_filter()
+
+    def run_endpoint(self, mode, endpoint, count, concurrency, session_cookie):
+        requests = []
+        for i in range(count):
+            if endpoint == 'subscribe':
+                body = f'{{"email": "asgi-{mode}-{i}@example.com"}}'.encode('ascii')
+                requests.append(('POST', f'/{mode}/subscribe/', body, [(b'content-type', b'application/json')]))
+            elif endpoint == 'stats':
+                requests.append(('GET', f'/{mode}/stats/', b'', [(b'cookie', session_cookie)]))
+            else:
+                requests.append(('GET', f'/{mode}/page/', b'', []))
+
+        elapsed, samples, failures = asyncio.run(self.load(requests, concurrency))
+        summary = summarize(samples)
+        self.stdout.write(
+            f"{endpoint:<9} {mode:<5} {len(samples) / elapsed:7.0f} req/s, "
+            f"p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, {failures} failed"
+        )
+
+    async def load(self, requests, concurrency):
+        """Send requests through a fresh ASGIHandler, concurrency at a time."""
+        handler = ASGIHandler()
+        pending = iter(requests)
+        samples, failures = [], 0
+
+        async def worker():
+            nonlocal failures
+            for method, request_path, body, headers in pending:
+                start = time.perf_counter()
+                status = await asgi_request(handler, method, request_path, body, headers)
+                samples.append(time.perf_counter() - start)
+                if status != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, samples, failures
+
@@ -0,0 +1,97 @@
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+
+from newsletter.benchmarking import FIXTURE_DOMAINS, build_subscription_fixture, summarize, throwaway_database
+from newsletter.dedup import get_email_filter, reset_email_filter
+
+
+class Command(BaseCommand):
+    help = 'Measure duplicate-filter memory and signup latency for repeat signups with and without the filter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Existing subscriptions in the fixture (default: 100000)')
+        parser.add_argument('--signups', type=int, default=2000,
+                            help='Repeat signups per mode (default: 2000)')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Concurrent client threads (default: 4)')
+        parser.add_argument('--database', default=None,
+                            help='SQLite file for the fixture, kept between runs (default: a temporary file)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+        rows = options['rows']
+
+        with throwaway_database(options['database']):
+            build_subscription_fixture(rows)
+            self.report_memory(rows)
+
+            emails = [
+                f'bench-{i}@{FIXTURE_DOMAINS[i % len(FIXTURE_DOMAINS)]}'
+                for i in range(0, rows, max(1, rows // options['signups']))
+            ][:options['signups']]
+            for mode in ('insert', 'filter'):
+                with override_settings(NEWSLETTER_DUPLICATE_FILTER_ENABLED=(mode == 'filter'),
+                                       NEWSLETTER_RATE_LIMIT_ENABLED=False):
+                    self.run_mode(mode, emails, options['threads'])
+        reset_email_filter()
+
+    def report_memory(self, rows):
+        reset_email_filter()
+        start = time.perf_counter()
+        email_filter = get_email_filter()
+        elapsed = time.perf_counter() - start
+
+        # A plain set of the same emails, for comparison
+        emails = [
+            f'bench-{i}@{FIXTURE_DOMAINS[i % len(FIXTURE_DOMAINS)]}' for i in range(rows)
+        ]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        email_set = set(emails)
+        set_bytes = tracemalloc.get_traced_memory()[0] - before + sum(sys.getsizeof(email) for email in emails)
+        tracemalloc.stop()
+        del email_set
+
+        # The filter is sized for twice the current subscriber count
+        per_million = email_filter.memory_bytes / max(1, len(email_filter)) * 1000000
+        self.stdout.write(
+            f"Bloom filter: {len(email_filter)} emails in {email_filter.memory_bytes / 1024:.0f} KiB "
+            f"(~{per_million / 1024 / 1024:.2f} MiB per million, loaded in {elapsed:.2f}s); "
+            f"a Python set of the same emails takes {set_bytes / 1024:.0f} KiB"
+        )
+
+    def run_mode(self, mode, emails, threads):
+        chunks = [emails[i::threads] for i in range(threads)]
+
+        def worker(chunk):
+            client = Client(HTTP_HOST='localhost')
+            samples, unexpected = [], 0
+            for email in chunk:
+                start = time.perf_counter()
+                response = client.post('/api/newsletter/subscribe/', {'email': email}, content_type='application/json')
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 400:
+                    unexpected += 1
+            close_old_connections()
+            return samples, unexpected
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, chunks))
+        elapsed = time.perf_counter() - start
+
+        samples = [sample for chunk_samples, _ in results for sample in chunk_samples]
+        unexpected = sum(chunk_unexpected for _, chunk_unexpected in results)
+        summary = summarize(samples)
+        self.stdout.write(
+            f"{mode:<7} {len(samples)} repeat signups in {elapsed:.2f}s: {len(samples) / elapsed:.0f}/s, "
+            f"p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, {unexpected} not rejected"
+        )
@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from newsletter.benchmarking import summarize, time_calls
+from newsletter.pages import clear_template_cache
+
+
+# URL names of the HTML page routes in newsletter/urls.py
+PAGE_URL_NAMES = [
+    'home', 'about', 'shop', 'blog', 'contact',
+    'cart', 'sproduct', 'debug', 'mobile_access',
+]
+
+# (label, settings overrides) for each serving mode being compared
+MODES = [
+    ('uncached', {'HTML_TEMPLATE_CACHE_ENABLED': False, 'HTML_PAGE_CACHE_ENABLED': False}),
+    ('templates', {'HTML_TEMPLATE_CACHE_ENABLED': True, 'HTML_PAGE_CACHE_ENABLED': False}),
+    ('pages', {'HTML_TEMPLATE_CACHE_ENABLED': True, 'HTML_PAGE_CACHE_ENABLED': True}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request latency of the HTML page routes under each caching mode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Requests per route and mode (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of client threads issuing requests (default: 1)')
+        parser.add_argument('--frozen', action='store_true',
+                            help='Skip file change checks in the cached modes')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        concurrency = max(1, options['concurrency'])
+
+        self.stdout.write(f'{iterations} requests per route, {concurrency} thread(s), mean latency (ms) / throughput (req/s)')
+        self.stdout.write(f"{'route':<16}" + ''.join(f'{label:>22}' for label, _ in MODES) + f"{'speedup':>10}")
+
+        for name in PAGE_URL_NAMES:
+            url = reverse(f'newsletter:{name}')
+            results = []
+            for label, overrides in MODES:
+                clear_template_cache()
+                with override_settings(HTML_TEMPLATE_CACHE_FROZEN=options['frozen'], **overrides):
+                    results.append(self.run_mode(url, iterations, concurrency))
+
+            speedup = results[-1]['throughput'] / results[0]['throughput'] if results[0]['throughput'] else 0.0
+            self.stdout.write(
+                f'{name:<16}'
+                + ''.join(f"{r['mean_ms']:>11.3f} /{r['throughput']:>8.0f}" for r in results)
+                + f'{speedup:>9.1f}x'
+            )
+
+    def run_mode(self, url, iterations, concurrency):
+        """Issue iterations GETs to url across threads; return latency and wall-clock throughput."""
+        per_thread = max(1, iterations // concurrency)
+
+        def worker():
+            client = Client(HTTP_HOST='localhost')
+            return time_calls(lambda: client.get(url), per_thread, warmup=2)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(concurrency)]
+            samples = [sample for future in futures for sample in future.result()]
+        elapsed = time.perf_counter() - start
+
+        summary = summarize(samples)
+        summary['throughput'] = len(samples) / elapsed if elapsed else 0.0
+        return summary
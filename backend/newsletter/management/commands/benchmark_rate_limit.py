@@ -0,0 +1,68 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from newsletter.ratelimit import rate_limit, reset_rate_limits
+
+
+# Generous enough that every benchmarked request is allowed
+RULES = {
+    'ip': [{'key': 'ip', 'rate': '1000000/s', 'burst': 1000000}],
+    'ip+email': [
+        {'key': 'ip', 'rate': '1000000/s', 'burst': 1000000},
+        {'key': 'email', 'rate': '1000000/s', 'burst': 1000000},
+    ],
+}
+
+
+def plain_view(request):
+    return HttpResponse()
+
+
+limited_view = rate_limit('bench')(plain_view)
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the per-request overhead of the signup rate limiter on allowed requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000,
+                            help='Calls per measurement (default: 100000)')
+        parser.add_argument('--clients', type=int, default=1000,
+                            help='Distinct client IPs cycled through (default: 1000)')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        requests = []
+        for i in range(options['clients']):
+            request = factory.post(
+                '/api/newsletter/subscribe/', data=json.dumps({'email': f'user{i}@example.com'}),
+                content_type='application/json', REMOTE_ADDR=f'10.0.{i // 256 % 256}.{i % 256}',
+            )
+            request.body  # Read once, as the view would
+            requests.append(request)
+
+        baseline = self.time_view(plain_view, requests, options['iterations'])
+        self.stdout.write(f'{"no limiter":<20} {baseline:6.2f} us/request')
+        for store in ('memory', 'cache'):
+            for label, rules in RULES.items():
+                with override_settings(NEWSLETTER_RATE_LIMIT_ENABLED=True, NEWSLETTER_RATE_LIMIT_STORE=store,
+                                       NEWSLETTER_RATE_LIMITS={'bench': rules}):
+                    reset_rate_limits()
+                    elapsed = self.time_view(limited_view, requests, options['iterations'])
+                self.stdout.write(
+                    f'{store + " " + label:<20} {elapsed:6.2f} us/request (+{elapsed - baseline:.2f} us)'
+                )
+
+    def time_view(self, view, requests, iterations):
+        """Return the mean microseconds per call of view over the prepared requests."""
+        count = len(requests)
+        start = time.perf_counter()
+        for i in range(iterations):
+            response = view(requests[i % count])
+            if response.status_code != 200:
+                raise RuntimeError(f'Request was throttled: {response.status_code}')
+        return (time.perf_counter() - start) / iterations * 1000000
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import os
+import secrets
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve, reverse
+
+from newsletter import urls as newsletter_urls
+from shop import urls as shop_urls
+from shop.catalog import invalidate_catalog
+from shop.models import Product
+from newsletter.benchmarking import (
+    FIXTURE_DOMAINS, QueryCounter, asgi_request, build_subscription_fixture, summarize, throwaway_database,
+)
+from newsletter.dedup import get_email_filter, reset_email_filter
+from newsletter.pages import SITE_DIR, clear_template_cache
+from newsletter.ratelimit import reset_rate_limits
+
+
+# Static routes from wax_and_warmth/urls.py; all but /static/ exist only with DEBUG
+STATIC_ROUTES = [
+    ('static', '/static/style.css'),
+    ('asset', '/style.css'),
+    ('images', '/images/{}'),
+    ('products', '/products/{}'),
+    ('testi', '/testi/{}'),
+    ('vids', '/vids/{}'),
+    ('derived', '/derived/{}'),
+]
+
+# Latency regressions smaller than this are treated as noise
+MIN_REGRESSION_MS = 0.2
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every newsletter and static route in process against a seeded database, '
+        'optionally comparing with a saved baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                            help='Fixture sizes to benchmark at, in subscriptions (default: 10000)')
+        parser.add_argument('--iterations', type=int, default=100,
+                            help='Timed requests per route (default: 100)')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per route first (default: 5)')
+        parser.add_argument('--asgi', action='store_true',
+                            help="Send requests through the ASGI application instead of Django's test client")
+        parser.add_argument('--route', action='append', dest='routes', metavar='NAME',
+                            help='Only benchmark this route (repeatable)')
+        parser.add_argument('--output', help='Write the results to this JSON file (e.g. to save a baseline)')
+        parser.add_argument('--baseline', help='Compare against a JSON file written by --output')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p50 slowdown against the baseline, as a fraction (default: 0.25)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        results = {
+            'runner': 'asgi' if options['asgi'] else 'client',
+            'iterations': options['iterations'],
+            'sizes': {},
+        }
+        # Serve uncollected assets from the site directory if collectstatic has not run
+        static_root = settings.STATIC_ROOT
+        if not os.path.isfile(os.path.join(static_root, 'style.css')):
+            static_root = SITE_DIR
+
+        with throwaway_database():
+            # Shop routes are reversed with a seeded product
+            routes = self.get_routes()
+            if options['routes']:
+                unknown = set(options['routes']) - {route['name'] for route in routes}
+                if unknown:
+                    raise CommandError(f"Unknown route(s): {', '.join(sorted(unknown))}")
+                routes = [route for route in routes if route['name'] in options['routes']]
+
+            staff = get_user_model().objects.create_user('bench-staff', password='unused', is_staff=True)
+            with override_settings(NEWSLETTER_RATE_LIMIT_ENABLED=False, NEWSLETTER_SPOOL_ENABLED=False,
+                                   STATIC_ROOT=static_root):
+                for rows in sorted(options['rows']):
+                    build_subscription_fixture(rows)
+                    # Loaded up front, so the first signup does not pay for it
+                    reset_email_filter()
+                    get_email_filter()
+                    results['sizes'][str(rows)] = self.run_size(rows, routes, staff, options)
+        reset_email_filter()
+        reset_rate_limits()
+        clear_template_cache()
+        invalidate_catalog()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {options['output']}")
+        if baseline is not None:
+            self.compare(results, baseline, options['tolerance'])
+
+    def get_routes(self):
+        """
+        Return a request spec for every newsletter and shop URL pattern and routed static file.
+
+        Fails if newsletter/urls.py or shop/urls.py gains a pattern this benchmark does not know.
+        """
+        site = {}
+        for name in ('images', 'products', 'testi', 'vids', 'derived'):
+            directory = os.path.join(SITE_DIR, name)
+            if os.path.isdir(directory):
+                site[name] = [entry.path for entry in os.scandir(directory)
+                              if entry.is_file() and entry.stat().st_size]
+
+        # Every other newsletter route is a page: a plain GET
+        specs = {
+            'subscribe': {'method': 'POST', 'form': True, 'expect': 302},
+            'subscribe_alt': {'method': 'POST', 'form': True, 'expect': 302},
+            'subscribe_api': {'method': 'POST', 'expect': 200},
+            'bulk_import': {'method': 'POST', 'staff': True, 'expect': 200},
+            'unsubscribe': {'method': 'POST', 'form': True, 'expect': 302},
+            'stats': {'method': 'GET', 'staff': True, 'expect': 200},
+            'metrics': {'method': 'GET', 'staff': True, 'expect': 200},
+            'analytics': {'method': 'GET', 'staff': True, 'expect': 200, 'query': {'interval': 'day'}},
+        }
+        routes = []
+        for pattern in newsletter_urls.urlpatterns:
+            if pattern.name in specs:
+                spec = specs[pattern.name]
+            elif pattern.name == 'home' or 'filename' in pattern.default_args:
+                spec = {'method': 'GET', 'expect': 200}
+            else:
+                raise CommandError(f"No benchmark request defined for route {pattern.name!r}")
+            routes.append({'name': pattern.name, 'path': reverse(f'newsletter:{pattern.name}'), **spec})
+
+        product = Product.objects.filter(is_active=True).first()
+        shop_specs = {
+            'products': {},
+            'product': {'args': [product.pk]} if product else None,
+            'product_by_slug': {'args': [product.slug]} if product else None,
+            'search': {'query': {'q': 'candle'}},
+            'autocomplete': {'query': {'q': 'ca'}},
+            'product_page': {'args': [product.slug]} if product else None,
+            'cart': {},
+            # An empty cart; placing orders is measured by stress_stock_reservations
+            'orders': {'method': 'POST', 'expect': 400},
+            'order': {'args': ['0' * 32], 'expect': 404},
+        }
+        for pattern in shop_urls.urlpatterns:
+            if pattern.name not in shop_specs:
+                raise CommandError(f"No benchmark request defined for route {pattern.name!r}")
+            spec = shop_specs[pattern.name]
+            if spec is None:
+                self.stdout.write(f'Skipping {pattern.name}: no products')
+                continue
+            routes.append({
+                'name': f'shop:{pattern.name}', 'path': reverse(f'shop:{pattern.name}', args=spec.pop('args', [])),
+                'method': 'GET', 'expect': 200, **spec,
+            })
+
+        for name, template in STATIC_ROUTES:
+            if '{}' in template:
+                if not site.get(name):
+                    self.stdout.write(f'Skipping {name}: no files in {name}/')
+                    continue
+                # The smallest file, so the route rather than the disk is measured
+                template = template.format(os.path.basename(min(site[name], key=os.path.getsize)))
+            try:
+                resolve(template)
+            except Resolver404:
+                self.stdout.write(f'Skipping {name}: {template} is only routed with DEBUG on')
+                continue
+            routes.append({'name': name, 'path': template, 'method': 'GET', 'expect': 200})
+        return routes
+
+    def build_requests(self, route, count):
+        """Return count distinct (body, content type) pairs for a route."""
+        tag = secrets.token_hex(4)
+        name = route['name']
+        if name == 'unsubscribe':
+            return [(urlencode({'email': f'bench-{i}@{FIXTURE_DOMAINS[i % len(FIXTURE_DOMAINS)]}'}), 'application/x-www-form-urlencoded')
+                    for i in range(count)]
+        if name == 'bulk_import':
+            return [(json.dumps({'emails': [f'bulk-{tag}-{i}-{j}@example.com' for j in range(10)]}), 'application/json')
+                    for i in range(count)]
+        if route.get('form'):
+            return [(urlencode({'email': f'route-{tag}-{i}@example.com'}), 'application/x-www-form-urlencoded')
+                    for i in range(count)]
+        if name == 'subscribe_api':
+            return [(json.dumps({'email': f'route-{tag}-{i}@example.com'}), 'application/json') for i in range(count)]
+        return [('', None)] * count
+
+    def run_size(self, rows, routes, staff, options):
+        iterations, warmup = options['iterations'], options['warmup']
+        runner = self.asgi_runner(staff) if options['asgi'] else self.client_runner(staff)
+
+        self.stdout.write(f"\n{rows} subscriptions, {iterations} requests per route ({'ASGI' if options['asgi'] else 'test client'})")
+        self.stdout.write(f"{'route':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'errors':>8}")
+        size_results = {}
+        for route in routes:
+            requests = self.build_requests(route, warmup + iterations)
+            query = urlencode(route.get('query', {}))
+            for body, content_type in requests[:warmup]:
+                runner(route, query, body, content_type)
+
+            samples, errors = [], 0
+            with QueryCounter() as counter:
+                start = time.perf_counter()
+                for body, content_type in requests[warmup:]:
+                    request_start = time.perf_counter()
+                    status = runner(route, query, body, content_type)
+                    samples.append(time.perf_counter() - request_start)
+                    if status != route['expect']:
+                        errors += 1
+                elapsed = time.perf_counter() - start
+
+            summary = summarize(samples)
+            result = {
+                'p50_ms': round(summary['p50_ms'], 3),
+                'p95_ms': round(summary['p95_ms'], 3),
+                'p99_ms': round(summary['p99_ms'], 3),
+                'throughput': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+                'queries': round(counter.count / len(samples), 2) if samples else 0.0,
+                'errors': errors,
+            }
+            size_results[route['name']] = result
+            self.stdout.write(
+                f"{route['name']:<22}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['throughput']:>9.0f}{result['queries']:>9.1f}{errors:>8}"
+            )
+        if hasattr(runner, 'close'):
+            runner.close()
+        return size_results
+
+    def client_runner(self, staff):
+        """Return a function sending one request through Django's test client."""
+        anonymous = Client(HTTP_HOST='localhost')
+        logged_in = Client(HTTP_HOST='localhost')
+        logged_in.force_login(staff)
+
+        def run(route, query, body, content_type):
+            client = logged_in if route.get('staff') else anonymous
+            path = f"{route['path']}?{query}" if query else route['path']
+            if route['method'] == 'GET':
+                response = client.get(path)
+            else:
+                response = client.generic(route['method'], path, body, content_type=content_type)
+            # Drain streamed file responses, as a server would
+            if response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+            return response.status_code
+        return run
+
+    def asgi_runner(self, staff):
+        """Return a function sending one request through the ASGI application."""
+        client = Client()
+        client.force_login(staff)
+        csrf_secret = secrets.token_hex(16)
+        anonymous_cookie = f'csrftoken={csrf_secret}'.encode('ascii')
+        staff_cookie = f"csrftoken={csrf_secret}; sessionid={client.cookies['sessionid'].value}".encode('ascii')
+        handler = ASGIHandler()
+        loop = asyncio.new_event_loop()
+
+        def run(route, query, body, content_type):
+            headers = [
+                (b'cookie', staff_cookie if route.get('staff') else anonymous_cookie),
+                (b'x-csrftoken', csrf_secret.encode('ascii')),
+            ]
+            if content_type:
+                headers.append((b'content-type', content_type.encode('ascii')))
+            return loop.run_until_complete(asgi_request(
+                handler, route['method'], route['path'], body.encode('utf-8'), headers, query.encode('ascii'),
+            ))
+        run.close = loop.close
+        return run
+
+    def compare(self, results, baseline, tolerance):
+        """Report routes slower (p50) or chattier (queries) than the baseline; fail if any."""
+        if baseline.get('runner') != results['runner']:
+            self.stdout.write(f"Warning: the baseline was measured with the {baseline.get('runner')} runner")
+        regressions = []
+        for rows, routes in results['sizes'].items():
+            base_routes = baseline.get('sizes', {}).get(rows)
+            if base_routes is None:
+                self.stdout.write(f'No baseline for {rows} subscriptions')
+                continue
+            for name, result in routes.items():
+                base = base_routes.get(name)
+                if base is None:
+                    continue
+                slower = result['p50_ms'] - base['p50_ms']
+                if slower > MIN_REGRESSION_MS and result['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+                    regressions.append(f"{rows}/{name}: p50 {base['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms")
+                if result['queries'] > base['queries']:
+                    regressions.append(f"{rows}/{name}: queries {base['queries']} -> {result['queries']}")
+                if result['errors'] > base.get('errors', 0):
+                    regressions.append(f"{rows}/{name}: errors {base.get('errors', 0)} -> {result['errors']}")
+
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} regression(s) against the baseline')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
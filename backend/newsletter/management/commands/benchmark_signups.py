@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client, override_settings
+
+from newsletter.benchmarking import summarize
+from newsletter.models import NewsletterSubscription
+from newsletter.spool import SignupSpool
+import newsletter.spool
+
+
+class Command(BaseCommand):
+    help = 'Compare signup API throughput writing directly to the database vs through the spool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=2000,
+                            help='Signups per mode (default: 2000)')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Concurrent client threads (default: 8)')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark subscriptions instead of deleting them')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        spool_dir = tempfile.mkdtemp(prefix='signup-spool-')
+        try:
+            for mode in ('direct', 'spool'):
+                with override_settings(NEWSLETTER_SPOOL_ENABLED=(mode == 'spool'), NEWSLETTER_SPOOL_DIR=spool_dir,
+                                       NEWSLETTER_RATE_LIMIT_ENABLED=False):
+                    # A private spool without a background flusher, flushed explicitly below
+                    newsletter.spool._spool = SignupSpool(spool_dir)
+                    self.run_mode(mode, run_id, options['signups'], options['threads'])
+        finally:
+            newsletter.spool._spool = None
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            if not options['keep']:
+                NewsletterSubscription.objects.filter(email__startswith=f'bench-{run_id}-').delete()
+
+    def run_mode(self, mode, run_id, signups, threads):
+        per_thread = max(1, signups // threads)
+
+        def worker(thread_index):
+            client = Client(HTTP_HOST='localhost')
+            samples, errors = [], 0
+            for i in range(per_thread):
+                email = f'bench-{run_id}-{mode}-{thread_index}-{i}@example.com'
+                start = time.perf_counter()
+                response = client.post('/api/newsletter/subscribe/', {'email': email}, content_type='application/json')
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+            close_old_connections()
+            return samples, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        samples = [sample for thread_samples, _ in results for sample in thread_samples]
+        errors = sum(thread_errors for _, thread_errors in results)
+        summary = summarize(samples)
+        self.stdout.write(
+            f"{mode:<7} {len(samples)} signups in {elapsed:.2f}s: {len(samples) / elapsed:.0f}/s, "
+            f"p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, {errors} error(s)"
+        )
+
+        if mode == 'spool':
+            start = time.perf_counter()
+            counts = newsletter.spool._spool.flush()
+            flush_elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"        flushed {counts['created']} in {flush_elapsed:.2f}s "
+                f"({counts['created'] / flush_elapsed if flush_elapsed else 0:.0f}/s)"
+            )
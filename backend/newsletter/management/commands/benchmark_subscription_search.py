@@ -0,0 +1,74 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from newsletter.benchmarking import build_subscription_fixture, summarize, throwaway_database, time_calls
+from newsletter.models import NewsletterSubscription
+from newsletter.search import filter_by_index, match_expression, search_subscriptions
+
+
+DEFAULT_TERMS = ['@gmail.com', 'gmail.com', 'bench-123456@', '10.17.42', 'bench-99 yahoo', 'no-such-subscriber']
+
+
+def forced_index_search(queryset, term):
+    """Search through the index even for bare domains, which the admin sends to LIKE."""
+    expression = match_expression(term, bare_domains=True)
+    return None if expression is None else filter_by_index(queryset, expression)
+
+
+class Command(BaseCommand):
+    help = 'Compare admin search with LIKE scans against the FTS5 trigram index over a large throwaway fixture.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Subscriptions in the fixture (default: 1000000)')
+        parser.add_argument('--terms', default='|'.join(DEFAULT_TERMS),
+                            help='Search terms separated by "|"')
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Timed searches per term and backend (default: 5)')
+        parser.add_argument('--database', default=None,
+                            help='SQLite file for the fixture, kept between runs (default: a temporary file)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+        terms = [term for term in options['terms'].split('|') if term.strip()]
+
+        with throwaway_database(options['database']):
+            start = time.perf_counter()
+            created = build_subscription_fixture(options['rows'])
+            if created:
+                self.stdout.write(f'Built {created} fixture row(s) in {time.perf_counter() - start:.1f}s')
+
+            model_admin = admin.site._registry[NewsletterSubscription]
+            request = RequestFactory().get('/admin/newsletter/newslettersubscription/')
+            base = NewsletterSubscription.objects.order_by('-subscribed_at', '-pk')
+
+            for term in terms:
+                backends = [
+                    ('LIKE', lambda: admin.ModelAdmin.get_search_results(model_admin, request, base, term)[0]),
+                    ('FTS5', lambda: search_subscriptions(base, term)),
+                ]
+                if search_subscriptions(base, term) is None:
+                    # Measured to justify sending bare domains to LIKE
+                    backends.append(('FTS5*', lambda: forced_index_search(base, term)))
+                for label, search in backends:
+                    if search() is None:
+                        self.stdout.write(f'{label:<5} {term!r:<22} not indexable (a term is under 3 characters or a bare domain)')
+                        continue
+                    # What the changelist does: count the matches, then fetch the first page
+                    results = {}
+
+                    def run():
+                        queryset = search()
+                        results['count'] = queryset.count()
+                        list(queryset[:50])
+
+                    summary = summarize(time_calls(run, options['iterations'], warmup=1))
+                    self.stdout.write(
+                        f"{label:<5} {term!r:<22} {results['count']:>8} match(es), "
+                        f"p50 {summary['p50_ms']:8.1f} ms, p95 {summary['p95_ms']:8.1f} ms"
+                    )
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wax_and_warmth.compression import (
+    AVAILABLE_ENCODINGS, MIN_COMPRESS_SIZE, VARIANT_SUFFIXES, compress_variants,
+    is_compressible,
+)
+
+
+# Records, per source file and mtime, the codings that were skipped because the
+# compressed output was not smaller, so the next run does not retry them
+STATE_FILENAME = '.compress_static.json'
+
+
+def compress_file(path):
+    """Write .gz/.br siblings for one file; return (path, original size, {encoding: size})."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    sizes = {}
+    for encoding, compressed in compress_variants(data).items():
+        with open(path + VARIANT_SUFFIXES[encoding], 'wb') as f:
+            f.write(compressed)
+        sizes[encoding] = len(compressed)
+    # A variant left over from an earlier version of the file would be stale
+    for encoding in AVAILABLE_ENCODINGS:
+        if encoding not in sizes and os.path.exists(path + VARIANT_SUFFIXES[encoding]):
+            os.remove(path + VARIANT_SUFFIXES[encoding])
+    return path, len(data), sizes
+
+
+def load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(root, state):
+    with open(os.path.join(root, STATE_FILENAME), 'w') as f:
+        json.dump(state, f, sort_keys=True)
+
+
+def is_up_to_date(path, skipped=None):
+    """
+    Return True if every variant of path exists and is newer than it, or was
+    skipped (per the skipped state entry) for the file's current mtime.
+    """
+    source_mtime = os.path.getmtime(path)
+    if not skipped or skipped.get('mtime_ns') != os.stat(path).st_mtime_ns:
+        skipped = {}
+    for encoding in AVAILABLE_ENCODINGS:
+        if encoding in skipped.get('encodings', ()):
+            continue
+        variant = path + VARIANT_SUFFIXES[encoding]
+        if not os.path.exists(variant) or os.path.getmtime(variant) < source_mtime:
+            return False
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Write precompressed .gz (and .br when brotli is installed) siblings for collected text assets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', default=None,
+                            help='Directory to compress (default: STATIC_ROOT)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Parallel compression workers (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Recompress files whose variants are already up to date')
+
+    def handle(self, *args, **options):
+        root = options['root'] or str(settings.STATIC_ROOT)
+        if not os.path.isdir(root):
+            raise CommandError(f"{root} does not exist; run collectstatic first.")
+
+        state = {} if options['force'] else load_state(root)
+        paths = []
+        current = set()
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename == STATE_FILENAME or not is_compressible(path) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                    continue
+                name = os.path.relpath(path, root)
+                current.add(name)
+                if options['force'] or not is_up_to_date(path, state.get(name)):
+                    paths.append(path)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            results = list(pool.map(compress_file, paths))
+        elapsed = time.perf_counter() - start
+
+        state = {name: entry for name, entry in state.items() if name in current}
+        for path, _, sizes in results:
+            name = os.path.relpath(path, root)
+            skipped = [encoding for encoding in AVAILABLE_ENCODINGS if encoding not in sizes]
+            if skipped:
+                state[name] = {'mtime_ns': os.stat(path).st_mtime_ns, 'encodings': skipped}
+            else:
+                state.pop(name, None)
+        save_state(root, state)
+
+        original_total = 0
+        encoded_totals = dict.fromkeys(AVAILABLE_ENCODINGS, 0)
+        for path, original_size, sizes in sorted(results, key=lambda r: -r[1]):
+            original_total += original_size
+            for encoding in AVAILABLE_ENCODINGS:
+                encoded_totals[encoding] += sizes.get(encoding, original_size)
+            if options['verbosity'] > 1 and sizes:
+                ratios = ', '.join(f'{enc} {size / original_size:.1%}' for enc, size in sizes.items())
+                self.stdout.write(f'  {os.path.relpath(path, root)}: {original_size} B -> {ratios}')
+
+        self.stdout.write(f'Compressed {len(results)} file(s) in {elapsed:.2f}s using {", ".join(AVAILABLE_ENCODINGS)}')
+        if original_total:
+            for encoding, total in encoded_totals.items():
+                self.stdout.write(
+                    f'  {encoding}: {original_total} B -> {total} B ({total / original_total:.1%} of original)'
+                )
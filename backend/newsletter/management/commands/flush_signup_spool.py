@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from newsletter.spool import SignupSpool
+
+
+class Command(BaseCommand):
+    help = 'Replay spooled newsletter signups (including files left by a crash) into the database.'
+
+    def handle(self, *args, **options):
+        spool = SignupSpool(settings.NEWSLETTER_SPOOL_DIR)
+        counts = spool.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f"Flushed signup spool: {counts['created']} created, {counts['reactivated']} reactivated, "
+            f"{counts['duplicate']} duplicate, {counts['invalid']} invalid"
+        ))
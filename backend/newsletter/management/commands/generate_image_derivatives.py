@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from newsletter.pages import SITE_DIR
+
+
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+# Output formats: (name, file extension, Pillow format)
+FORMATS = [
+    ('webp', '.webp', 'WEBP'),
+    ('jpeg', '.jpg', 'JPEG'),
+]
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_derivatives(job):
+    """
+    Resize one source image to each width and save it in every format.
+
+    Runs in a worker process; returns (source name, info dict, seconds).
+    """
+    from PIL import Image, ImageOps
+
+    source_name, source_path, output_dir, widths, quality = job
+    start = time.perf_counter()
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    # WebP keeps transparency; JPEG gets a copy flattened onto white
+    if image.mode in ('RGBA', 'LA', 'P'):
+        webp_base = image.convert('RGBA')
+        jpeg_base = Image.new('RGB', webp_base.size, (255, 255, 255))
+        jpeg_base.paste(webp_base, mask=webp_base.getchannel('A'))
+    else:
+        webp_base = jpeg_base = image.convert('RGB')
+
+    # Never upscale: widths above the original collapse to the original width
+    targets = sorted({min(width, image.width) for width in widths})
+    # The source extension stays in the name, so foo.jpg and foo.png do not
+    # overwrite each other's derivatives
+    stem, source_extension = os.path.splitext(source_name)
+    stem = f"{stem}-{source_extension.lstrip('.').lower()}"
+    outputs = {name: [] for name, _, _ in FORMATS}
+
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        for name, extension, pil_format in FORMATS:
+            base = jpeg_base if pil_format == 'JPEG' else webp_base
+            resized = base if width == image.width else base.resize((width, height), Image.LANCZOS)
+            output_name = f'{stem}-{width}{extension}'
+            output_path = os.path.join(output_dir, output_name)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            save_options = {'quality': quality}
+            if pil_format == 'JPEG':
+                save_options.update(optimize=True, progressive=True)
+            else:
+                save_options['method'] = 4
+            resized.save(output_path, pil_format, **save_options)
+            outputs[name].append({
+                'file': output_name,
+                'width': width,
+                'height': height,
+                'bytes': os.path.getsize(output_path),
+            })
+
+    info = {
+        'width': image.width,
+        'height': image.height,
+        'source_bytes': os.path.getsize(source_path),
+        'outputs': outputs,
+    }
+    return source_name, info, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG derivatives of site images and a srcset map for the front end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--widths', default=','.join(str(w) for w in settings.IMAGE_DERIVATIVE_WIDTHS),
+                            help='Comma-separated target widths in pixels')
+        parser.add_argument('--quality', type=int, default=80,
+                            help='WebP/JPEG quality (default: 80)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count)')
+        parser.add_argument('--output', default=str(settings.IMAGE_DERIVATIVES_DIR),
+                            help='Directory for derivatives, manifest and srcset map')
+        parser.add_argument('--base-url',
+                            help='URL the output directory is served at (default: its path under the site root)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate derivatives for unchanged sources')
+
+    def handle(self, *args, **options):
+        try:
+            widths = sorted({int(w) for w in options['widths'].split(',') if w.strip()})
+        except ValueError:
+            raise CommandError("--widths must be a comma-separated list of integers.")
+        if not widths or min(widths) <= 0:
+            raise CommandError("--widths must contain positive integers.")
+
+        output_dir = options['output']
+        base_url = options['base_url']
+        if base_url is None:
+            relative = os.path.relpath(os.path.abspath(output_dir), SITE_DIR)
+            if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+                raise CommandError('--output is not inside the site root; give the URL it is served at with --base-url.')
+            base_url = '/' + ('' if relative == os.curdir else relative.replace(os.sep, '/'))
+        base_url = base_url.rstrip('/') + '/'
+        quality = options['quality']
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        manifest = {}
+        if os.path.exists(manifest_path) and not options['force']:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        # Sources are skipped when content and settings match the manifest
+        params = {'widths': widths, 'quality': quality}
+        jobs = []
+        sources = {}
+        skipped = 0
+        for source_name, source_path in self.find_sources():
+            digest = file_hash(source_path)
+            sources[source_name] = digest
+            entry = manifest.get(source_name)
+            if entry and entry.get('hash') == digest and entry.get('params') == params \
+                    and self.outputs_exist(output_dir, entry):
+                skipped += 1
+                continue
+            jobs.append((source_name, source_path, output_dir, widths, quality))
+
+        start = time.perf_counter()
+        failures = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = {job[0]: pool.submit(render_derivatives, job) for job in jobs}
+            for source_name, future in futures.items():
+                try:
+                    _, info, seconds = future.result()
+                except Exception as e:
+                    failures += 1
+                    self.stderr.write(f'  {source_name}: failed ({e})')
+                    continue
+                info.update(hash=sources[source_name], params=params)
+                manifest[source_name] = info
+                if options['verbosity'] > 0:
+                    self.stdout.write(f'  {source_name}: {seconds * 1000:.0f} ms')
+        elapsed = time.perf_counter() - start
+
+        # Forget sources that no longer exist
+        manifest = {name: entry for name, entry in manifest.items() if name in sources}
+
+        os.makedirs(output_dir, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        with open(os.path.join(output_dir, 'srcset.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.build_srcset_map(manifest, base_url), f, indent=2, sort_keys=True)
+
+        self.stdout.write(
+            f'Processed {len(jobs) - failures} image(s) in {elapsed:.2f}s, '
+            f'skipped {skipped} unchanged, {failures} failed.'
+        )
+
+    def find_sources(self):
+        """Yield (name relative to the site root, path) for each source image."""
+        for directory in settings.IMAGE_DERIVATIVE_SOURCES:
+            root = os.path.join(SITE_DIR, directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in SOURCE_EXTENSIONS:
+                        path = os.path.join(dirpath, filename)
+                        yield os.path.relpath(path, SITE_DIR).replace(os.sep, '/'), path
+
+    def outputs_exist(self, output_dir, entry):
+        return all(
+            os.path.exists(os.path.join(output_dir, output['file']))
+            for outputs in entry.get('outputs', {}).values()
+            for output in outputs
+        )
+
+    def build_srcset_map(self, manifest, base_url):
+        """Map each source image URL to its derivative URLs (under base_url) and srcset strings."""
+        srcset_map = {}
+        for source_name, entry in manifest.items():
+            item = {'width': entry['width'], 'height': entry['height']}
+            for format_name, outputs in entry['outputs'].items():
+                item[format_name] = ', '.join(
+                    f"{base_url}{quote(output['file'])} {output['width']}w" for output in outputs
+                )
+            srcset_map['/' + quote(source_name)] = item
+        return srcset_map
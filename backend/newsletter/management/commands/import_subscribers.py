@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from newsletter.bulk import DEFAULT_CHUNK_SIZE, import_subscribers, iter_csv_emails, iter_json_emails
+
+
+class Command(BaseCommand):
+    help = 'Import newsletter subscribers from a CSV, JSON or plain-text (one email per line) file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'json', 'lines'], default=None,
+                            help='Input format (default: guessed from the file extension, else csv)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f'Rows per transaction (default: {DEFAULT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format']
+        if input_format is None:
+            extension = os.path.splitext(path)[1].lower()
+            input_format = {'.json': 'json', '.txt': 'lines'}.get(extension, 'csv')
+
+        if path == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(path, 'r', encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f"Cannot open {path}: {e}")
+
+        start = time.perf_counter()
+        try:
+            if input_format == 'json':
+                emails = iter_json_emails(json.load(stream))
+            elif input_format == 'lines':
+                emails = (line for line in stream)
+            else:
+                emails = iter_csv_emails(stream)
+            counts = import_subscribers(emails, chunk_size=max(1, options['chunk_size']))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise CommandError(f"Invalid input: {e}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - start
+
+        total = sum(counts.values())
+        rate = total / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total} row(s) in {elapsed:.2f}s ({rate:.0f} rows/s): "
+            f"{counts['created']} created, {counts['duplicate']} duplicate, {counts['invalid']} invalid"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsletter.models import SubscriptionCounter
+
+
+class Command(BaseCommand):
+    help = 'Recount newsletter subscriptions and correct the maintained active/inactive counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift; exit with an error if the counters are wrong')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual = SubscriptionCounter.count_subscriptions()
+            stored = dict(SubscriptionCounter.objects.values_list('name', 'value'))
+            drift = {name: actual[name] - stored.get(name, 0) for name in actual}
+        else:
+            drift = SubscriptionCounter.reconcile()
+
+        report = ', '.join(f'{name} {delta:+d}' for name, delta in drift.items())
+        if not any(drift.values()):
+            self.stdout.write(self.style.SUCCESS('Subscription counters are accurate.'))
+        elif options['check']:
+            raise CommandError(f'Subscription counters have drifted: {report}')
+        else:
+            self.stdout.write(self.style.WARNING(f'Corrected subscription counter drift: {report}'))
@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from newsletter.db import serialized_write
+from newsletter.models import NewsletterSubscription
+
+
+def write_batch(args):
+    """Run one process's writer threads; return (writes, lock errors, other errors)."""
+    run_id, process_index, threads, writes = args
+
+    def writer(thread_index):
+        ok = locked = failed = 0
+        for i in range(writes):
+            email = f'stress-{run_id}-{process_index}-{thread_index}-{i}@example.com'
+            try:
+                with serialized_write():
+                    NewsletterSubscription.objects.create(email=email, ip_address='127.0.0.1')
+                ok += 1
+            except OperationalError as e:
+                if 'locked' in str(e):
+                    locked += 1
+                else:
+                    failed += 1
+            except Exception:
+                failed += 1
+        close_old_connections()
+        connections.close_all()
+        return ok, locked, failed
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(writer, range(threads)))
+    return tuple(sum(column) for column in zip(*results))
+
+
+class Command(BaseCommand):
+    help = 'Hammer SQLite with concurrent subscription writers and report "database is locked" errors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help='Writer processes (default: 2)')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Writer threads per process (default: 8)')
+        parser.add_argument('--writes', type=int, default=100,
+                            help='Inserts per writer thread (default: 100)')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the inserted rows instead of deleting them')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        processes = max(1, options['processes'])
+        jobs = [(run_id, index, max(1, options['threads']), options['writes']) for index in range(processes)]
+        writers = processes * max(1, options['threads'])
+
+        self.stdout.write(
+            f"Profile {settings.DB_PROFILE!r}: {writers} concurrent writers "
+            f"({processes} process(es) x {options['threads']} thread(s)), {options['writes']} inserts each"
+        )
+
+        # Forked workers must not share the parent's SQLite connection
+        connections.close_all()
+        start = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.map(write_batch, jobs)
+        elapsed = time.perf_counter() - start
+
+        ok, locked, failed = (sum(column) for column in zip(*results))
+        style = self.style.SUCCESS if not locked and not failed else self.style.ERROR
+        self.stdout.write(style(
+            f"{ok} inserts in {elapsed:.2f}s ({ok / elapsed:.0f}/s), "
+            f"{locked} 'database is locked' error(s), {failed} other error(s)"
+        ))
+
+        if not options['keep']:
+            NewsletterSubscription.objects.filter(email__startswith=f'stress-{run_id}-').delete()
@@ -0,0 +1,193 @@
+"""
+Per-process request metrics: latency histograms, database and template time.
+
+RequestMetricsMiddleware (see middleware.py) opens a RequestTimings for each
+request in a context variable. The query wrapper installed on every database
+connection and timed_template() blocks around page rendering add to it, also
+from sync_to_async threads, which inherit the context. When the response is
+ready the timings go into the process-wide registry. render_prometheus() dumps the
+registry in the Prometheus text exposition format. Each process keeps its own
+metrics, so scrape every process (or sum them).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_PREFIX = 'wax_and_warmth'
+
+_current = ContextVar('newsletter_request_timings', default=None)
+
+
+class RequestTimings:
+    """Time spent by one request, by category."""
+
+    __slots__ = ('start', 'queries', 'db_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def server_timing(self, total_seconds):
+        """Return a Server-Timing header value for these timings."""
+        parts = [f'total;dur={total_seconds * 1000:.2f}']
+        if self.queries:
+            parts.append(f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"')
+        if self.template_seconds:
+            parts.append(f'tpl;dur={self.template_seconds * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class ViewMetrics:
+    """Aggregated metrics of one view."""
+
+    __slots__ = ('buckets', 'count', 'seconds', 'queries', 'db_seconds', 'template_seconds',
+                 'response_bytes', 'statuses')
+
+    def __init__(self):
+        # One count per bucket, plus the +Inf bucket; cumulated when rendered
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+    def copy(self):
+        other = ViewMetrics()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.buckets = list(self.buckets)
+        other.statuses = dict(self.statuses)
+        return other
+
+
+_views = {}
+_lock = threading.Lock()
+
+
+def start_request():
+    """Start timing a request; returns (timings, token for finish_request())."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(view, timings, token, status_code, response_bytes):
+    """Record a finished request under view; returns its total duration in seconds."""
+    seconds = time.perf_counter() - timings.start
+    _current.reset(token)
+    status = f'{status_code // 100}xx'
+    with _lock:
+        metrics = _views.get(view)
+        if metrics is None:
+            metrics = _views[view] = ViewMetrics()
+        metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        metrics.count += 1
+        metrics.seconds += seconds
+        metrics.queries += timings.queries
+        metrics.db_seconds += timings.db_seconds
+        metrics.template_seconds += timings.template_seconds
+        if response_bytes is not None:
+            metrics.response_bytes += response_bytes
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+    return seconds
+
+
+def time_queries(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's timings."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_seconds += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver installing time_queries on new connections."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+@contextmanager
+def timed_template():
+    """Add the time spent in the block to the current request's template time."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.template_seconds += time.perf_counter() - start
+
+
+def reset_metrics():
+    """Forget every recorded request."""
+    with _lock:
+        _views.clear()
+
+
+def _labels(**labels):
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_prometheus():
+    """Return the recorded metrics in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = sorted((view, metrics.copy()) for view, metrics in _views.items())
+
+    duration = f'{METRIC_PREFIX}_request_duration_seconds'
+    lines = [
+        f'# HELP {duration} Request latency by view.',
+        f'# TYPE {duration} histogram',
+    ]
+    for view, metrics in snapshot:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+            cumulative += count
+            lines.append(f'{duration}_bucket{_labels(view=view, le=repr(bound))} {cumulative}')
+        lines.append(f'{duration}_bucket{_labels(view=view, le="+Inf")} {metrics.count}')
+        lines.append(f'{duration}_sum{_labels(view=view)} {metrics.seconds:.6f}')
+        lines.append(f'{duration}_count{_labels(view=view)} {metrics.count}')
+
+    responses = f'{METRIC_PREFIX}_responses_total'
+    lines.append(f'# HELP {responses} Responses by view and status class.')
+    lines.append(f'# TYPE {responses} counter')
+    for view, metrics in snapshot:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f'{responses}{_labels(view=view, status=status)} {count}')
+
+    counters = [
+        ('db_queries_total', 'queries', 'Database queries by view.'),
+        ('db_duration_seconds_total', 'db_seconds', 'Time spent in database queries by view.'),
+        ('template_duration_seconds_total', 'template_seconds', 'Time spent rendering pages by view.'),
+        ('response_bytes_total', 'response_bytes', 'Response body bytes by view (unsized streams excluded).'),
+    ]
+    for name, attribute, help_text in counters:
+        metric = f'{METRIC_PREFIX}_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for view, metrics in snapshot:
+            value = getattr(metrics, attribute)
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'{metric}{_labels(view=view)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,139 @@
+"""
+Middleware for the newsletter app.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import empty
+
+from .metrics import finish_request, start_request
+from .profiling import aprofile_request, profile_request, requested_profile_mode
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request into the per-view metrics and add a Server-Timing header.
+
+    The header only goes to staff, or to everyone while DEBUG is on. The user
+    is only checked when the view already loaded it, or when the request asks
+    for the header with "X-Server-Timing: 1", so other requests make no
+    session or user queries for it.
+
+    Place it first in MIDDLEWARE so the timing covers the other middleware.
+    Works natively in both sync and async stacks, so it adds no thread hop
+    under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'NEWSLETTER_METRICS_ENABLED', True)
+        self.server_timing = getattr(settings, 'NEWSLETTER_SERVER_TIMING', True)
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        timings, token = start_request()
+        response = self.get_response(request)
+        seconds = self.record(request, response, timings, token)
+        if self.server_timing and self.show_server_timing(request):
+            response['Server-Timing'] = timings.server_timing(seconds)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        timings, token = start_request()
+        response = await self.get_response(request)
+        seconds = self.record(request, response, timings, token)
+        if self.server_timing and await self.ashow_server_timing(request):
+            response['Server-Timing'] = timings.server_timing(seconds)
+        return response
+
+    def show_server_timing(self, request):
+        if settings.DEBUG:
+            return True
+        user = loaded_user(request)
+        if user is None and server_timing_requested(request):
+            user = getattr(request, 'user', None)
+        return is_staff(user)
+
+    async def ashow_server_timing(self, request):
+        if settings.DEBUG:
+            return True
+        user = loaded_user(request)
+        if user is None and server_timing_requested(request) and hasattr(request, 'auser'):
+            user = await request.auser()
+        return is_staff(user)
+
+    def record(self, request, response, timings, token):
+        """Add the request to the metrics; returns its duration in seconds."""
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else '<unmatched>'
+        if response.streaming:
+            length = response.get('Content-Length')
+            response_bytes = int(length) if length and length.isdigit() else None
+        else:
+            response_bytes = len(response.content)
+        return finish_request(view, timings, token, response.status_code, response_bytes)
+
+
+def loaded_user(request):
+    """Return the request's user if the view already loaded it, else None."""
+    if hasattr(request, '_acached_user'):
+        return request._acached_user
+    user = getattr(request, 'user', None)
+    if getattr(user, '_wrapped', None) is empty:
+        return None
+    return user
+
+
+def server_timing_requested(request):
+    """Return True if the request asks for the Server-Timing header."""
+    return request.headers.get('X-Server-Timing') == '1'
+
+
+def is_staff(user):
+    """Return True for a staff user; anyone else is not shown the site's timings."""
+    return user is not None and user.is_staff
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request with cProfile when a staff user asks for it.
+
+    Adding ?profile=1 (or an "X-Profile: 1" header) to a request returns the
+    top functions as text instead of the page; ?profile=save keeps the page
+    and writes a .prof file (see profiling.py). Requests without the trigger
+    only pay for two dict lookups. Place it after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = requested_profile_mode(request)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+        return profile_request(request, mode, lambda: self.get_response(request))
+
+    async def __acall__(self, request):
+        mode = requested_profile_mode(request)
+        if mode is None or not (await request.auser()).is_staff:
+            return await self.get_response(request)
+        return await aprofile_request(request, mode, lambda: self.get_response(request))
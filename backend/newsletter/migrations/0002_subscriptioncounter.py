@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_counters(apps, schema_editor):
+    """Initialise the counters from the existing subscriptions."""
+    NewsletterSubscription = apps.get_model('newsletter', 'NewsletterSubscription')
+    SubscriptionCounter = apps.get_model('newsletter', 'SubscriptionCounter')
+    db = schema_editor.connection.alias
+    counts = NewsletterSubscription.objects.using(db).aggregate(
+        active=Count('pk', filter=Q(is_active=True)),
+        inactive=Count('pk', filter=Q(is_active=False)),
+    )
+    for name, value in counts.items():
+        SubscriptionCounter.objects.using(db).update_or_create(name=name, defaults={'value': value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletter', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriptionCounter',
+            fields=[
+                ('name', models.CharField(help_text='Which subscriptions this counter tracks', max_length=32, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0, help_text='Current number of subscriptions')),
+            ],
+            options={
+                'verbose_name': 'Subscription Counter',
+                'verbose_name_plural': 'Subscription Counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
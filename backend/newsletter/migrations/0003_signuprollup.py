@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_rollup(apps, schema_editor):
+    """Backfill signup counts from the existing subscriptions."""
+    NewsletterSubscription = apps.get_model('newsletter', 'NewsletterSubscription')
+    SignupRollup = apps.get_model('newsletter', 'SignupRollup')
+    db = schema_editor.connection.alias
+    hours = Counter()
+    for when in NewsletterSubscription.objects.using(db).values_list('subscribed_at', flat=True).iterator(chunk_size=5000):
+        hours[timezone.localtime(when).replace(minute=0, second=0, microsecond=0)] += 1
+    days = Counter()
+    for hour, number in hours.items():
+        days[hour.replace(hour=0)] += number
+    SignupRollup.objects.using(db).bulk_create(
+        [SignupRollup(period='hour', bucket=bucket, signups=number) for bucket, number in hours.items()]
+        + [SignupRollup(period='day', bucket=bucket, signups=number) for bucket, number in days.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletter', '0002_subscriptioncounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], help_text='Length of the bucket', max_length=8)),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('signups', models.PositiveIntegerField(default=0, help_text='New subscriptions in the bucket')),
+                ('unsubscribes', models.PositiveIntegerField(default=0, help_text='Subscriptions deactivated in the bucket')),
+                ('resubscribes', models.PositiveIntegerField(default=0, help_text='Inactive subscriptions reactivated in the bucket')),
+            ],
+            options={
+                'verbose_name': 'Signup Rollup',
+                'verbose_name_plural': 'Signup Rollups',
+                'ordering': ['period', 'bucket'],
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket'), name='unique_signup_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(seed_rollup, migrations.RunPython.noop),
+    ]
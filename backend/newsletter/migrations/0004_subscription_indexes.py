@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsletter', '0003_signuprollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newslettersubscription',
+            index=models.Index(fields=['subscribed_at'], name='newsletter_subscribed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newslettersubscription',
+            index=models.Index(fields=['is_active', 'subscribed_at'], name='newsletter_active_subscr_idx'),
+        ),
+    ]
@@ -1,7 +1,85 @@
-from django.db import models
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.db import models, router, transaction
+from django.db.models import Count, F, Q
 from django.utils import timezone
 from django.core.validators import EmailValidator
 
+from .dedup import remember_emails
+
+
+# Emails per "email IN (...)" lookup, under SQLite's 999 bound parameters
+LOOKUP_BATCH_SIZE = 900
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    """QuerySet keeping SubscriptionCounter and SignupRollup in sync with bulk writes."""
+    
+    def update(self, **kwargs):
+        """Update rows, counting how many actually flip is_active."""
+        if 'is_active' not in kwargs:
+            return super().update(**kwargs)
+        
+        is_active = bool(kwargs['is_active'])
+        with transaction.atomic(using=self.db):
+            # Unchanged rows first, or they would include the rows just flipped
+            unchanged = models.QuerySet.update(self.filter(is_active=is_active), **kwargs)
+            flipped = models.QuerySet.update(self.exclude(is_active=is_active), **kwargs)
+            if flipped:
+                delta = flipped if is_active else -flipped
+                SubscriptionCounter.adjust(active=delta, inactive=-delta, using=self.db)
+                SignupRollup.record(
+                    SignupRollup.RESUBSCRIBES if is_active else SignupRollup.UNSUBSCRIBES,
+                    {timezone.now(): flipped}, using=self.db
+                )
+        return flipped + unchanged
+    
+    def delete(self):
+        """Delete rows, removing them from the counters."""
+        with transaction.atomic(using=self.db):
+            counts = self.aggregate(
+                active=Count('pk', filter=Q(is_active=True)),
+                inactive=Count('pk', filter=Q(is_active=False)),
+            )
+            result = super().delete()
+            SubscriptionCounter.adjust(
+                active=-counts['active'], inactive=-counts['inactive'], using=self.db
+            )
+        return result
+    
+    def bulk_create(self, objs, *args, known_new=None, **kwargs):
+        """
+        Insert rows, counting only those not skipped as conflicts.
+        
+        known_new is the set of emails the caller has already looked up in
+        the same transaction and found missing; it saves repeating that
+        lookup to tell which rows ignore_conflicts will skip.
+        """
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            inserted = objs
+            if known_new is not None:
+                inserted = [obj for obj in objs if obj.email in known_new]
+            elif kwargs.get('ignore_conflicts'):
+                emails = [obj.email for obj in objs]
+                existing = set()
+                for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+                    existing.update(
+                        self.filter(email__in=emails[start:start + LOOKUP_BATCH_SIZE])
+                        .values_list('email', flat=True)
+                    )
+                inserted = [obj for obj in objs if obj.email not in existing]
+            result = super().bulk_create(objs, *args, **kwargs)
+            active = sum(1 for obj in inserted if obj.is_active)
+            SubscriptionCounter.adjust(active=active, inactive=len(inserted) - active, using=self.db)
+            SignupRollup.record(
+                SignupRollup.SIGNUPS, Counter(obj.subscribed_at for obj in inserted), using=self.db
+            )
+            # A rolled-back insert only leaves a false positive in the filter
+            remember_emails(obj.email for obj in inserted)
+        return result
+
 
 class NewsletterSubscription(models.Model):
     """Model to store newsletter email subscriptions."""
@@ -30,15 +108,68 @@ class NewsletterSubscription(models.Model):
         help_text="Browser information of the subscriber"
     )
     
+    objects = SubscriptionQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Newsletter Subscription"
         verbose_name_plural = "Newsletter Subscriptions"
         ordering = ['-subscribed_at']
+        # Both also hold the rowid, so they cover ordering by (subscribed_at, id)
+        indexes = [
+            models.Index(fields=['subscribed_at'], name='newsletter_subscribed_idx'),
+            models.Index(fields=['is_active', 'subscribed_at'], name='newsletter_active_subscr_idx'),
+        ]
     
     def __str__(self):
         status = "Active" if self.is_active else "Inactive"
         return f"{self.email} ({status})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can tell when it flips
+        if 'is_active' in field_names:
+            instance._saved_is_active = instance.is_active
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save the subscription, keeping SubscriptionCounter in sync."""
+        adding = self._state.adding
+        # Where Model.save() writes: the instance's database, else the router's choice
+        using = kwargs.get('using') or self._state.db or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            previous = getattr(self, '_saved_is_active', None)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'is_active' not in update_fields:
+                previous = None
+            if adding:
+                SubscriptionCounter.adjust(
+                    active=int(self.is_active), inactive=int(not self.is_active), using=using
+                )
+                SignupRollup.record(SignupRollup.SIGNUPS, {self.subscribed_at: 1}, using=using)
+                remember_emails([self.email])
+            elif previous is not None and previous != self.is_active:
+                delta = 1 if self.is_active else -1
+                SubscriptionCounter.adjust(active=delta, inactive=-delta, using=using)
+                SignupRollup.record(
+                    SignupRollup.RESUBSCRIBES if self.is_active else SignupRollup.UNSUBSCRIBES,
+                    {timezone.now(): 1}, using=using
+                )
+        if previous is not None or adding:
+            self._saved_is_active = self.is_active
+    
+    def delete(self, *args, **kwargs):
+        """Delete the subscription, removing it from the counters."""
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using):
+            result = super().delete(*args, **kwargs)
+            # Compare with the stored status, not one changed but never saved
+            is_active = getattr(self, '_saved_is_active', self.is_active)
+            if result[0]:
+                SubscriptionCounter.adjust(active=-int(is_active), inactive=-int(not is_active), using=using)
+        return result
+    
     def deactivate(self):
         """Deactivate the subscription."""
         self.is_active = False
@@ -47,4 +178,165 @@ class NewsletterSubscription(models.Model):
     def activate(self):
         """Activate the subscription."""
         self.is_active = True
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class SubscriptionCounter(models.Model):
+    """Running subscription totals, so stats do not need COUNT(*) scans."""
+    
+    ACTIVE = 'active'
+    INACTIVE = 'inactive'
+    
+    name = models.CharField(
+        max_length=32,
+        primary_key=True,
+        help_text="Which subscriptions this counter tracks"
+    )
+    value = models.BigIntegerField(
+        default=0,
+        help_text="Current number of subscriptions"
+    )
+    
+    class Meta:
+        verbose_name = "Subscription Counter"
+        verbose_name_plural = "Subscription Counters"
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+    
+    @classmethod
+    def adjust(cls, active=0, inactive=0, using='default'):
+        """
+        Add deltas to the active/inactive counters.
+        
+        Called after the write the deltas describe; if a counter row is
+        missing, both are recounted instead, which includes that write.
+        """
+        for name, delta in ((cls.ACTIVE, active), (cls.INACTIVE, inactive)):
+            if delta and not cls.objects.using(using).filter(name=name).update(value=F('value') + delta):
+                cls.reconcile(using)
+                return
+    
+    @classmethod
+    def get_counts(cls, using='default'):
+        """
+        Return {'total', 'active', 'inactive'} subscription counts.
+        
+        Reads the counters (O(1)); if they have not been created yet, falls
+        back to a single conditional aggregation over the subscriptions.
+        """
+        values = dict(cls.objects.using(using).values_list('name', 'value'))
+        if cls.ACTIVE in values and cls.INACTIVE in values:
+            active, inactive = values[cls.ACTIVE], values[cls.INACTIVE]
+        else:
+            counts = cls.count_subscriptions(using)
+            active, inactive = counts['active'], counts['inactive']
+        return {'total': active + inactive, 'active': active, 'inactive': inactive}
+    
+    @classmethod
+    async def aget_counts(cls, using='default'):
+        """Async version of get_counts()."""
+        values = {name: value async for name, value in cls.objects.using(using).values_list('name', 'value')}
+        if cls.ACTIVE in values and cls.INACTIVE in values:
+            active, inactive = values[cls.ACTIVE], values[cls.INACTIVE]
+        else:
+            counts = await sync_to_async(cls.count_subscriptions)(using)
+            active, inactive = counts['active'], counts['inactive']
+        return {'total': active + inactive, 'active': active, 'inactive': inactive}
+    
+    @classmethod
+    def count_subscriptions(cls, using='default'):
+        """Count active and inactive subscriptions in one query."""
+        return NewsletterSubscription.objects.using(using).aggregate(
+            active=Count('pk', filter=Q(is_active=True)),
+            inactive=Count('pk', filter=Q(is_active=False)),
+        )
+    
+    @classmethod
+    def reconcile(cls, using='default'):
+        """Recount the subscriptions and overwrite the counters; returns the drift fixed."""
+        with transaction.atomic(using=using):
+            counts = cls.count_subscriptions(using)
+            stored = dict(cls.objects.using(using).select_for_update().values_list('name', 'value'))
+            drift = {}
+            for name in (cls.ACTIVE, cls.INACTIVE):
+                drift[name] = counts[name] - stored.get(name, 0)
+                cls.objects.using(using).update_or_create(name=name, defaults={'value': counts[name]})
+        return drift
+
+
+class SignupRollup(models.Model):
+    """
+    Signup and unsubscribe counts per hour and per day, for analytics.
+    
+    Buckets start on hour/day boundaries in the site time zone. Rows are
+    updated incrementally with every subscription write; deleting a
+    subscription does not rewrite its history.
+    """
+    
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+    
+    SIGNUPS = 'signups'
+    UNSUBSCRIBES = 'unsubscribes'
+    RESUBSCRIBES = 'resubscribes'
+    
+    period = models.CharField(
+        max_length=8,
+        choices=PERIOD_CHOICES,
+        help_text="Length of the bucket"
+    )
+    bucket = models.DateTimeField(
+        help_text="Start of the bucket"
+    )
+    signups = models.PositiveIntegerField(
+        default=0,
+        help_text="New subscriptions in the bucket"
+    )
+    unsubscribes = models.PositiveIntegerField(
+        default=0,
+        help_text="Subscriptions deactivated in the bucket"
+    )
+    resubscribes = models.PositiveIntegerField(
+        default=0,
+        help_text="Inactive subscriptions reactivated in the bucket"
+    )
+    
+    class Meta:
+        verbose_name = "Signup Rollup"
+        verbose_name_plural = "Signup Rollups"
+        ordering = ['period', 'bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'bucket'], name='unique_signup_rollup_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.period} {self.bucket:%Y-%m-%d %H:%M}: +{self.signups} -{self.unsubscribes}"
+    
+    @classmethod
+    def bucket_start(cls, when, period):
+        """Return the start of the hour or day containing when, in the site time zone."""
+        local = timezone.localtime(when).replace(minute=0, second=0, microsecond=0)
+        if period == cls.DAY:
+            local = local.replace(hour=0)
+        return local
+    
+    @classmethod
+    def record(cls, field, counts, using='default'):
+        """Add counts ({datetime: number of events}) to field of the matching hour and day buckets."""
+        buckets = Counter()
+        for when, number in counts.items():
+            if number:
+                for period in (cls.HOUR, cls.DAY):
+                    buckets[period, cls.bucket_start(when, period)] += number
+        
+        rollups = cls.objects.using(using)
+        for (period, bucket), number in buckets.items():
+            increment = {field: F(field) + number}
+            if not rollups.filter(period=period, bucket=bucket).update(**increment):
+                rollups.bulk_create([cls(period=period, bucket=bucket)], ignore_conflicts=True)
+                rollups.filter(period=period, bucket=bucket).update(**increment)
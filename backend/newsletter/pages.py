@@ -0,0 +1,211 @@
+"""
+Helpers for serving the site's root HTML pages through the Django template engine.
+"""
+
+import os
+import re
+import secrets
+import threading
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.template import Context, Template
+
+from wax_and_warmth.compression import compress_variants
+
+from .metrics import timed_template
+
+
+# Directory holding the HTML pages (the parent directory of backend)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE_DIR = os.path.dirname(BACKEND_DIR)
+
+# Rendered in place of the CSRF token when a page is rendered once; it is
+# alphanumeric so HTML autoescaping leaves it untouched.
+CSRF_PLACEHOLDER = 'csrfplaceholder' + secrets.token_hex(16)
+
+# Template tags that reference the request cannot be rendered once and reused
+REQUEST_TAG_RE = re.compile(r'\{[{%][^}]*\brequest\b')
+
+# Local asset references in href/src attributes of the HTML pages
+ASSET_REF_RE = re.compile(r'(?P<prefix>\b(?:href|src)=(?P<quote>["\']))(?P<url>[^"\'?#]+)(?P<suffix>[^"\']*)(?P=quote)')
+ASSET_EXTENSIONS = {
+    '.css', '.js', '.jpg', '.jpeg', '.png', '.gif', '.ico', '.svg', '.webp',
+    '.mp4', '.woff', '.woff2', '.ttf', '.eot',
+}
+
+# Both caches are keyed by resolved path: {path: ((mtime_ns, size), value)}
+_template_cache = {}
+_page_cache = {}
+# Pre-rendered pages by filename, served without file system access (frozen mode only)
+_frozen_pages = {}
+_cache_lock = threading.Lock()
+
+
+def resolve_html_path(filename):
+    """Return (resolved path or None, list of tried paths) for an HTML page."""
+    html_file_path = os.path.join(BACKEND_DIR, filename)
+    if os.path.exists(html_file_path):
+        return os.path.realpath(html_file_path), [html_file_path]
+
+    # Try alternative path
+    alt_path = os.path.join(SITE_DIR, filename)
+    if os.path.exists(alt_path):
+        return os.path.realpath(alt_path), [html_file_path, alt_path]
+
+    return None, [html_file_path, alt_path]
+
+
+def _file_signature(path):
+    """Return the (mtime, size) pair used to detect changes to a file."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _cached(cache, path, build):
+    """
+    Return build(path), memoized in cache until the file at path changes.
+
+    With HTML_TEMPLATE_CACHE_FROZEN an entry is never re-checked against the
+    file once built.
+    """
+    entry = cache.get(path)
+    if entry is not None and getattr(settings, 'HTML_TEMPLATE_CACHE_FROZEN', False):
+        return entry[1]
+
+    signature = _file_signature(path)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    value = build(path)
+    with _cache_lock:
+        cache[path] = (signature, value)
+    return value
+
+
+def asset_name(url):
+    """Return the static file name a page URL refers to, or None if not a local asset."""
+    if ':' in url or url.startswith('//') or '{' in url:
+        return None
+    name = unquote(url).lstrip('/')
+    if os.path.splitext(name)[1].lower() not in ASSET_EXTENSIONS:
+        return None
+    return name
+
+
+def iter_asset_references(html):
+    """Yield the static file names referenced from an HTML document."""
+    for match in ASSET_REF_RE.finditer(html):
+        name = asset_name(match.group('url'))
+        if name:
+            yield name
+
+
+def hashed_asset_url(url, manifest):
+    """Return the URL of the content-hashed copy of a local asset url, or None if manifest lacks it."""
+    name = asset_name(url)
+    hashed_name = manifest.get(name) if manifest and name else None
+    if not hashed_name:
+        return None
+    return settings.STATIC_URL + quote(hashed_name)
+
+
+def rewrite_asset_urls(html, manifest):
+    """Point local asset references at their content-hashed names in manifest."""
+    if not manifest:
+        return html
+
+    def replace(match):
+        url = hashed_asset_url(match.group('url'), manifest)
+        if url is None:
+            return match.group(0)
+        return f"{match.group('prefix')}{url}{match.group('suffix')}{match.group('quote')}"
+
+    return ASSET_REF_RE.sub(replace, html)
+
+
+def _compile(path):
+    """Read an HTML file, point its assets at hashed names and compile it."""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    with open(path, 'r', encoding='utf-8') as file:
+        html = file.read()
+    manifest = getattr(staticfiles_storage, 'hashed_files', None)
+    with timed_template():
+        return Template(rewrite_asset_urls(html, manifest))
+
+
+def get_page_template(path):
+    """
+    Return the compiled Template for an HTML page.
+
+    Templates are compiled once per process and reused until the file's
+    mtime or size changes. With HTML_TEMPLATE_CACHE_ENABLED off every call
+    recompiles.
+    """
+    if not getattr(settings, 'HTML_TEMPLATE_CACHE_ENABLED', True):
+        return _compile(path)
+    return _cached(_template_cache, path, _compile)
+
+
+class RenderedPage:
+    """An HTML page rendered ahead of time, split around its CSRF token."""
+
+    def __init__(self, segments):
+        # Encoded output; joining it with a request's CSRF token yields the page
+        self.segments = segments
+        # Precompressed bodies, only for pages that need no CSRF token
+        self.variants = compress_variants(segments[0]) if len(segments) == 1 else {}
+
+
+def _render_page(path):
+    """
+    Render a page once and split the encoded output around the CSRF token.
+
+    Returns None when the page uses the request and must be rendered per hit.
+    """
+    template = get_page_template(path)
+    if REQUEST_TAG_RE.search(template.source):
+        return None
+
+    with timed_template():
+        rendered_html = template.render(Context({'csrf_token': CSRF_PLACEHOLDER}))
+    return RenderedPage(tuple(part.encode('utf-8') for part in rendered_html.split(CSRF_PLACEHOLDER)))
+
+
+def get_rendered_page(path):
+    """
+    Return the pre-rendered RenderedPage for an HTML page, or None.
+
+    None means the page cache is disabled or the page cannot be rendered
+    ahead of time.
+    """
+    if not getattr(settings, 'HTML_PAGE_CACHE_ENABLED', True):
+        return None
+    return _cached(_page_cache, path, _render_page)
+
+
+def clear_template_cache():
+    """Drop every compiled template and pre-rendered page."""
+    with _cache_lock:
+        _template_cache.clear()
+        _page_cache.clear()
+        _frozen_pages.clear()
+
+
+def get_frozen_page(filename):
+    """
+    Return the RenderedPage remembered for filename by freeze_page(), or None.
+
+    Only with HTML_TEMPLATE_CACHE_FROZEN, where a page never changes once
+    built, so it can be served without resolving or stat'ing its file.
+    """
+    if not getattr(settings, 'HTML_TEMPLATE_CACHE_FROZEN', False):
+        return None
+    return _frozen_pages.get(filename)
+
+
+def freeze_page(filename, page):
+    """Remember a RenderedPage for get_frozen_page() when the caches are frozen."""
+    if getattr(settings, 'HTML_TEMPLATE_CACHE_FROZEN', False):
+        _frozen_pages[filename] = page
@@ -0,0 +1,149 @@
+"""
+Paginator for large, key-ordered querysets.
+
+Django's Paginator fetches page N with OFFSET, which makes the database read
+and discard every full row before it. KeysetPaginator moves between adjacent
+pages with cursors: the next/previous links carry the ordering key of the
+boundary row of the current page, and the page is fetched with a WHERE that
+seeks the index to it, so paging through the whole table never skips rows.
+A page number without a cursor (a jump to page N) still has to step over
+the rows before it, but reads only their ordering keys (an index-only scan
+when the ordering is indexed) before seeking to the first one. It also
+accepts a precomputed count so callers can avoid a COUNT(*) over the whole
+table.
+"""
+
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class KeysetPaginator(Paginator):
+    """Paginator that seeks to deep pages by ordering key instead of OFFSET."""
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count=None, cursor=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        # An int, or a callable returning one, used instead of COUNT(*)
+        self._count = count
+        # A token from page_cursors(), sent back by a next/previous link
+        self.cursor = cursor
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+        return self._count() if callable(self._count) else self._count
+
+    @cached_property
+    def seek_keys(self):
+        """
+        Return [(field name, descending)] for the queryset's ordering, or None.
+
+        Seeking needs an ordering of plain, non-null fields ending in the
+        primary key, so every row has a distinct position.
+        """
+        query = getattr(self.object_list, 'query', None)
+        if query is None or not query.order_by or query.distinct:
+            return None
+
+        opts = self.object_list.model._meta
+        keys = []
+        for item in query.order_by:
+            if not isinstance(item, str) or '__' in item or item.lstrip('-') == '?':
+                return None
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            if field.null or getattr(field, 'related_model', None):
+                return None
+            keys.append((field.attname, descending))
+        if keys[-1][0] != opts.pk.attname:
+            return None
+        return keys
+
+    def page(self, number):
+        """Return a Page object for the given 1-based page number."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+
+        keys = self.seek_keys
+        if not bottom or keys is None:
+            return self._get_page(self.object_list[bottom:top], number, self)
+
+        names = [name for name, _ in keys]
+        cursor = self.decode_cursor(number)
+        if cursor is None:
+            boundary = self.object_list.values_list(*names)[bottom:bottom + 1]
+            boundary = next(iter(boundary), None)
+        elif cursor[0] == 'after':
+            # Straight after the last row of the previous page
+            rows = self.object_list.filter(seek_condition(keys, cursor[1], inclusive=False))
+            return self._get_page(rows[:top - bottom], number, self)
+        else:
+            # Ends straight before the first row of the next page
+            before = seek_condition([(name, not descending) for name, descending in keys], cursor[1], inclusive=False)
+            boundary = list(self.object_list.filter(before).reverse().values_list(*names)[:self.per_page])
+            boundary = boundary[-1] if boundary else None
+        if boundary is None:
+            return self._get_page(self.object_list.none(), number, self)
+        return self._get_page(self.object_list.filter(seek_condition(keys, boundary))[:top - bottom], number, self)
+
+    def page_cursors(self, number, rows):
+        """
+        Return (previous, next) cursor tokens for page number, showing rows.
+
+        Either is None where there is no such page, or the ordering cannot
+        seek. Pass a token back as cursor with the adjacent page's number.
+        """
+        keys = self.seek_keys
+        if keys is None or not rows:
+            return None, None
+        previous = self.encode_cursor(number - 1, 'before', rows[0]) if number > 1 else None
+        following = self.encode_cursor(number + 1, 'after', rows[-1]) if number < self.num_pages else None
+        return previous, following
+
+    def encode_cursor(self, number, direction, row):
+        """Return a token for page number, seeking after or before row's ordering key."""
+        opts = self.object_list.model._meta
+        values = [opts.get_field(name).value_to_string(row) for name, _ in self.seek_keys]
+        return urlsafe_b64encode(json.dumps([number, direction, values]).encode()).decode()
+
+    def decode_cursor(self, number):
+        """Return (direction, ordering key) from the cursor if it was issued for page number, else None."""
+        if not self.cursor:
+            return None
+        opts = self.object_list.model._meta
+        try:
+            target, direction, values = json.loads(urlsafe_b64decode(self.cursor.encode()))
+            if target != number or direction not in ('after', 'before') or len(values) != len(self.seek_keys):
+                return None
+            return direction, [opts.get_field(name).to_python(value) for (name, _), value in zip(self.seek_keys, values)]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            # A stale or mangled link falls back to the page number
+            return None
+
+def seek_condition(keys, boundary, inclusive=True):
+    """
+    Return a Q matching rows at (if inclusive) or after boundary in the given key order.
+
+    For keys (a DESC, id DESC) this is a <= x AND (a < x OR id <= y); the
+    leading range on a lets the database seek an index on (a, id).
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(keys, boundary):
+        after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+        condition |= equal & after
+        equal &= Q(**{name: value})
+    name, descending = keys[0]
+    if inclusive:
+        condition |= equal
+    return Q(**{f'{name}__{"lte" if descending else "gte"}': boundary[0]}) & condition
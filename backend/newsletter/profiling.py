@@ -0,0 +1,123 @@
+"""
+On-demand cProfile runs of single requests, for staff.
+
+ProfilingMiddleware (see middleware.py) calls into this module only when a
+request carries ?profile=<mode> or an X-Profile: <mode> header and comes
+from a staff user:
+
+- "1" or "text" replaces the response with the top functions as text.
+- "save" keeps the response and writes the profile to
+  NEWSLETTER_PROFILE_DIR as a pstats file (open it with `python -m pstats`,
+  snakeviz, or flameprof for a flame graph). Only the newest
+  NEWSLETTER_PROFILE_RETENTION files are kept.
+
+One request is profiled at a time per process. cProfile follows a single
+thread: under ASGI that is the event loop, which other requests share, and
+work sent to sync_to_async threads is not included.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+MODES = {'1': 'text', 'text': 'text', 'save': 'save'}
+
+# pstats sort keys accepted in ?profile_sort=
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'pcalls', 'filename')
+
+# Functions listed in a text profile
+TOP_FUNCTIONS = 40
+
+_lock = threading.Lock()
+
+
+def requested_profile_mode(request):
+    """Return the profiling mode the request asks for, or None."""
+    value = request.META.get(PROFILE_HEADER)
+    # Avoid parsing the query string of every request
+    if value is None and PROFILE_PARAM in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get(PROFILE_PARAM)
+    if value is None or not getattr(settings, 'NEWSLETTER_PROFILING_ENABLED', True):
+        return None
+    return MODES.get(value.lower())
+
+
+def profile_request(request, mode, get_response):
+    """Run get_response() under cProfile and return the response for mode."""
+    if not _lock.acquire(blocking=False):
+        response = get_response()
+        response['X-Profile'] = 'busy'
+        return response
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            response = get_response()
+        finally:
+            profiler.disable()
+    finally:
+        _lock.release()
+    return profile_response(request, mode, profiler, response, time.perf_counter() - start)
+
+
+async def aprofile_request(request, mode, get_response):
+    """Async version of profile_request()."""
+    if not _lock.acquire(blocking=False):
+        response = await get_response()
+        response['X-Profile'] = 'busy'
+        return response
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            response = await get_response()
+        finally:
+            profiler.disable()
+    finally:
+        _lock.release()
+    return profile_response(request, mode, profiler, response, time.perf_counter() - start)
+
+
+def profile_response(request, mode, profiler, response, seconds):
+    """Turn a finished profile into the response for mode."""
+    if mode == 'save':
+        response['X-Profile'] = save_profile(profiler, request)
+        return response
+
+    sort = request.GET.get('profile_sort')
+    stream = io.StringIO()
+    stream.write(f'{request.method} {request.get_full_path()} -> {response.status_code} '
+                 f'in {seconds * 1000:.1f} ms\n\n')
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(TOP_FUNCTIONS)
+    return HttpResponse(stream.getvalue(), content_type='text/plain; charset=utf-8')
+
+
+def save_profile(profiler, request):
+    """Write a profile to NEWSLETTER_PROFILE_DIR, pruning old ones; returns the file name."""
+    directory = str(settings.NEWSLETTER_PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    filename = f'{time.time_ns()}-{request.method.lower()}-{slug[:80]}.prof'
+    profiler.dump_stats(os.path.join(directory, filename))
+
+    # File names start with a timestamp, so they sort oldest first
+    saved = sorted(name for name in os.listdir(directory) if name.endswith('.prof'))
+    for name in saved[:max(0, len(saved) - settings.NEWSLETTER_PROFILE_RETENTION)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return filename
@@ -0,0 +1,218 @@
+"""
+Token-bucket rate limiting for the signup endpoints.
+
+Views are wrapped with @rate_limit(scope); settings.NEWSLETTER_RATE_LIMITS
+maps each scope to rules such as {'key': 'ip', 'rate': '10/m', 'burst': 10}.
+Every rule keeps one bucket per client IP (or submitted email) holding up to
+burst tokens and refilling at rate; a request takes one token from each of
+its buckets and gets a 429 with Retry-After when one is empty.
+
+Buckets live in this process (the 'memory' store) or in a Django cache (the
+'cache' store) so several processes share them. The cache store reads and
+writes each bucket without a lock, so concurrent requests from one client
+can occasionally both take the last token.
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.test.signals import setting_changed
+
+from .utils import get_client_ip
+
+
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+Rule = namedtuple('Rule', ['key', 'rate', 'burst'])
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Parse "<tokens>/<s|m|h|d>" into tokens per second."""
+    try:
+        tokens, unit = rate.split('/')
+        return float(tokens) / RATE_UNITS[unit.strip().lower()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/m'")
+
+
+class MemoryStore:
+    """
+    Buckets in an OrderedDict guarded by a lock, for a single process.
+
+    Holds at most max_keys buckets; when full, the least recently used
+    bucket is dropped, which is the one most likely to have refilled.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        """Take a token; return 0.0 if allowed, else seconds until one is available."""
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                while len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                tokens = burst
+            else:
+                self._buckets.move_to_end(key)
+                tokens = min(burst, state[0] + (now - state[1]) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class CacheStore:
+    """Buckets in a Django cache, shared between processes."""
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def take(self, key, rate, burst, now):
+        """Take a token; return 0.0 if allowed, else seconds until one is available."""
+        cache_key = 'ratelimit:' + hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
+        state = self.cache.get(cache_key)
+        tokens = burst if state is None else min(burst, state[0] + (now - state[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Expire once the bucket would be full again
+        self.cache.set(cache_key, (tokens, now), math.ceil((burst - tokens) / rate) + 1)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+def request_email(request):
+    """Return the normalized email submitted with the request, or None."""
+    if request.content_type == 'application/json':
+        try:
+            email = json.loads(request.body).get('email')
+        except (ValueError, AttributeError):
+            return None
+    else:
+        email = request.POST.get('email')
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+
+KEY_FUNCTIONS = {
+    'ip': get_client_ip,
+    'email': request_email,
+}
+
+_stores = {}
+_rules = {}
+
+
+def get_store():
+    """Return the bucket store selected by NEWSLETTER_RATE_LIMIT_STORE."""
+    name = settings.NEWSLETTER_RATE_LIMIT_STORE
+    store = _stores.get(name)
+    if store is None:
+        if name == 'memory':
+            store = MemoryStore()
+        elif name == 'cache':
+            store = CacheStore(getattr(settings, 'NEWSLETTER_RATE_LIMIT_CACHE', 'default'))
+        else:
+            raise ValueError(f"Unknown NEWSLETTER_RATE_LIMIT_STORE {name!r}")
+        _stores[name] = store
+    return store
+
+
+def get_rules(scope):
+    """Return the parsed rules configured for scope."""
+    rules = _rules.get(scope)
+    if rules is None:
+        rules = _rules[scope] = [
+            Rule(config['key'], parse_rate(config['rate']), config.get('burst', 1))
+            for config in settings.NEWSLETTER_RATE_LIMITS.get(scope, ())
+        ]
+    return rules
+
+
+def reset_rate_limits(**kwargs):
+    """Forget all buckets and parsed rules."""
+    _stores.clear()
+    _rules.clear()
+
+
+def _settings_changed(setting, **kwargs):
+    if setting.startswith('NEWSLETTER_RATE_LIMIT'):
+        reset_rate_limits()
+
+
+setting_changed.connect(_settings_changed)
+
+
+def check_rate_limit(scope, request):
+    """Take a token from each of the request's buckets; return seconds to wait, 0.0 if allowed."""
+    rules = get_rules(scope)
+    if not rules:
+        return 0.0
+    store = get_store()
+    now = time.time()
+    for rule in rules:
+        value = KEY_FUNCTIONS[rule.key](request)
+        if value is None:
+            continue
+        wait = store.take(f'{scope}:{rule.key}:{value}', rule.rate, rule.burst, now)
+        if wait:
+            return wait
+    return 0.0
+
+
+async def acheck_rate_limit(scope, request):
+    """Async version of check_rate_limit(); only the cache store leaves the event loop."""
+    if isinstance(get_store(), MemoryStore):
+        return check_rate_limit(scope, request)
+    return await sync_to_async(check_rate_limit, thread_sensitive=False)(scope, request)
+
+
+def too_many_requests(request, wait):
+    """Build the 429 response, in JSON for JSON clients."""
+    retry_after = max(1, math.ceil(wait))
+    message = f'Too many requests. Please try again in {retry_after} seconds.'
+    if request.content_type == 'application/json':
+        response = JsonResponse({'success': False, 'message': message}, status=429)
+    else:
+        response = HttpResponse(message, content_type='text/plain', status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope):
+    """Decorate a view (sync or async) to apply the NEWSLETTER_RATE_LIMITS rules for scope."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if settings.NEWSLETTER_RATE_LIMIT_ENABLED:
+                    wait = await acheck_rate_limit(scope, request)
+                    if wait:
+                        return too_many_requests(request, wait)
+                return await view(request, *args, **kwargs)
+            return wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if settings.NEWSLETTER_RATE_LIMIT_ENABLED:
+                wait = check_rate_limit(scope, request)
+                if wait:
+                    return too_many_requests(request, wait)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
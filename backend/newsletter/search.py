@@ -0,0 +1,157 @@
+"""
+Substring search over subscription emails and IP addresses.
+
+On SQLite an FTS5 table with the trigram tokenizer indexes every three-
+character slice of each email and IP address, so substring searches such as
+"@gmail.com" become index lookups instead of LIKE '%...%' scans. Triggers on
+the subscriptions table keep the index in step with every write, raw SQL
+included. Django rebuilds a SQLite table (dropping its triggers) when a
+migration alters its columns; run `manage.py rebuild_subscription_search`
+after such a migration.
+
+A bare domain such as "gmail.com" matches a large share of all subscribers;
+fetching all those rowids from the index and looking each one up is slower
+than a LIKE scan of the table, so such searches fall back to LIKE.
+"""
+
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+from .models import NewsletterSubscription
+
+
+SEARCH_TABLE = 'newsletter_subscription_fts'
+SUBSCRIPTION_TABLE = NewsletterSubscription._meta.db_table
+SEARCH_COLUMNS = ('email', 'ip_address')
+
+# The trigram tokenizer cannot match anything shorter
+MIN_TERM_LENGTH = 3
+
+# Terms that are just a domain, optionally with the "@"
+BARE_DOMAIN_RE = re.compile(r'@?(?:[a-z0-9-]+\.)+[a-z]{2,}', re.IGNORECASE)
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+INSTALL_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"{_columns}, content='{SUBSCRIPTION_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {SUBSCRIPTION_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {SUBSCRIPTION_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {_columns} ON {SUBSCRIPTION_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+
+def install_search_index(connection):
+    """
+    Create (or repair) the search index and its triggers, then rebuild it.
+
+    Returns False without changes if the database is not SQLite or lacks
+    FTS5 with the trigram tokenizer (SQLite 3.34+).
+    """
+    if connection.vendor != 'sqlite' or not trigram_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+    connection.newsletter_search_index = None
+    return True
+
+
+def uninstall_search_index(connection):
+    """Drop the search index and its triggers."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in UNINSTALL_SQL:
+            cursor.execute(sql)
+    connection.newsletter_search_index = None
+
+
+def trigram_supported(connection):
+    """Return True if this SQLite build has FTS5 and the trigram tokenizer."""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.newsletter_fts_probe USING fts5(value, tokenize='trigram')")
+        except DatabaseError:
+            return False
+        cursor.execute("DROP TABLE temp.newsletter_fts_probe")
+    return True
+
+
+def search_index_available(using='default'):
+    """Return True if the search index table exists on this database, looked up once per connection."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    connection.ensure_connection()
+    # (DB-API connection, available), so a reconnect looks again
+    cached = getattr(connection, 'newsletter_search_index', None)
+    if cached is None or cached[0] is not connection.connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+            cached = connection.newsletter_search_index = (connection.connection, cursor.fetchone() is not None)
+    return cached[1]
+
+
+def search_terms(search_term):
+    """Split an admin search term like the admin's own search, keeping quoted phrases whole."""
+    terms = []
+    for term in smart_split(search_term):
+        if term.startswith(('"', "'")) and term[0] == term[-1]:
+            term = unescape_string_literal(term)
+        terms.append(term)
+    return terms
+
+
+def match_expression(search_term, bare_domains=False):
+    """
+    Turn an admin search term into an FTS5 MATCH expression, or None.
+
+    Terms must all match, each as a case-insensitive substring. Returns
+    None when a term is too short for the trigram index or, unless
+    bare_domains is set, is a bare domain, which the index answers slower
+    than a LIKE scan (see benchmark_subscription_search).
+    """
+    terms = []
+    for term in search_terms(search_term):
+        if len(term) < MIN_TERM_LENGTH or (not bare_domains and BARE_DOMAIN_RE.fullmatch(term)):
+            return None
+        terms.append('"' + term.replace('"', '""') + '"')
+    return ' AND '.join(terms) or None
+
+
+def search_subscriptions(queryset, search_term):
+    """
+    Filter queryset to subscriptions whose email or IP contains every search term.
+
+    Returns None if the index cannot answer the search, in which case the
+    caller should fall back to LIKE lookups.
+    """
+    expression = match_expression(search_term)
+    if expression is None or not search_index_available(queryset.db):
+        return None
+    return filter_by_index(queryset, expression)
+
+
+def filter_by_index(queryset, expression):
+    """Filter queryset to the rows of the search index matching an FTS5 MATCH expression."""
+    return queryset.filter(pk__in=RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [expression]
+    ))
@@ -0,0 +1,214 @@
+"""
+Durable write-behind spool for newsletter signups.
+
+In spooled mode the signup views append each signup to an fsync'd JSONL file
+and answer immediately; a background flusher periodically rotates the file and
+inserts its records into NewsletterSubscription in batched transactions.
+Rotated files are only deleted after their records are committed, so a crash
+at any point is recovered by replaying whatever files are left on disk.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bulk import DEFAULT_CHUNK_SIZE, chunked, insert_subscriptions, is_valid_email, normalize_email
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends and rotation are only serialized within a process
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+SPOOL_FILENAME = 'signups.jsonl'
+PENDING_PATTERN = 'signups-*.pending'
+
+
+class SignupSpool:
+    """Append-only signup log with rotation and batched replay into the database."""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.path = os.path.join(self.directory, SPOOL_FILENAME)
+        self.lock_path = os.path.join(self.directory, 'spool.lock')
+        self.flush_lock_path = os.path.join(self.directory, 'flush.lock')
+        os.makedirs(self.directory, exist_ok=True)
+        self._fallback_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, exclusive):
+        """
+        Hold the spool lock: shared for appends, exclusive for rotation.
+
+        Concurrent appends are safe with O_APPEND; only rotation must not
+        interleave with them. Each holder opens its own descriptor so the
+        lock also works between threads of one process.
+        """
+        if fcntl is None:
+            with self._fallback_lock:
+                yield
+            return
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    @contextmanager
+    def _flushing(self):
+        """
+        Hold the flush lock, so only one thread of one process replays at a time.
+
+        A lock file of its own, so appends carry on during the replay.
+        """
+        with self._flush_lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self.flush_lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def append(self, email, ip_address=None, user_agent=None):
+        """Durably record a signup; returns once it is fsync'd to disk."""
+        record = {
+            'email': email,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'subscribed_at': timezone.now().isoformat(),
+        }
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._locked(exclusive=False):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def rotate(self):
+        """Move the active spool aside so new signups start a fresh file."""
+        with self._locked(exclusive=True):
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                os.rename(self.path, os.path.join(
+                    self.directory, f'signups-{time.time_ns()}-{os.getpid()}.pending'
+                ))
+
+    def pending_files(self):
+        """Return rotated files awaiting replay, oldest first."""
+        return sorted(glob.glob(os.path.join(self.directory, PENDING_PATTERN)))
+
+    def flush(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Rotate the spool and replay every pending file into the database.
+
+        Addresses that unsubscribed are subscribed again. Returns a dict
+        counting created, reactivated, duplicate and invalid records.
+        """
+        counts = {'created': 0, 'reactivated': 0, 'duplicate': 0, 'invalid': 0}
+        with self._flushing():
+            self.rotate()
+            for path in self.pending_files():
+                for key, value in self._replay(path, chunk_size).items():
+                    counts[key] += value
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Removed by hand meanwhile; inserts are idempotent
+                    pass
+        return counts
+
+    def _replay(self, path, chunk_size):
+        counts = {'created': 0, 'reactivated': 0, 'duplicate': 0, 'invalid': 0}
+        for chunk in chunked(read_records(path), chunk_size):
+            # Coalesce repeated signups for one address, keeping the first
+            unique = {}
+            for record in chunk:
+                email = normalize_email(record.get('email'))
+                if not is_valid_email(email):
+                    counts['invalid'] += 1
+                elif email in unique:
+                    counts['duplicate'] += 1
+                else:
+                    unique[email] = {
+                        'ip_address': record.get('ip_address') or None,
+                        'user_agent': record.get('user_agent'),
+                        'subscribed_at': parse_datetime(record.get('subscribed_at') or '') or timezone.now(),
+                    }
+
+            created, duplicate, reactivated = insert_subscriptions(unique, reactivate=True)
+            counts['created'] += created
+            counts['reactivated'] += reactivated
+            counts['duplicate'] += duplicate
+        return counts
+
+
+def read_records(path):
+    """Yield records from a spool file, skipping a torn final line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable signup spool line in {path}")
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    """Return the process-wide spool, starting its background flusher."""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                spool = SignupSpool(settings.NEWSLETTER_SPOOL_DIR)
+                thread = threading.Thread(target=_flush_forever, args=(spool,), name='signup-spool-flusher', daemon=True)
+                thread.start()
+                _spool = spool
+    return _spool
+
+
+def _flush_forever(spool):
+    """Background loop flushing the spool; its first pass replays leftovers from a crash."""
+    while True:
+        try:
+            counts = spool.flush()
+            if any(counts.values()):
+                logger.info(f"Flushed newsletter signup spool: {counts}")
+        except Exception as e:
+            logger.error(f"Newsletter signup spool flush error: {str(e)}")
+        finally:
+            close_old_connections()
+        time.sleep(settings.NEWSLETTER_SPOOL_FLUSH_INTERVAL)
+
+
+def spool_enabled():
+    """Return True if signups should go through the spool."""
+    return getattr(settings, 'NEWSLETTER_SPOOL_ENABLED', False)
+
+
+def start_spool_flusher():
+    """Start the background flusher at server startup, so leftovers are replayed before the first signup."""
+    if spool_enabled():
+        get_spool()
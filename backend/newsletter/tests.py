@@ -0,0 +1,1042 @@
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, connection
+from django.urls import path, reverse
+from django.utils import timezone
+
+from wax_and_warmth.compression import accepted_encodings, negotiate_encoding
+from wax_and_warmth.static_files import parse_range, serve_file
+
+from . import async_views, db, spool, views
+from .analytics import rebuild_signup_rollup
+from .bulk import import_subscribers
+from .dedup import BloomFilter, get_email_filter, reset_email_filter
+from .metrics import reset_metrics
+from .pages import BACKEND_DIR, CSRF_PLACEHOLDER, clear_template_cache, get_page_template, get_rendered_page
+from .pagination import KeysetPaginator
+from .ratelimit import MemoryStore, reset_rate_limits
+from .search import filter_by_index, match_expression, search_index_available, search_subscriptions
+from .models import NewsletterSubscription, SignupRollup, SubscriptionCounter
+
+
+# URLconf for AsyncViewTests, routing to the native async views
+urlpatterns = [
+    path('about/', async_views.serve_html_file, {'filename': 'about.html'}),
+    path('sync/about/', views.serve_html_file, {'filename': 'about.html'}),
+    path('api/newsletter/subscribe/', async_views.newsletter_subscribe_api),
+    path('newsletter-stats/', async_views.newsletter_stats),
+]
+
+
+class SubscriptionCounterTests(TestCase):
+    """The maintained counters must always match a COUNT(*) of the table."""
+
+    def assertCountersAccurate(self):
+        actual = SubscriptionCounter.count_subscriptions()
+        counts = SubscriptionCounter.get_counts()
+        self.assertEqual(counts['active'], actual['active'])
+        self.assertEqual(counts['inactive'], actual['inactive'])
+        self.assertEqual(counts['total'], NewsletterSubscription.objects.count())
+
+    def setUp(self):
+        reset_rate_limits()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        for i in range(6):
+            NewsletterSubscription.objects.create(email=f'user{i}@example.com', is_active=i % 3 != 0)
+
+    def test_create_and_save(self):
+        self.assertEqual(SubscriptionCounter.get_counts(), {'total': 6, 'active': 4, 'inactive': 2})
+
+        subscription = NewsletterSubscription.objects.get(email='user1@example.com')
+        subscription.deactivate()
+        subscription.deactivate()
+        subscription.activate()
+        subscription.user_agent = 'test'
+        subscription.save()
+        self.assertCountersAccurate()
+
+        # Unsaved changes to is_active are not counted
+        subscription.is_active = False
+        subscription.save(update_fields=['user_agent'])
+        self.assertCountersAccurate()
+
+    def test_delete(self):
+        NewsletterSubscription.objects.get(email='user0@example.com').delete()
+        NewsletterSubscription.objects.filter(email__in=['user1@example.com', 'user3@example.com']).delete()
+        self.assertEqual(SubscriptionCounter.get_counts(), {'total': 3, 'active': 3, 'inactive': 0})
+        self.assertCountersAccurate()
+
+    def test_queryset_update_counts_only_flips(self):
+        updated = NewsletterSubscription.objects.all().update(is_active=True)
+        self.assertEqual(updated, 6)
+        self.assertEqual(SubscriptionCounter.get_counts(), {'total': 6, 'active': 6, 'inactive': 0})
+
+        NewsletterSubscription.objects.filter(email__in=['user0@example.com', 'user1@example.com']).update(
+            is_active=False, user_agent='bulk'
+        )
+        self.assertCountersAccurate()
+
+    def test_missing_counters_are_recounted(self):
+        SubscriptionCounter.objects.all().delete()
+        NewsletterSubscription.objects.create(email='new@example.com')
+        self.assertEqual(dict(SubscriptionCounter.objects.values_list('name', 'value')),
+                         {'active': 5, 'inactive': 2})
+
+    def test_bulk_import_and_signups(self):
+        counts = import_subscribers(['new1@example.com', 'user2@example.com', 'new2@example.com', 'bad'])
+        self.assertEqual(counts, {'created': 2, 'duplicate': 1, 'invalid': 1})
+
+        self.client.post(
+            reverse('newsletter:subscribe_api'),
+            data=json.dumps({'email': 'api@example.com'}),
+            content_type='application/json',
+        )
+        self.client.post(reverse('newsletter:subscribe'), {'email': 'form@example.com'})
+        self.client.post(reverse('newsletter:subscribe'), {'email': 'form@example.com'})
+        self.assertEqual(SubscriptionCounter.get_counts()['total'], 10)
+        self.assertCountersAccurate()
+
+    def test_admin_actions(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:newsletter_newslettersubscription_changelist')
+        pks = list(NewsletterSubscription.objects.values_list('pk', flat=True)[:4])
+
+        for action in ('deactivate_selected', 'activate_selected', 'deactivate_selected'):
+            self.client.post(url, {'action': action, '_selected_action': pks})
+            self.assertCountersAccurate()
+
+        self.client.post(url, {'action': 'delete_selected', '_selected_action': pks[:2], 'post': 'yes'})
+        self.assertEqual(NewsletterSubscription.objects.count(), 4)
+        self.assertCountersAccurate()
+
+        response = self.client.get(url)
+        self.assertEqual(response.context['summary_stats'], SubscriptionCounter.get_counts())
+
+    def test_stats_view(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('newsletter:stats'))
+        self.assertEqual(response.json(), {
+            'total_subscriptions': 6,
+            'active_subscriptions': 4,
+            'inactive_subscriptions': 2,
+        })
+
+    def test_reconcile(self):
+        SubscriptionCounter.objects.filter(name=SubscriptionCounter.ACTIVE).update(value=100)
+        drift = SubscriptionCounter.reconcile()
+        self.assertEqual(drift, {'active': -96, 'inactive': 0})
+        self.assertCountersAccurate()
+
+    def test_missing_counters_fall_back_to_counting(self):
+        SubscriptionCounter.objects.all().delete()
+        self.assertEqual(SubscriptionCounter.get_counts(), {'total': 6, 'active': 4, 'inactive': 2})
+
+
+class SubscriptionExportTests(TestCase):
+    """The admin CSV export must stream every matching row and stay staff-only."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        for i in range(5):
+            NewsletterSubscription.objects.create(email=f'user{i}@example.com', is_active=i % 2 == 0)
+        self.url = reverse('admin:newsletter_newslettersubscription_export')
+
+    def export(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_export_all(self):
+        self.client.force_login(self.admin)
+        rows = self.export(self.client.get(self.url))
+        self.assertEqual(rows[0], ['Email', 'Active', 'Subscribed At', 'IP Address'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row[0] for row in rows[1:]}, {f'user{i}@example.com' for i in range(5)})
+
+    def test_export_follows_changelist_filters(self):
+        self.client.force_login(self.admin)
+        rows = self.export(self.client.get(self.url, {'is_active__exact': '1'}))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row[1] for row in rows[1:]}, {'Yes'})
+
+        changelist = reverse('admin:newsletter_newslettersubscription_changelist')
+        pks = list(NewsletterSubscription.objects.values_list('pk', flat=True)[:2])
+        rows = self.export(self.client.post(changelist, {'action': 'export_as_csv', '_selected_action': pks}))
+        self.assertEqual(len(rows), 3)
+
+    def test_staff_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+
+        visitor = get_user_model().objects.create_user('visitor', password='password')
+        self.client.force_login(visitor)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+        # Staff without view permission on subscriptions are refused
+        staff = get_user_model().objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SignupAnalyticsTests(TestCase):
+    """The rollup must match the subscriptions and serve the analytics API."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.url = reverse('newsletter:analytics')
+        self.day = timezone.make_aware(datetime(2024, 3, 4, 10, 15))
+        for i in range(5):
+            NewsletterSubscription.objects.create(
+                email=f'user{i}@example.com', subscribed_at=self.day + timedelta(days=i, hours=i)
+            )
+        import_subscribers(['bulk@example.com'])
+
+    def series(self, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['buckets']
+
+    def test_daily_and_weekly_series(self):
+        buckets = self.series(interval='day', start='2024-03-04', end='2024-03-10')
+        self.assertEqual(len(buckets), 7)
+        self.assertEqual([b['signups'] for b in buckets], [1, 1, 1, 1, 1, 0, 0])
+
+        buckets = self.series(interval='week', start='2024-03-04', end='2024-03-17')
+        self.assertEqual([b['signups'] for b in buckets], [5, 0])
+
+        buckets = self.series(interval='hour', start='2024-03-04T10:00:00', end='2024-03-04T12:00:00')
+        self.assertEqual([b['signups'] for b in buckets], [1, 0])
+
+    def test_unsubscribe_and_resubscribe(self):
+        NewsletterSubscription.objects.get(email='user0@example.com').deactivate()
+        NewsletterSubscription.objects.filter(email__startswith='user').update(is_active=False)
+        NewsletterSubscription.objects.filter(email='user1@example.com').update(is_active=True)
+
+        today = timezone.localdate().isoformat()
+        cache.clear()
+        bucket, = self.series(interval='day', start=today, end=today)
+        self.assertEqual((bucket['signups'], bucket['unsubscribes'], bucket['resubscribes']), (1, 5, 1))
+        self.assertEqual(bucket['net'], -3)
+
+    def test_rebuild_matches_incremental(self):
+        expected = list(SignupRollup.objects.values_list('period', 'bucket', 'signups'))
+        SignupRollup.objects.all().delete()
+        self.assertEqual(rebuild_signup_rollup(chunk_size=2), 6)
+        self.assertCountEqual(SignupRollup.objects.values_list('period', 'bucket', 'signups'), expected)
+
+    def test_caching_and_access(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {'interval': 'month', 'start': '2020-01-01', 'end': '2024-12-31'})
+        self.assertEqual(len(response.json()['buckets']), 60)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(
+            self.url, {'interval': 'month', 'start': '2020-01-01', 'end': '2024-12-31'},
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_parameters(self):
+        self.client.force_login(self.admin)
+        for params in ({'interval': 'year'}, {'start': 'yesterday'}, {'start': '2024-02-01', 'end': '2024-01-01'},
+                       {'interval': 'hour', 'start': '2000-01-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """Seeking to a page must return the same rows as OFFSET pagination."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        now = timezone.now()
+        # Repeated timestamps, so ties are broken by the primary key
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(
+                email=f'user{i}@example.com', subscribed_at=now - timedelta(minutes=i // 3), is_active=i % 4 != 0
+            )
+            for i in range(40)
+        ])
+
+    def test_pages_match_offset_pagination(self):
+        for queryset in (
+            NewsletterSubscription.objects.order_by('-subscribed_at', '-pk'),
+            NewsletterSubscription.objects.filter(is_active=True).order_by('subscribed_at', 'pk'),
+        ):
+            expected = Paginator(queryset, 7, orphans=2)
+            paginator = KeysetPaginator(queryset, 7, orphans=2)
+            self.assertIsNotNone(paginator.seek_keys)
+            self.assertEqual(paginator.num_pages, expected.num_pages)
+            for number in expected.page_range:
+                self.assertEqual(list(paginator.page(number)), list(expected.page(number)))
+
+    def test_cursors_walk_the_pages(self):
+        queryset = NewsletterSubscription.objects.order_by('-subscribed_at', '-pk')
+        expected = Paginator(queryset, 7, orphans=2)
+        cursor, number = None, 1
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                rows = list(KeysetPaginator(queryset, 7, orphans=2, cursor=cursor).page(number))
+            self.assertEqual(rows, list(expected.page(number)))
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+            previous, cursor = KeysetPaginator(queryset, 7, orphans=2).page_cursors(number, rows)
+            if cursor is None:
+                break
+            number += 1
+        self.assertEqual(number, expected.num_pages)
+
+        while previous is not None:
+            number -= 1
+            paginator = KeysetPaginator(queryset, 7, orphans=2, cursor=previous)
+            rows = list(paginator.page(number))
+            self.assertEqual(rows, list(expected.page(number)))
+            previous, _ = paginator.page_cursors(number, rows)
+        self.assertEqual(number, 1)
+
+        # A cursor keeps its place when rows are added before it
+        first, second = list(queryset[:7]), list(queryset[7:14])
+        _, cursor = KeysetPaginator(queryset, 7).page_cursors(1, first)
+        NewsletterSubscription.objects.create(email='newest@example.com')
+        self.assertEqual(list(KeysetPaginator(queryset, 7, cursor=cursor).page(2)), second)
+        # A cursor for another page, or a mangled one, is ignored
+        self.assertEqual(list(KeysetPaginator(queryset, 7, cursor=cursor).page(3)), list(queryset[14:21]))
+        self.assertEqual(list(KeysetPaginator(queryset, 7, cursor='not a cursor').page(3)), list(queryset[14:21]))
+
+    def test_unsupported_ordering_falls_back_to_offset(self):
+        queryset = NewsletterSubscription.objects.order_by('-subscribed_at')
+        paginator = KeysetPaginator(queryset, 7)
+        self.assertIsNone(paginator.seek_keys)
+        self.assertEqual(list(paginator.page(3)), list(Paginator(queryset, 7).page(3)))
+
+    def test_changelist_uses_counters(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:newsletter_newslettersubscription_changelist')
+        response = self.client.get(url, {'is_active__exact': '1'})
+        self.assertEqual(response.context['cl'].result_count, 30)
+        self.assertIsInstance(response.context['cl'].paginator, KeysetPaginator)
+
+        response = self.client.get(url, {'q': 'user1'})
+        self.assertEqual(response.context['cl'].result_count, 11)
+
+    @override_settings(NEWSLETTER_ADMIN_KEYSET_PAGINATION=True)
+    def test_changelist_cursor_links(self):
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(email=f'more{i}@example.com') for i in range(60)
+        ])
+        self.client.force_login(self.admin)
+        url = reverse('admin:newsletter_newslettersubscription_changelist')
+        cl = self.client.get(url).context['cl']
+        self.assertIsNone(cl.previous_page_url)
+        first_page = list(cl.result_list)
+        response = self.client.get(url + cl.next_page_url)
+        self.assertContains(response, 'rel="prev"')
+        cl = response.context['cl']
+        self.assertEqual(cl.page_num, 2)
+        self.assertNotIn('cursor', cl.get_query_string({'p': 3}))
+        self.assertEqual(list(self.client.get(url + cl.previous_page_url).context['cl'].result_list), first_page)
+
+
+class SubscriptionSearchTests(TestCase):
+    """The trigram index must stay in sync and agree with LIKE searches."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        NewsletterSubscription.objects.create(email='alice@gmail.com', ip_address='10.0.0.1')
+        NewsletterSubscription.objects.create(email='bob@yahoo.com', ip_address='192.168.1.20')
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(email=f'user{i}@gmail.com') for i in range(3)
+        ])
+
+    def search(self, term):
+        results = search_subscriptions(NewsletterSubscription.objects.all(), term)
+        return sorted(results.values_list('email', flat=True))
+
+    def test_substring_and_domain_search(self):
+        self.assertEqual(len(self.search('gmail.')), 4)
+        self.assertEqual(self.search('ALICE'), ['alice@gmail.com'])
+        self.assertEqual(self.search('168.1'), ['bob@yahoo.com'])
+        self.assertEqual(self.search('user gmail'), ['user0@gmail.com', 'user1@gmail.com', 'user2@gmail.com'])
+        self.assertEqual(self.search('"bob@yahoo"'), ['bob@yahoo.com'])
+        self.assertIsNone(search_subscriptions(NewsletterSubscription.objects.all(), 'al'))
+        # Bare domains match too many rows for the index to beat a scan
+        for term in ('gmail.com', '@gmail.com', 'alice @mail.example.org'):
+            self.assertIsNone(search_subscriptions(NewsletterSubscription.objects.all(), term))
+        # The benchmark can still send them through the index for comparison
+        results = filter_by_index(NewsletterSubscription.objects.all(), match_expression('@gmail.com', bare_domains=True))
+        self.assertEqual(results.count(), 4)
+
+    def test_index_lookup_is_cached_per_connection(self):
+        self.assertTrue(search_index_available())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(search_index_available())
+        self.assertEqual(len(queries), 0)
+
+    def test_index_follows_writes(self):
+        subscription = NewsletterSubscription.objects.get(email='bob@yahoo.com')
+        subscription.email = 'robert@gmail.com'
+        subscription.save()
+        NewsletterSubscription.objects.filter(email='user0@gmail.com').delete()
+        NewsletterSubscription.objects.filter(email='alice@gmail.com').update(email='alice@outlook.com')
+
+        self.assertEqual(self.search('yahoo'), [])
+        self.assertEqual(self.search('@gmail'), ['robert@gmail.com', 'user1@gmail.com', 'user2@gmail.com'])
+        self.assertEqual(self.search('outlook'), ['alice@outlook.com'])
+
+    def test_admin_search_matches_like(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:newsletter_newslettersubscription_changelist')
+        for term in ('gmail.com', 'user1', '10.0', 'a'):
+            with self.settings(NEWSLETTER_ADMIN_FTS_SEARCH=True):
+                indexed = list(self.client.get(url, {'q': term}).context['cl'].result_list)
+            with self.settings(NEWSLETTER_ADMIN_FTS_SEARCH=False):
+                scanned = list(self.client.get(url, {'q': term}).context['cl'].result_list)
+            self.assertEqual(indexed, scanned)
+
+
+class DuplicateFilterTests(TestCase):
+    """Repeat signups must be rejected without an INSERT attempt."""
+
+    def setUp(self):
+        reset_email_filter()
+        reset_rate_limits()
+        NewsletterSubscription.objects.create(email='known@example.com')
+
+    def tearDown(self):
+        reset_email_filter()
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(f'member{i}@example.com')
+        self.assertTrue(all(f'member{i}@example.com' in bloom for i in range(5000)))
+        false_positives = sum(f'other{i}@example.com' in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_filter_grows_past_capacity(self):
+        email_filter = get_email_filter()
+        for i in range(email_filter.filters[0].capacity + 10):
+            email_filter.add(f'grow{i}@example.com')
+        self.assertEqual(len(email_filter.filters), 2)
+        self.assertTrue(email_filter.might_contain('grow0@example.com'))
+        self.assertTrue(email_filter.might_contain('known@example.com'))
+
+    def test_failed_load_is_retried(self):
+        def fail(execute, sql, params, many, context):
+            if 'newsletter_newslettersubscription' in sql:
+                raise DatabaseError('disk I/O error')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(fail), self.assertRaises(DatabaseError):
+            get_email_filter()
+        email_filter = get_email_filter()
+        self.assertTrue(email_filter.ready)
+        self.assertTrue(email_filter.might_contain('known@example.com'))
+
+    def signup(self, email):
+        return self.client.post(
+            reverse('newsletter:subscribe_api'),
+            data=json.dumps({'email': email}),
+            content_type='application/json',
+        )
+
+    def test_duplicate_signup_skips_the_write_path(self):
+        self.assertEqual(self.signup('new@example.com').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.signup('new@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('INSERT')])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.signup('another@example.com').status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if 'EXISTS' in q['sql'] or 'LIMIT 1' in q['sql']])
+
+    def test_deleted_subscriber_can_subscribe_again(self):
+        get_email_filter()
+        NewsletterSubscription.objects.filter(email='known@example.com').delete()
+        self.assertEqual(self.signup('known@example.com').status_code, 200)
+        self.assertTrue(NewsletterSubscription.objects.filter(email='known@example.com').exists())
+
+
+@override_settings(NEWSLETTER_SPOOL_ENABLED=True, NEWSLETTER_DUPLICATE_FILTER_ENABLED=False)
+class SpooledSignupTests(TestCase):
+    """Spooled signups must be answered like direct ones and replayed faithfully."""
+
+    def setUp(self):
+        reset_rate_limits()
+        self.directory = tempfile.TemporaryDirectory()
+        # Installed directly, so no background flusher is started
+        spool._spool = spool.SignupSpool(self.directory.name)
+        NewsletterSubscription.objects.create(email='active@example.com')
+        NewsletterSubscription.objects.create(email='gone@example.com', is_active=False)
+
+    def tearDown(self):
+        spool._spool = None
+        self.directory.cleanup()
+
+    def signup(self, email):
+        return self.client.post(reverse('newsletter:subscribe_api'), data=json.dumps({'email': email}),
+                                content_type='application/json')
+
+    def test_rejected_signups_are_not_spooled(self):
+        self.assertEqual(self.signup('active@example.com').status_code, 400)
+        self.assertEqual(self.signup('broken@example.').status_code, 400)
+        self.assertFalse(os.path.exists(spool._spool.path))
+
+    def test_replay_creates_and_reactivates(self):
+        self.assertEqual(self.signup('new@example.com').json()['queued'], True)
+        self.assertEqual(self.signup('gone@example.com').status_code, 200)
+        counts = spool._spool.flush()
+        self.assertEqual(counts, {'created': 1, 'reactivated': 1, 'duplicate': 0, 'invalid': 0})
+        self.assertTrue(NewsletterSubscription.objects.get(email='gone@example.com').is_active)
+        self.assertEqual(SubscriptionCounter.get_counts(), {'total': 3, 'active': 3, 'inactive': 0})
+
+    @override_settings(NEWSLETTER_SPOOL_ENABLED=False)
+    def test_direct_signup_reactivates(self):
+        response = self.signup('gone@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['subscription_id'],
+                         NewsletterSubscription.objects.get(email='gone@example.com').pk)
+        self.assertEqual(SubscriptionCounter.get_counts()['inactive'], 0)
+        self.assertEqual(self.signup('gone@example.com').status_code, 400)
+
+
+class RateLimitTests(TestCase):
+    """Signup endpoints must throttle per IP and per email with token buckets."""
+
+    def setUp(self):
+        reset_rate_limits()
+
+    def signup(self, email, ip='203.0.113.7'):
+        return self.client.post(
+            reverse('newsletter:subscribe_api'),
+            data=json.dumps({'email': email}),
+            content_type='application/json',
+            REMOTE_ADDR=ip,
+        )
+
+    def test_token_bucket_refills(self):
+        store = MemoryStore()
+        self.assertEqual(store.take('k', 1.0, 2, now=100.0), 0.0)
+        self.assertEqual(store.take('k', 1.0, 2, now=100.0), 0.0)
+        self.assertAlmostEqual(store.take('k', 1.0, 2, now=100.0), 1.0)
+        self.assertAlmostEqual(store.take('k', 1.0, 2, now=100.5), 0.5)
+        self.assertEqual(store.take('k', 1.0, 2, now=101.0), 0.0)
+
+    def test_memory_store_evicts_least_recently_used(self):
+        store = MemoryStore(max_keys=2)
+        for key in ('a', 'b'):
+            store.take(key, 1.0, 1, now=100.0)
+        # Touching "a" makes "b" the least recently used
+        self.assertGreater(store.take('a', 1.0, 1, now=100.0), 0)
+        store.take('c', 1.0, 1, now=100.0)
+        self.assertEqual(list(store._buckets), ['a', 'c'])
+        # "a" is still throttled, "b" starts over with a full bucket
+        self.assertGreater(store.take('a', 1.0, 1, now=100.0), 0)
+        self.assertEqual(store.take('b', 1.0, 1, now=100.0), 0.0)
+        self.assertEqual(list(store._buckets), ['a', 'b'])
+
+    def test_per_ip_limit(self):
+        limits = {'subscribe_api': [{'key': 'ip', 'rate': '2/m', 'burst': 2}]}
+        for store in ('memory', 'cache'):
+            cache.clear()
+            with self.settings(NEWSLETTER_RATE_LIMITS=limits, NEWSLETTER_RATE_LIMIT_STORE=store):
+                self.assertEqual(self.signup(f'{store}1@example.com').status_code, 200)
+                self.assertEqual(self.signup(f'{store}2@example.com').status_code, 200)
+                response = self.signup(f'{store}3@example.com')
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(response['Retry-After'], '30')
+                self.assertEqual(self.signup(f'{store}3@example.com', ip='198.51.100.1').status_code, 200)
+
+    def test_forwarded_for_cannot_dodge_limit(self):
+        limits = {'subscribe_api': [{'key': 'ip', 'rate': '2/m', 'burst': 2}]}
+        with self.settings(NEWSLETTER_RATE_LIMITS=limits):
+            statuses = [
+                self.client.post(
+                    reverse('newsletter:subscribe_api'), data=json.dumps({'email': f'rotate{i}@example.com'}),
+                    content_type='application/json', REMOTE_ADDR='203.0.113.7',
+                    HTTP_X_FORWARDED_FOR=f'10.0.0.{i}',
+                ).status_code
+                for i in range(3)
+            ]
+            self.assertEqual(statuses, [200, 200, 429])
+
+            # Behind one proxy the client is the entry it appended, not the forged ones before it
+            reset_rate_limits()
+            with self.settings(NEWSLETTER_TRUSTED_PROXY_COUNT=1):
+                statuses = [
+                    self.client.post(
+                        reverse('newsletter:subscribe_api'), data=json.dumps({'email': f'proxied{i}@example.com'}),
+                        content_type='application/json', REMOTE_ADDR='10.1.1.1',
+                        HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 198.51.100.{9 if i < 3 else 10}',
+                    ).status_code
+                    for i in range(4)
+                ]
+            self.assertEqual(statuses, [200, 200, 429, 200])
+
+    def test_per_email_limit(self):
+        limits = {'subscribe': [{'key': 'email', 'rate': '1/h', 'burst': 1}]}
+        with self.settings(NEWSLETTER_RATE_LIMITS=limits):
+            url = reverse('newsletter:subscribe')
+            self.assertEqual(self.client.post(url, {'email': 'Same@example.com'}).status_code, 302)
+            response = self.client.post(url, {'email': 'same@example.com '}, REMOTE_ADDR='198.51.100.2')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Content-Type'], 'text/plain')
+            self.assertEqual(self.client.post(url, {'email': 'other@example.com'}).status_code, 302)
+
+    def test_disabled(self):
+        limits = {'subscribe_api': [{'key': 'ip', 'rate': '1/h', 'burst': 1}]}
+        with self.settings(NEWSLETTER_RATE_LIMITS=limits, NEWSLETTER_RATE_LIMIT_ENABLED=False):
+            for i in range(3):
+                self.assertEqual(self.signup(f'user{i}@example.com').status_code, 200)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    """The async views must behave like their sync counterparts."""
+
+    def setUp(self):
+        reset_email_filter()
+        reset_rate_limits()
+
+    def tearDown(self):
+        reset_email_filter()
+
+    async def signup(self, email):
+        return await self.async_client.post(
+            '/api/newsletter/subscribe/', data=json.dumps({'email': email}), content_type='application/json',
+        )
+
+    async def test_subscribe_api(self):
+        response = await self.signup('Async@Example.com')
+        self.assertEqual(response.status_code, 200)
+        subscription = await NewsletterSubscription.objects.aget(email='async@example.com')
+        self.assertEqual(response.json()['subscription_id'], subscription.pk)
+
+        response = await self.signup('async@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already subscribed', response.json()['message'])
+        self.assertEqual((await self.signup('not-an-email')).status_code, 400)
+        self.assertEqual((await self.async_client.get('/api/newsletter/subscribe/')).status_code, 405)
+
+    async def test_subscribe_api_rate_limit(self):
+        limits = {'subscribe_api': [{'key': 'ip', 'rate': '1/h', 'burst': 1}]}
+        with self.settings(NEWSLETTER_RATE_LIMITS=limits):
+            self.assertEqual((await self.signup('first@example.com')).status_code, 200)
+            response = await self.signup('second@example.com')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+
+    async def test_stats(self):
+        self.assertEqual((await self.async_client.get('/newsletter-stats/')).status_code, 403)
+        staff = await get_user_model().objects.acreate(username='staff', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        await NewsletterSubscription.objects.acreate(email='one@example.com')
+        response = await self.async_client.get('/newsletter-stats/')
+        self.assertEqual(response.json(), {
+            'total_subscriptions': 1, 'active_subscriptions': 1, 'inactive_subscriptions': 0,
+        })
+
+    async def test_page_matches_sync_view(self):
+        for frozen in (False, True):
+            with self.settings(HTML_TEMPLATE_CACHE_FROZEN=frozen):
+                async_response = await self.async_client.get('/about/')
+                sync_response = await self.async_client.get('/sync/about/')
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(async_response.content, sync_response.content)
+
+
+class RequestMetricsTests(TestCase):
+    """Every request must be timed into the metrics and a Server-Timing header."""
+
+    def setUp(self):
+        reset_metrics()
+        self.staff = get_user_model().objects.create(username='staff', is_staff=True)
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.staff)
+        # The stats view loads the user itself
+        response = self.client.get(reverse('newsletter:stats'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        clear_template_cache()
+        response = self.client.get(reverse('newsletter:about'), HTTP_X_SERVER_TIMING='1')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    def test_server_timing_does_not_load_the_user(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('newsletter:about'))
+        # Pages that never look at the user cost no session or user queries
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('newsletter:about'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_hidden_from_visitors(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('newsletter:about')))
+        self.assertNotIn('Server-Timing', self.client.get(reverse('newsletter:about'), HTTP_X_SERVER_TIMING='1'))
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('newsletter:about')))
+
+    async def test_async_server_timing_for_staff_only(self):
+        url = reverse('newsletter:about')
+        self.assertNotIn('Server-Timing', await self.async_client.get(url, headers={'X-Server-Timing': '1'}))
+        await self.async_client.aforce_login(self.staff)
+        self.assertNotIn('Server-Timing', await self.async_client.get(url))
+        self.assertIn('Server-Timing', await self.async_client.get(url, headers={'X-Server-Timing': '1'}))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('newsletter:about'))
+        self.client.get(reverse('newsletter:about'))
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.client.get(reverse('newsletter:metrics')).status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('newsletter:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('wax_and_warmth_request_duration_seconds_count{view="newsletter:about"} 2', body)
+        self.assertIn('wax_and_warmth_request_duration_seconds_bucket{view="newsletter:about",le="+Inf"} 2', body)
+        self.assertIn('wax_and_warmth_responses_total{view="<unmatched>",status="4xx"} 1', body)
+        self.assertRegex(body, r'wax_and_warmth_response_bytes_total\{view="newsletter:about"\} [1-9]\d*')
+
+    def test_metrics_token(self):
+        with self.settings(NEWSLETTER_METRICS_TOKEN='s3cret'):
+            url = reverse('newsletter:metrics')
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    """Staff can profile a request on demand; nobody else can trigger it."""
+
+    def setUp(self):
+        self.staff = get_user_model().objects.create(username='staff', is_staff=True)
+
+    def test_only_staff_can_profile(self):
+        response = self.client.get(reverse('newsletter:about'), {'profile': '1'})
+        self.assertEqual(response['Content-Type'], 'text/html')
+        self.client.force_login(get_user_model().objects.create(username='user'))
+        response = self.client.get(reverse('newsletter:about'), HTTP_X_PROFILE='1')
+        self.assertEqual(response['Content-Type'], 'text/html')
+
+    def test_text_profile(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('newsletter:stats'), {'profile': '1', 'profile_sort': 'tottime'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('GET /newsletter-stats/?profile=1&profile_sort=tottime -> 200 in '))
+        self.assertIn('Ordered by: internal time', body)
+        # Cheap functions can crowd the view out of the top by internal time, not by cumulative time
+        body = self.client.get(reverse('newsletter:stats'), {'profile': '1'}).content.decode()
+        self.assertIn('Ordered by: cumulative time', body)
+        self.assertIn('newsletter_stats', body)
+
+    def test_saved_profiles_are_pruned(self):
+        self.client.force_login(self.staff)
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(NEWSLETTER_PROFILE_DIR=directory, NEWSLETTER_PROFILE_RETENTION=2):
+                names = []
+                for _ in range(3):
+                    response = self.client.get(reverse('newsletter:stats'), HTTP_X_PROFILE='save')
+                    self.assertEqual(response['Content-Type'], 'application/json')
+                    names.append(response['X-Profile'])
+                self.assertEqual(sorted(os.listdir(directory)), names[1:])
+
+    async def test_text_profile_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('newsletter:stats'), {'profile': 'text'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('function calls', response.content.decode())
+
+
+class PageFileMixin:
+    """Serves a throwaway HTML page that tests can rewrite."""
+
+    def setUp(self):
+        clear_template_cache()
+        # Pages are looked up next to manage.py, so the test page lives there
+        file = tempfile.NamedTemporaryFile('w', dir=BACKEND_DIR, prefix='test-page-', suffix='.html', delete=False)
+        file.close()
+        self.path = file.name
+        self.filename = os.path.basename(file.name)
+
+    def tearDown(self):
+        os.remove(self.path)
+        clear_template_cache()
+
+    def write(self, html, mtime_ns=None):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(html)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+
+class PageCacheTests(PageFileMixin, TestCase):
+    """Compiled pages must be reused until their file changes."""
+
+    def test_template_follows_file_changes(self):
+        self.write('<p>one</p>', mtime_ns=10 ** 18)
+        template = get_page_template(self.path)
+        self.assertIs(get_page_template(self.path), template)
+
+        # Same mtime, new size
+        self.write('<p>three</p>', mtime_ns=10 ** 18)
+        template = get_page_template(self.path)
+        self.assertEqual(template.source, '<p>three</p>')
+
+        # Same size, new mtime
+        self.write('<p>seven</p>', mtime_ns=2 * 10 ** 18)
+        self.assertEqual(get_page_template(self.path).source, '<p>seven</p>')
+        self.assertIsNot(get_page_template(self.path), template)
+
+
+class RenderedPageTests(PageFileMixin, TestCase):
+    """Pages rendered once must still get a fresh CSRF token per request."""
+
+    def serve(self):
+        request = RequestFactory().get('/page/')
+        return views.serve_html_file(request, self.filename).content.decode()
+
+    def test_csrf_token_is_spliced_per_request(self):
+        self.write('<form method="post">{% csrf_token %}<button>Go</button></form>')
+        page = get_rendered_page(self.path)
+        self.assertEqual(len(page.segments), 2)
+        self.assertEqual(page.variants, {})
+
+        first, second = self.serve(), self.serve()
+        self.assertIs(get_rendered_page(self.path), page)
+        tokens = [re.search(r'name="csrfmiddlewaretoken" value="(\w+)"', html).group(1) for html in (first, second)]
+        self.assertNotEqual(tokens[0], tokens[1])
+        self.assertNotIn(CSRF_PLACEHOLDER, first + second)
+        self.assertEqual(first.replace(tokens[0], ''), second.replace(tokens[1], ''))
+
+    def test_request_tags_render_per_request(self):
+        self.write('<p>{{ request.path }}</p>')
+        self.assertIsNone(get_rendered_page(self.path))
+        self.assertEqual(self.serve(), '<p>/page/</p>')
+
+    def test_pages_without_token_are_precompressed(self):
+        self.write('<p>static</p>' * 100)
+        page = get_rendered_page(self.path)
+        self.assertEqual(len(page.segments), 1)
+        self.assertIn('gzip', page.variants)
+
+
+class StaticFileTests(TestCase):
+    """Static files must honour single byte ranges and reject unsatisfiable ones."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=95-200', 100), (95, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-9'):
+            self.assertIsNone(parse_range(header, 100), header)
+        for header in ('bytes=100-', 'bytes=9-5', 'bytes=-0'):
+            self.assertIs(parse_range(header, 100), False, header)
+        # Nothing of an empty file can be served
+        for header in ('bytes=-10', 'bytes=0-', 'bytes=0-0'):
+            self.assertIs(parse_range(header, 0), False, header)
+
+    def test_range_responses(self):
+        path = self.write('data.txt', b'0123456789')
+        response = serve_file(self.factory.get('/data.txt', HTTP_RANGE='bytes=2-4'), path)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+
+        response = serve_file(self.factory.get('/data.txt', HTTP_RANGE='bytes=-3'), path)
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = serve_file(self.factory.get('/data.txt', HTTP_RANGE='bytes=10-'), path)
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        # A stale If-Range gets the whole file
+        response = serve_file(self.factory.get('/data.txt', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"old"'), path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertNotIn('Content-Disposition', response)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        response.close()
+
+    def test_empty_file_range(self):
+        path = self.write('empty.txt', b'')
+        response = serve_file(self.factory.get('/empty.txt', HTTP_RANGE='bytes=-5'), path)
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+
+
+
+@override_settings(SQLITE_WRITE_LOCK=True)
+class SerializedWriteTests(TransactionTestCase):
+    """serialized_write must begin IMMEDIATE transactions under the lock and nest without deadlocking."""
+
+    def setUp(self):
+        # What the production profile's OPTIONS['transaction_mode'] configures
+        self.addCleanup(setattr, connection, 'transaction_mode', connection.transaction_mode)
+        connection.transaction_mode = 'IMMEDIATE'
+
+    def test_begins_immediate_transaction(self):
+        with CaptureQueriesContext(connection) as queries:
+            with db.serialized_write():
+                self.assertTrue(db._write_lock.locked())
+                NewsletterSubscription.objects.create(email='lock@example.com')
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+        self.assertFalse(db._write_lock.locked())
+
+    def test_reentrant(self):
+        with db.serialized_write():
+            NewsletterSubscription.objects.create(email='outer@example.com')
+            with CaptureQueriesContext(connection) as queries:
+                # The nested block runs in a savepoint instead of waiting on the lock
+                with db.serialized_write():
+                    NewsletterSubscription.objects.create(email='inner@example.com')
+            self.assertTrue(queries.captured_queries[0]['sql'].startswith('SAVEPOINT'))
+            self.assertTrue(db._write_lock.locked())
+        self.assertFalse(db._write_lock.locked())
+        self.assertEqual(NewsletterSubscription.objects.count(), 2)
+
+    def test_lock_released_on_error(self):
+        with self.assertRaises(ValueError):
+            with db.serialized_write():
+                NewsletterSubscription.objects.create(email='rollback@example.com')
+                raise ValueError
+        self.assertFalse(db._write_lock.locked())
+        self.assertFalse(NewsletterSubscription.objects.exists())
+
+
+class EncodingNegotiationTests(TestCase):
+    """Accept-Encoding negotiation must honour explicit q=0 refusals, also against "*"."""
+
+    def negotiate(self, header, available=('br', 'gzip')):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+        return negotiate_encoding(request, dict.fromkeys(available, 'variant'))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings(''), (set(), set()))
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), ({'gzip', 'deflate', 'br'}, set()))
+        self.assertEqual(accepted_encodings('GZIP;q=0.5, br;q=0'), ({'gzip'}, {'br'}))
+        self.assertEqual(accepted_encodings('*, gzip;q=0'), ({'*'}, {'gzip'}))
+        self.assertEqual(accepted_encodings('gzip;q=bogus'), (set(), {'gzip'}))
+        # An explicit refusal wins over a repeated acceptance
+        self.assertEqual(accepted_encodings('gzip, gzip;q=0'), (set(), {'gzip'}))
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(self.negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(self.negotiate('gzip'), 'gzip')
+        self.assertEqual(self.negotiate('gzip', available=('br',)), None)
+        self.assertEqual(self.negotiate('identity'), None)
+        self.assertEqual(self.negotiate(''), None)
+        self.assertEqual(self.negotiate('br', available=()), None)
+
+    def test_wildcard_respects_refusals(self):
+        self.assertEqual(self.negotiate('*'), 'br')
+        self.assertEqual(self.negotiate('*, br;q=0'), 'gzip')
+        self.assertEqual(self.negotiate('*, br;q=0, gzip;q=0'), None)
+        self.assertEqual(self.negotiate('*;q=0'), None)
+        self.assertEqual(self.negotiate('gzip, *;q=0'), 'gzip')
+
+
+class CompressStaticTests(TestCase):
+    """compress_static must not recompress files whose variants were skipped as not smaller."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def compress(self):
+        out = StringIO()
+        call_command('compress_static', root=self.directory.name, workers=1, stdout=out)
+        return re.search(r'Compressed (\d+) file', out.getvalue()).group(1)
+
+    def test_skipped_variants_are_remembered(self):
+        text = self.write('text.js', b'console.log("warmth");\n' * 100)
+        noise = self.write('noise.js', os.urandom(4096))
+        self.assertEqual(self.compress(), '2')
+        self.assertTrue(os.path.exists(text + '.gz'))
+        self.assertFalse(os.path.exists(noise + '.gz'))
+        self.assertEqual(self.compress(), '0')
+
+        # A changed file is compressed again
+        stat = os.stat(noise)
+        os.utime(noise, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.compress(), '1')
+        self.assertEqual(self.compress(), '0')
+
+
+class CollectStaticTests(TestCase):
+    """collectstatic must collect only site assets and produce the hashed page URLs."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(clear_template_cache)
+        # Unresolved url() references in style.css are logged, not fatal
+        storage_logger = logging.getLogger('wax_and_warmth.storage')
+        self.addCleanup(storage_logger.setLevel, storage_logger.level)
+        storage_logger.setLevel(logging.ERROR)
+
+    def test_collectstatic(self):
+        static_root = self.directory.name
+        with override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(static_root, 'staticfiles.json')) as f:
+                paths = json.load(f)['paths']
+            self.assertRegex(paths['style.css'], r'^style\.[0-9a-f]{12}\.css$')
+            self.assertIn('script.js', paths)
+            self.assertTrue(any(name.startswith('images/') for name in paths))
+            # Nothing outside the site's assets is collected
+            self.assertFalse(os.path.exists(os.path.join(static_root, 'backend')))
+            site_names = [name for name in paths if not name.startswith('admin/')]
+            self.assertFalse(any(name.endswith(('.html', '.py', '.sqlite3', '.md')) for name in site_names))
+
+            clear_template_cache()
+            response = self.client.get(reverse('newsletter:home'))
+            self.assertContains(response, f'href="/static/{paths["style.css"]}"')
+            self.assertNotContains(response, 'href="/style.css"')
+
+            response = self.client.get(f'/static/{paths["style.css"]}')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('immutable', response['Cache-Control'])
+            response.close()
+            # Only asset types are served, even when present in STATIC_ROOT
+            self.assertEqual(self.client.get('/static/staticfiles.json').status_code, 404)
+            self.assertEqual(self.client.get('/static/../backend/db.sqlite3').status_code, 404)
@@ -1,28 +1,35 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'newsletter'
 
+# Under ASGI the pages, subscribe API and stats can run natively async
+hot_views = async_views if settings.NEWSLETTER_ASYNC_VIEWS else views
+
 urlpatterns = [
     # HTML page serving
-    path('', views.home_view, name='home'),
-    path('about/', lambda request: views.serve_html_file(request, 'about.html'), name='about'),
-    path('shop/', lambda request: views.serve_html_file(request, 'shop.html'), name='shop'),
-    path('blog/', lambda request: views.serve_html_file(request, 'blog.html'), name='blog'),
-    path('contact/', lambda request: views.serve_html_file(request, 'contact.html'), name='contact'),
-    path('cart/', lambda request: views.serve_html_file(request, 'cart.html'), name='cart'),
-    path('sproduct/', lambda request: views.serve_html_file(request, 'sproduct.html'), name='sproduct'),
-    path('debug/', lambda request: views.serve_html_file(request, 'debug.html'), name='debug'),
-    path('mobile-access/', lambda request: views.serve_html_file(request, 'mobile-access.html'), name='mobile_access'),
+    path('', hot_views.home_view, name='home'),
+    path('about/', hot_views.serve_html_file, {'filename': 'about.html'}, name='about'),
+    path('shop/', hot_views.serve_html_file, {'filename': 'shop.html'}, name='shop'),
+    path('blog/', hot_views.serve_html_file, {'filename': 'blog.html'}, name='blog'),
+    path('contact/', hot_views.serve_html_file, {'filename': 'contact.html'}, name='contact'),
+    path('cart/', hot_views.serve_html_file, {'filename': 'cart.html'}, name='cart'),
+    path('sproduct/', hot_views.serve_html_file, {'filename': 'sproduct.html'}, name='sproduct'),
+    path('debug/', hot_views.serve_html_file, {'filename': 'debug.html'}, name='debug'),
+    path('mobile-access/', hot_views.serve_html_file, {'filename': 'mobile-access.html'}, name='mobile_access'),
     
     # Newsletter subscription endpoints
     path('newsletter-signup/', views.newsletter_subscribe, name='subscribe'),
     path('newsletter-login/', views.newsletter_subscribe, name='subscribe_alt'),  # Alternative URL for form action
-    path('api/newsletter/subscribe/', views.newsletter_subscribe_api, name='subscribe_api'),
+    path('api/newsletter/subscribe/', hot_views.newsletter_subscribe_api, name='subscribe_api'),
+    path('api/newsletter/bulk-import/', views.newsletter_bulk_import, name='bulk_import'),  # Staff only
     
     # Newsletter unsubscription
     path('newsletter-unsubscribe/', views.newsletter_unsubscribe, name='unsubscribe'),
     
     # Stats endpoint (admin only)
-    path('newsletter-stats/', views.newsletter_stats, name='stats'),
+    path('newsletter-stats/', hot_views.newsletter_stats, name='stats'),
+    path('newsletter-metrics/', views.newsletter_metrics, name='metrics'),
+    path('api/newsletter/analytics/', views.newsletter_analytics, name='analytics'),
 ]
\ No newline at end of file
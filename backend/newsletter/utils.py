@@ -0,0 +1,23 @@
+"""
+Request helpers shared by the newsletter views and rate limiting.
+"""
+
+from django.conf import settings
+
+
+def get_client_ip(request):
+    """
+    Get the client's IP address from the request.
+
+    Without trusted proxies this is REMOTE_ADDR: X-Forwarded-For is set by
+    the client and cannot be believed. Each of the
+    NEWSLETTER_TRUSTED_PROXY_COUNT proxies in front of the site appends the
+    address it was reached from, so the client is that many entries from
+    the right; anything further left may be forged.
+    """
+    proxies = settings.NEWSLETTER_TRUSTED_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= proxies and forwarded[-proxies]:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
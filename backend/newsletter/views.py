@@ -1,16 +1,34 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.template import RequestContext
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+import hashlib
 import json
 import logging
 import os
 
-from .models import NewsletterSubscription
+from wax_and_warmth.compression import negotiate_encoding
+
+from .analytics import resolve_range, signup_series
+from .bulk import import_subscribers, is_valid_email, iter_csv_emails, iter_json_emails, reactivate_subscription
+from .db import serialized_write
+from .dedup import duplicate_filter_enabled, is_existing_subscriber
+from .metrics import render_prometheus, timed_template
+from .models import NewsletterSubscription, SubscriptionCounter
+from .pages import get_page_template, get_rendered_page, resolve_html_path
+from .ratelimit import rate_limit
+from .spool import get_spool, spool_enabled
+from .utils import get_client_ip
 
 
 logger = logging.getLogger(__name__)
@@ -18,35 +36,26 @@ logger = logging.getLogger(__name__)
 
 def serve_html_file(request, filename):
     """Serve HTML files with Django template processing."""
-    from django.template.loader import get_template
-    from django.template import Template, Context
     from django.http import HttpResponse
-    import os
-    
-    # Define the path to the HTML files (parent directory of backend)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    html_file_path = os.path.join(base_dir, filename)
     
-    # Check if file exists
-    if not os.path.exists(html_file_path):
-        # Try alternative path
-        alt_path = os.path.join(os.path.dirname(base_dir), filename)
-        if os.path.exists(alt_path):
-            html_file_path = alt_path
-        else:
-            return JsonResponse({
-                'error': 'File not found', 
-                'tried_paths': [html_file_path, alt_path]
-            }, status=404)
+    # Locate the HTML file (the parent directory of backend)
+    html_file_path, tried_paths = resolve_html_path(filename)
+    if html_file_path is None:
+        return JsonResponse({
+            'error': 'File not found', 
+            'tried_paths': tried_paths
+        }, status=404)
     
-    # Read the HTML file
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    # Serve the pre-rendered page, splicing in the CSRF token if it needs one
+    page = get_rendered_page(html_file_path)
+    if page is not None:
+        return rendered_page_response(request, page)
     
-    # Create a template from the HTML content
-    template = Template(html_content)
+    # Fetch the compiled template from the process-wide cache
+    template = get_page_template(html_file_path)
     
     # Create context with request and CSRF token
+    from django.template import Context
     from django.template.context_processors import csrf
     context = Context({
         'request': request,
@@ -54,27 +63,39 @@ def serve_html_file(request, filename):
     })
     
     # Render the template
-    rendered_html = template.render(context)
+    with timed_template():
+        rendered_html = template.render(context)
     
     return HttpResponse(rendered_html, content_type='text/html')
 
 
+def rendered_page_response(request, page):
+    """Build the response for a pre-rendered page."""
+    if len(page.segments) > 1:
+        from django.middleware.csrf import get_token
+        with timed_template():
+            token = get_token(request).encode('ascii')
+            content = token.join(page.segments)
+        return HttpResponse(content, content_type='text/html')
+    
+    # Pages without a token are sent precompressed when the client allows
+    from django.utils.cache import patch_vary_headers
+    encoding = negotiate_encoding(request, page.variants)
+    response = HttpResponse(page.variants.get(encoding, page.segments[0]), content_type='text/html')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if page.variants:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
 def home_view(request):
     """Serve the index.html file."""
     return serve_html_file(request, 'index.html')
 
 
-def get_client_ip(request):
-    """Get the client's IP address from the request."""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
 @require_http_methods(["GET", "POST"])
+@rate_limit('subscribe')
 def newsletter_subscribe(request):
     """Handle newsletter subscription requests."""
     
@@ -97,8 +118,8 @@ def newsletter_subscribe(request):
                 messages.error(request, 'Email address is required.')
                 return redirect('/')
         
-        # Validate email format
-        if '@' not in email or '.' not in email:
+        # Validate email format, as strictly as the spool replay does
+        if not is_valid_email(email):
             if request.headers.get('Content-Type') == 'application/json':
                 return JsonResponse({
                     'success': False,
@@ -108,17 +129,45 @@ def newsletter_subscribe(request):
                 messages.error(request, 'Please enter a valid email address.')
                 return redirect('/')
         
+        # Known subscribers are answered with a read, without an INSERT attempt;
+        # in spooled mode this is the only duplicate check before acknowledging
+        if (duplicate_filter_enabled() or spool_enabled()) and is_existing_subscriber(email):
+            if request.headers.get('Content-Type') == 'application/json':
+                return JsonResponse({
+                    'success': False,
+                    'message': 'This email is already subscribed to our newsletter.'
+                }, status=400)
+            else:
+                messages.warning(request, 'This email is already subscribed to our newsletter.')
+                return redirect('/')
+        
         # Get additional data
         ip_address = get_client_ip(request)
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         
+        # In spooled mode the signup is written to the database later
+        if spool_enabled():
+            get_spool().append(email, ip_address, user_agent)
+            request.session['newsletter_email'] = email
+            logger.info(f"Spooled newsletter subscription: {email}")
+            
+            if request.headers.get('Content-Type') == 'application/json':
+                return JsonResponse({
+                    'success': True,
+                    'message': 'Successfully subscribed to our newsletter!'
+                })
+            else:
+                messages.success(request, 'Successfully subscribed to our newsletter!')
+                return redirect('/')
+        
         # Try to create the subscription
         try:
-            subscription = NewsletterSubscription.objects.create(
-                email=email,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
+            with serialized_write():
+                subscription = NewsletterSubscription.objects.create(
+                    email=email,
+                    ip_address=ip_address,
+                    user_agent=user_agent
+                )
             
             # Store email in session for display purposes
             request.session['newsletter_email'] = email
@@ -135,6 +184,18 @@ def newsletter_subscribe(request):
                 return redirect('/')
                 
         except IntegrityError:
+            # An address that unsubscribed is subscribed again
+            if reactivate_subscription(email) is not None:
+                request.session['newsletter_email'] = email
+                logger.info(f"Reactivated newsletter subscription: {email}")
+                if request.headers.get('Content-Type') == 'application/json':
+                    return JsonResponse({
+                        'success': True,
+                        'message': 'Successfully subscribed to our newsletter!'
+                    })
+                messages.success(request, 'Successfully subscribed to our newsletter!')
+                return redirect('/')
+            
             # Email already exists
             if request.headers.get('Content-Type') == 'application/json':
                 return JsonResponse({
@@ -160,6 +221,7 @@ def newsletter_subscribe(request):
 
 @csrf_exempt
 @require_POST
+@rate_limit('subscribe_api')
 def newsletter_subscribe_api(request):
     """API endpoint for newsletter subscription (JSON)."""
     
@@ -174,24 +236,44 @@ def newsletter_subscribe_api(request):
                 'message': 'Email address is required.'
             }, status=400)
         
-        # Validate email format
-        if '@' not in email or '.' not in email:
+        # Validate email format, as strictly as the spool replay does
+        if not is_valid_email(email):
             return JsonResponse({
                 'success': False,
                 'message': 'Please enter a valid email address.'
             }, status=400)
         
+        # Known subscribers are answered with a read, without an INSERT attempt;
+        # in spooled mode this is the only duplicate check before acknowledging
+        if (duplicate_filter_enabled() or spool_enabled()) and is_existing_subscriber(email):
+            return JsonResponse({
+                'success': False,
+                'message': 'This email is already subscribed to our newsletter.'
+            }, status=400)
+        
         # Get additional data
         ip_address = get_client_ip(request)
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         
+        # In spooled mode the signup is written to the database later
+        if spool_enabled():
+            get_spool().append(email, ip_address, user_agent)
+            logger.info(f"Spooled newsletter subscription via API: {email}")
+            
+            return JsonResponse({
+                'success': True,
+                'message': 'Successfully subscribed to our newsletter!',
+                'queued': True
+            })
+        
         # Try to create the subscription
         try:
-            subscription = NewsletterSubscription.objects.create(
-                email=email,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
+            with serialized_write():
+                subscription = NewsletterSubscription.objects.create(
+                    email=email,
+                    ip_address=ip_address,
+                    user_agent=user_agent
+                )
             
             logger.info(f"New newsletter subscription via API: {email}")
             
@@ -202,6 +284,15 @@ def newsletter_subscribe_api(request):
             })
             
         except IntegrityError:
+            # An address that unsubscribed is subscribed again
+            subscription_id = reactivate_subscription(email)
+            if subscription_id is not None:
+                logger.info(f"Reactivated newsletter subscription via API: {email}")
+                return JsonResponse({
+                    'success': True,
+                    'message': 'Successfully subscribed to our newsletter!',
+                    'subscription_id': subscription_id
+                })
             return JsonResponse({
                 'success': False,
                 'message': 'This email is already subscribed to our newsletter.'
@@ -221,6 +312,58 @@ def newsletter_subscribe_api(request):
         }, status=500)
 
 
+@require_POST
+def newsletter_bulk_import(request):
+    """Staff-only bulk subscription import from a JSON array or a CSV upload."""
+    
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    import codecs
+    
+    try:
+        # Pick the email source without loading CSV input into memory
+        if 'file' in request.FILES:
+            lines = codecs.iterdecode(request.FILES['file'], 'utf-8-sig')
+            emails = iter_csv_emails(lines)
+        elif request.content_type == 'text/csv':
+            emails = iter_csv_emails(codecs.iterdecode(request, 'utf-8-sig'))
+        else:
+            data = json.loads(request.body)
+            if isinstance(data, dict):
+                data = data.get('emails', [])
+            if not isinstance(data, list):
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Expected a JSON array of email addresses.'
+                }, status=400)
+            emails = iter_json_emails(data)
+        
+        counts = import_subscribers(
+            emails,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
+        
+        logger.info(f"Bulk newsletter import: {counts}")
+        
+        return JsonResponse({'success': True, **counts})
+        
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid JSON or CSV data.'
+        }, status=400)
+        
+    except Exception as e:
+        logger.error(f"Newsletter bulk import error: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'message': 'An error occurred. Please try again later.'
+        }, status=500)
+
+
+@rate_limit('unsubscribe')
 def newsletter_unsubscribe(request):
     """Handle newsletter unsubscription."""
     
@@ -230,7 +373,8 @@ def newsletter_unsubscribe(request):
         if email:
             try:
                 subscription = NewsletterSubscription.objects.get(email=email)
-                subscription.deactivate()
+                with serialized_write():
+                    subscription.deactivate()
                 
                 messages.success(request, 'Successfully unsubscribed from our newsletter.')
                 logger.info(f"Newsletter unsubscription: {email}")
@@ -250,12 +394,54 @@ def newsletter_stats(request):
     if not request.user.is_staff:
         return JsonResponse({'error': 'Access denied'}, status=403)
     
-    total_subscriptions = NewsletterSubscription.objects.count()
-    active_subscriptions = NewsletterSubscription.objects.filter(is_active=True).count()
-    inactive_subscriptions = NewsletterSubscription.objects.filter(is_active=False).count()
+    counts = SubscriptionCounter.get_counts()
     
     return JsonResponse({
-        'total_subscriptions': total_subscriptions,
-        'active_subscriptions': active_subscriptions,
-        'inactive_subscriptions': inactive_subscriptions
-    })
\ No newline at end of file
+        'total_subscriptions': counts['total'],
+        'active_subscriptions': counts['active'],
+        'inactive_subscriptions': counts['inactive']
+    })
+
+
+@require_GET
+def newsletter_metrics(request):
+    """Request metrics in the Prometheus text format (admin use, or a scraper holding the token)."""
+    
+    token = settings.NEWSLETTER_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(authorization, f'Bearer {token}')) and not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def newsletter_analytics(request):
+    """Signups and churn per hour/day/week/month (admin use)."""
+    
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    interval = request.GET.get('interval', 'day')
+    try:
+        start, end = resolve_range(interval, request.GET.get('start'), request.GET.get('end'))
+        cache_key = f'newsletter-analytics:{interval}:{start:%Y%m%d%H}:{end:%Y%m%d%H}'
+        body = cache.get(cache_key)
+        if body is None:
+            body = json.dumps({
+                'interval': interval,
+                'start': timezone.make_aware(start).isoformat(),
+                'end': timezone.make_aware(end).isoformat(),
+                'buckets': signup_series(interval, start, end),
+            })
+            cache.set(cache_key, body, settings.NEWSLETTER_ANALYTICS_CACHE_TIMEOUT)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    etag = '"%s"' % hashlib.md5(body.encode('utf-8'), usedforsecurity=False).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=settings.NEWSLETTER_ANALYTICS_CACHE_TIMEOUT)
+    return response
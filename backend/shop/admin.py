@@ -0,0 +1,127 @@
+from django.contrib import admin
+
+from .models import Order, OrderLine, Product
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    """Admin interface for the product catalog."""
+    
+    list_display = [
+        'name',
+        'category',
+        'price',
+        'stock',
+        'featured',
+        'is_active',
+        'sort_order',
+        'updated_at',
+    ]
+    
+    list_editable = [
+        'price',
+        'featured',
+        'is_active',
+        'sort_order',
+    ]
+    
+    list_filter = [
+        'category',
+        'featured',
+        'is_active',
+    ]
+    
+    search_fields = [
+        'name',
+        'slug',
+        'description',
+    ]
+    
+    prepopulated_fields = {'slug': ('name',)}
+    
+    readonly_fields = [
+        'created_at',
+        'updated_at',
+    ]
+    
+    list_per_page = 100
+    
+    fieldsets = (
+        ('Product', {
+            'fields': ('name', 'slug', 'category', 'description', 'image', 'note')
+        }),
+        ('Pricing', {
+            'fields': ('price', 'rating')
+        }),
+        ('Stock', {
+            'fields': ('stock',),
+            'description': 'Saving adds or removes the units you changed it by, '
+                           'so units reserved by checkouts meanwhile stay reserved.',
+        }),
+        ('Listing', {
+            'fields': ('is_active', 'featured', 'sort_order')
+        }),
+        ('Metadata', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    actions = ['feature_selected', 'unfeature_selected']
+    
+    def feature_selected(self, request, queryset):
+        """Show the selected products on the home page."""
+        updated = queryset.update(featured=True)
+        self.message_user(request, f'{updated} product(s) are now featured.')
+    feature_selected.short_description = "Feature selected products"
+    
+    def unfeature_selected(self, request, queryset):
+        """Remove the selected products from the home page."""
+        updated = queryset.update(featured=False)
+        self.message_user(request, f'{updated} product(s) are no longer featured.')
+    unfeature_selected.short_description = "Unfeature selected products"
+
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    fields = ['product', 'quantity', 'unit_price']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders; their status only changes through shop.reservations."""
+    
+    list_display = [
+        'reference',
+        'status',
+        'total',
+        'created_at',
+        'expires_at',
+        'completed_at',
+    ]
+    
+    list_filter = [
+        'status',
+    ]
+    
+    search_fields = [
+        'reference',
+    ]
+    
+    readonly_fields = list_display
+    
+    inlines = [OrderLineInline]
+    
+    list_per_page = 100
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
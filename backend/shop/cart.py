@@ -0,0 +1,151 @@
+"""
+Server-side shopping carts, kept in the session.
+
+A cart is stored as {product id: quantity} under CART_SESSION_KEY, so reading
+and saving it costs the session's own query whatever its size. Names, images
+and prices come from the in-memory catalog snapshot and are never taken from
+the client; products that are no longer listed drop out when the cart is
+priced. A batch of operations is applied in full or, if any is invalid, not
+at all.
+"""
+
+from decimal import Decimal
+from importlib import import_module
+
+from django.conf import settings
+
+
+CART_SESSION_KEY = 'cart'
+
+OPERATIONS = ('add', 'set', 'remove', 'clear')
+
+MAX_OPERATIONS = 100
+MAX_ITEMS = 50
+MAX_QUANTITY = 99
+
+CENT = Decimal('0.01')
+
+
+def get_cart(session):
+    """Return a copy of the session's cart as {product id (str): quantity}."""
+    return dict(session.get(CART_SESSION_KEY, {}))
+
+
+def save_cart(session, cart):
+    """Store cart in the session, dropping the key when it is empty."""
+    if cart:
+        session[CART_SESSION_KEY] = cart
+    elif CART_SESSION_KEY in session:
+        del session[CART_SESSION_KEY]
+
+
+def clear_stored_cart(session_key):
+    """Empty the cart of another visitor's stored session, if it still has one."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    if CART_SESSION_KEY in session:
+        del session[CART_SESSION_KEY]
+        session.save()
+
+
+def find_product(catalog, reference):
+    """Return the listed product with this id (int) or slug (str), or None."""
+    if isinstance(reference, bool):
+        return None
+    if isinstance(reference, int):
+        return catalog.by_id.get(reference)
+    if isinstance(reference, str):
+        return catalog.by_slug.get(reference)
+    return None
+
+
+def apply_operations(cart, operations, catalog):
+    """
+    Return a new cart with operations applied in order.
+
+    Each operation is {"op": "add" | "set" | "remove", "product": id or slug,
+    "quantity": n} or {"op": "clear"}. "add" defaults to one more; "set" to 0
+    removes the product. Raises ValueError naming the first invalid
+    operation, in which case nothing is applied.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError(f'At most {MAX_OPERATIONS} operations per request')
+
+    cart = dict(cart)
+    for index, operation in enumerate(operations):
+        try:
+            apply_operation(cart, operation, catalog)
+        except ValueError as error:
+            raise ValueError(f'operations[{index}]: {error}') from None
+    if len(cart) > MAX_ITEMS:
+        raise ValueError(f'A cart holds at most {MAX_ITEMS} different products')
+    return cart
+
+
+def apply_operation(cart, operation, catalog):
+    """Apply one operation to cart in place."""
+    if not isinstance(operation, dict):
+        raise ValueError('must be an object')
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"op must be one of: {', '.join(OPERATIONS)}")
+    if op == 'clear':
+        cart.clear()
+        return
+
+    product = find_product(catalog, operation.get('product'))
+    if product is None:
+        raise ValueError('unknown product')
+    key = str(product['id'])
+    if op == 'remove':
+        cart.pop(key, None)
+        return
+
+    quantity = operation.get('quantity', 1 if op == 'add' else None)
+    if not isinstance(quantity, int) or isinstance(quantity, bool):
+        raise ValueError('quantity must be an integer')
+    if op == 'add':
+        if quantity < 1:
+            raise ValueError('quantity must be at least 1')
+        quantity += cart.get(key, 0)
+    elif quantity < 0:
+        raise ValueError('quantity must not be negative')
+    if quantity > MAX_QUANTITY:
+        raise ValueError(f'at most {MAX_QUANTITY} of a product')
+
+    if quantity:
+        cart[key] = quantity
+    else:
+        cart.pop(key, None)
+
+
+def price_cart(cart, catalog):
+    """
+    Return (the API representation of cart, ids of products no longer listed).
+
+    Amounts are computed in Decimal from the catalog prices.
+    """
+    items = []
+    missing = []
+    subtotal = Decimal(0)
+    count = 0
+    for key, quantity in cart.items():
+        product = catalog.by_id.get(int(key))
+        if product is None:
+            missing.append(int(key))
+            continue
+        unit_price = Decimal(str(product['price']))
+        line_total = (unit_price * quantity).quantize(CENT)
+        subtotal += line_total
+        count += quantity
+        items.append({
+            'product_id': product['id'],
+            'slug': product['slug'],
+            'name': product['name'],
+            'image': product['image'],
+            'unit_price': float(unit_price),
+            'quantity': quantity,
+            'line_total': float(line_total),
+        })
+    return {'items': items, 'item_count': count, 'subtotal': float(subtotal)}, missing
@@ -0,0 +1,178 @@
+"""
+Versioned in-memory snapshot of the product catalog for the read API.
+
+Each process loads every listed product with one query into a
+CatalogSnapshot. API responses are serialized once per snapshot and query
+(body, ETag and a gzip variant) and then served from memory, as are the most
+recently used search results and product pages. Product writes drop the snapshot when they
+commit. Other processes notice a change within SHOP_CATALOG_RECHECK_INTERVAL
+seconds by comparing the product count and the latest updated_at with those
+recorded when their snapshot was built.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from wax_and_warmth.compression import MIN_COMPRESS_SIZE, compress
+
+from .models import Product
+
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'variants'])
+
+PRODUCT_FIELDS = (
+    'id', 'slug', 'name', 'description', 'price', 'category', 'image', 'note', 'rating', 'featured',
+)
+
+# Search responses and product pages kept per snapshot, least recently used
+# dropped first
+SEARCH_CACHE_SIZE = 1000
+PAGE_CACHE_SIZE = 500
+
+
+def serialize_product(values):
+    """Turn a Product.values() row into its API representation."""
+    product = dict(values)
+    product['price'] = float(product['price'])
+    if product['rating'] is not None:
+        product['rating'] = float(product['rating'])
+    return product
+
+
+class CatalogSnapshot:
+    """Immutable view of the listed products, with memoized API responses."""
+
+    def __init__(self, products, marker):
+        # (product count, latest updated_at) when the snapshot was read
+        self.marker = marker
+        self.products = products
+        self.by_id = {product['id']: product for product in products}
+        self.by_slug = {product['slug']: product for product in products}
+        self.categories = sorted({product['category'] for product in products})
+        # Derived from the content, so every process agrees on it
+        serialized = json.dumps(products, sort_keys=True, separators=(',', ':'))
+        self.version = hashlib.md5(serialized.encode('utf-8'), usedforsecurity=False).hexdigest()[:16]
+        self._responses = {}
+        self._searches = RecentResponses(SEARCH_CACHE_SIZE)
+        self._pages = RecentResponses(PAGE_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def filter(self, category=None, featured=None):
+        """Return the products in category and/or with the given featured flag."""
+        return [
+            product for product in self.products
+            if (category is None or product['category'] == category)
+            and (featured is None or product['featured'] == featured)
+        ]
+
+    def response(self, key, build):
+        """Return the CachedResponse for key, serializing build() on first use."""
+        cached = self._responses.get(key)
+        if cached is None:
+            cached = cache_response(json_body(build()))
+            with self._lock:
+                cached = self._responses.setdefault(key, cached)
+        return cached
+
+    def search_response(self, key, build):
+        """
+        response() for search results, keeping only the SEARCH_CACHE_SIZE
+        most recently used, as there is no end to possible queries.
+        """
+        return self._searches.get(key, lambda: json_body(build()))
+
+    def page_response(self, key, render):
+        """Return the CachedResponse of a product page, from render() (bytes) on first use."""
+        return self._pages.get(key, render)
+
+
+class RecentResponses:
+    """The most recently used CachedResponses, up to size of them."""
+
+    def __init__(self, size):
+        self.size = size
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        """Return the CachedResponse for key, from render() (bytes) if it is not kept."""
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+        cached = cache_response(render())
+        with self._lock:
+            self._responses[key] = cached
+            if len(self._responses) > self.size:
+                self._responses.popitem(last=False)
+        return cached
+
+
+def json_body(data):
+    """Serialize API data compactly."""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def cache_response(body):
+    """Wrap a response body in a CachedResponse, with a gzip variant if it is worth it."""
+    digest = hashlib.md5(body, usedforsecurity=False).hexdigest()
+    variants = {}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        compressed = compress(body, 'gzip')
+        if len(compressed) < len(body):
+            variants['gzip'] = compressed
+    return CachedResponse(body, digest, variants)
+
+
+def catalog_marker():
+    """Return the (count, latest updated_at) pair that changes with every product write."""
+    values = Product.objects.order_by().aggregate(count=Count('id'), updated=Max('updated_at'))
+    return values['count'], values['updated']
+
+
+def build_catalog():
+    """Read the listed products into a new CatalogSnapshot."""
+    marker = catalog_marker()
+    rows = Product.objects.filter(is_active=True).values(*PRODUCT_FIELDS)
+    return CatalogSnapshot([serialize_product(row) for row in rows], marker)
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return this process's catalog snapshot, rebuilding it if it is missing or stale."""
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    interval = settings.SHOP_CATALOG_RECHECK_INTERVAL
+    if snapshot is not None and (interval is None or time.monotonic() - _checked_at < interval):
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        now = time.monotonic()
+        if snapshot is not None:
+            if interval is None or now - _checked_at < interval:
+                # Another thread rechecked or rebuilt it meanwhile
+                return snapshot
+            _checked_at = now
+            if catalog_marker() == snapshot.marker:
+                return snapshot
+        snapshot = _snapshot = build_catalog()
+        _checked_at = now
+        return snapshot
+
+
+def invalidate_catalog():
+    """Drop this process's snapshot; the next request rebuilds it."""
+    global _snapshot
+    _snapshot = None
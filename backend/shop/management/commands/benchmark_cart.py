@@ -0,0 +1,82 @@
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from newsletter.benchmarking import QueryCounter, summarize, throwaway_database, time_calls
+from shop.cart import MAX_ITEMS
+from shop.catalog import get_catalog, invalidate_catalog
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the cart API at growing cart sizes, showing its queries per request stay constant.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, MAX_ITEMS],
+                            help=f'Products in the cart (default: 1 10 {MAX_ITEMS})')
+        parser.add_argument('--iterations', type=int, default=500,
+                            help='Timed requests per measurement (default: 500)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+        if max(options['sizes']) > MAX_ITEMS:
+            raise CommandError(f'A cart holds at most {MAX_ITEMS} products.')
+
+        with throwaway_database():
+            Product.objects.all().delete()
+            Product.objects.bulk_create(
+                Product(name=f'Bench Candle {i}', price=Decimal(99 + i), category='candles', sort_order=i)
+                for i in range(MAX_ITEMS)
+            )
+            get_catalog()
+            self.run(options)
+        invalidate_catalog()
+
+    def run(self, options):
+        url = reverse('shop:cart')
+        product_ids = [product['id'] for product in get_catalog().products]
+        self.stdout.write(f"{'cart size':<10}{'request':<22}{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for size in sorted(options['sizes']):
+            client = Client(HTTP_HOST='localhost')
+            ids = product_ids[:size]
+            fill = json.dumps({'operations': [{'op': 'set', 'product': pk, 'quantity': 1} for pk in ids]})
+            client.post(url, fill, content_type='application/json')
+
+            # Alternate quantities so every batch changes, and saves, the cart
+            batches = [
+                json.dumps({'operations': [{'op': 'set', 'product': pk, 'quantity': 1 + i % 2} for pk in ids]})
+                for i in range(2)
+            ]
+            single = [json.dumps({'operations': [{'op': 'set', 'product': ids[0], 'quantity': 1 + i % 2}]})
+                      for i in range(2)]
+            requests = [
+                ('GET cart', lambda: client.get(url)),
+                (f'POST {size} operation(s)', self.poster(client, url, batches)),
+                ('POST 1 operation', self.poster(client, url, single)),
+            ]
+            for label, send in requests:
+                send()
+                with QueryCounter() as counter:
+                    samples = time_calls(send, options['iterations'])
+                summary = summarize(samples)
+                self.stdout.write(
+                    f"{size:<10}{label:<22}{summary['p50_ms']:>9.3f}{summary['p99_ms']:>9.3f}"
+                    f"{counter.count / options['iterations']:>9.2f}"
+                )
+
+    def poster(self, client, url, bodies):
+        """Return a function posting the bodies in turn."""
+        state = {'next': 0}
+
+        def send():
+            body = bodies[state['next'] % len(bodies)]
+            state['next'] += 1
+            response = client.post(url, body, content_type='application/json')
+            if response.status_code != 200:
+                raise CommandError(f'Cart request failed: {response.content!r}')
+        return send
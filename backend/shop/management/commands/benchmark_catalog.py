@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import JsonResponse
+from django.test import Client, RequestFactory
+
+from newsletter.benchmarking import QueryCounter, summarize, throwaway_database, time_calls
+from shop.catalog import PRODUCT_FIELDS, invalidate_catalog, serialize_product
+from shop.models import Product
+from shop.views import product_detail, product_list
+
+
+CATEGORIES = ['candles', 'latte', 'gifts', 'decor', 'seasonal']
+
+
+def uncached_product_list(request):
+    """The list endpoint without the snapshot: query and serialize per request."""
+    rows = Product.objects.filter(is_active=True).values(*PRODUCT_FIELDS)
+    return JsonResponse({'products': [serialize_product(row) for row in rows]})
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the product API from the in-memory catalog snapshot against querying per request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, nargs='+', default=[50, 1000],
+                            help='Catalog sizes to benchmark at (default: 50 1000)')
+        parser.add_argument('--iterations', type=int, default=2000,
+                            help='Timed requests per measurement (default: 2000)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+
+        with throwaway_database():
+            for count in sorted(options['products']):
+                self.build_fixture(count)
+                self.run_size(count, options['iterations'])
+        invalidate_catalog()
+
+    def build_fixture(self, count):
+        Product.objects.all().delete()
+        Product.objects.bulk_create(
+            Product(
+                name=f'Bench Product {i}', price=Decimal(99 + i % 400), category=CATEGORIES[i % len(CATEGORIES)],
+                description='Hand-poured soy wax candle with a cotton wick. ' * 3,
+                image=f'products/bench-{i}.jpg', rating=Decimal('4.5'), featured=i % 10 == 0, sort_order=i,
+            )
+            for i in range(count)
+        )
+
+    def run_size(self, count, iterations):
+        factory = RequestFactory()
+        plain = factory.get('/api/products/')
+        gzipped = factory.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        filtered = factory.get('/api/products/', {'category': 'latte', 'featured': 'true'})
+        product = Product.objects.filter(is_active=True).last()
+        detail = factory.get(f'/api/products/{product.slug}/')
+
+        invalidate_catalog()
+        etag = product_list(plain)['ETag']
+        conditional = factory.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        size = len(product_list(plain).content)
+        gzip_size = len(product_list(gzipped).content)
+
+        self.stdout.write(f'\n{count} products ({size} byte list, {gzip_size} gzipped)')
+        self.report('uncached list', lambda: uncached_product_list(plain), iterations // 10)
+
+        def rebuild():
+            invalidate_catalog()
+            product_list(plain)
+        self.report('snapshot rebuild', rebuild, max(10, iterations // 100))
+
+        self.report('list', lambda: product_list(plain), iterations)
+        self.report('list gzip', lambda: product_list(gzipped), iterations)
+        self.report('list filtered', lambda: product_list(filtered), iterations)
+        self.report('list 304', lambda: product_list(conditional), iterations)
+        self.report('detail by slug', lambda: product_detail(detail, slug=product.slug), iterations)
+
+        client = Client()
+        self.report('list, full stack', lambda: client.get('/api/products/'), iterations // 4)
+
+    def report(self, label, func, iterations):
+        for _ in range(min(10, iterations)):
+            func()
+        with QueryCounter() as counter:
+            samples = time_calls(func, iterations)
+        summary = summarize(samples)
+        self.stdout.write(
+            f"{label:<20} p50 {summary['p50_ms']:7.3f} ms  p99 {summary['p99_ms']:7.3f} ms  "
+            f"{summary['throughput']:9.0f} req/s  {counter.count / iterations:.2f} queries"
+        )
@@ -0,0 +1,87 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+
+from newsletter.benchmarking import QueryCounter, summarize, throwaway_database, time_calls
+from newsletter.pages import clear_template_cache
+from shop.catalog import PAGE_CACHE_SIZE, cache_response, get_catalog, invalidate_catalog
+from shop.models import Product
+from shop.pages import get_product_template, render_product_page
+from shop.views import product_page
+
+
+class Command(BaseCommand):
+    help = 'Benchmark server-rendered product pages: template compile, cold renders and cached hits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=PAGE_CACHE_SIZE * 2,
+                            help=f'Products in the fixture, each requested once cold (default: {PAGE_CACHE_SIZE * 2})')
+        parser.add_argument('--iterations', type=int, default=2000,
+                            help='Timed requests per warm measurement (default: 2000)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+
+        with throwaway_database():
+            Product.objects.all().delete()
+            Product.objects.bulk_create(
+                Product(name=f'Bench Candle {i}', description='Hand-poured soy wax candle with a cotton wick. ' * 4,
+                        price=Decimal(99 + i % 400), category='candles', image='/products/heartcandle.jpg',
+                        sort_order=i)
+                for i in range(options['products'])
+            )
+            self.run(options)
+        invalidate_catalog()
+        clear_template_cache()
+
+    def run(self, options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        catalog = get_catalog()
+        products = catalog.products
+        self.stdout.write(f'{len(products)} products')
+
+        def compile_page():
+            clear_template_cache()
+            return get_product_template()
+        self.report('compile page templates', time_calls(compile_page, 50, warmup=2))
+
+        template = get_product_template()
+        self.report('render only', time_calls(lambda: render_product_page(template, products[0]), iterations, warmup=10))
+        self.report('render + gzip', time_calls(lambda: cache_response(render_product_page(template, products[0])), 200, warmup=5))
+
+        # More products than the page cache holds, so each first request is a miss
+        requests = [(factory.get(f"/product/{product['slug']}/"), product['slug']) for product in products]
+        samples = []
+        with QueryCounter() as counter:
+            for request, slug in requests:
+                start = time.perf_counter()
+                product_page(request, slug=slug)
+                samples.append(time.perf_counter() - start)
+        self.report('view, cold', samples, counter.count / len(samples))
+
+        request, slug = requests[-1]
+        response = product_page(request, slug=slug)
+        conditional = factory.get(request.path, HTTP_IF_NONE_MATCH=response['ETag'])
+        gzipped = factory.get(request.path, HTTP_ACCEPT_ENCODING='gzip')
+        with QueryCounter() as counter:
+            samples = time_calls(lambda: product_page(request, slug=slug), iterations)
+        self.report('view, warm', samples, counter.count / iterations)
+        self.report('view, warm gzip', time_calls(lambda: product_page(gzipped, slug=slug), iterations))
+        self.report('view, 304', time_calls(lambda: product_page(conditional, slug=slug), iterations))
+
+        client = Client(HTTP_HOST='localhost')
+        self.report('full stack, warm', time_calls(lambda: client.get(request.path), iterations // 4, warmup=5))
+        self.report('full stack, sproduct.html', time_calls(lambda: client.get('/sproduct/'), iterations // 4, warmup=5))
+        self.stdout.write(f"Page size: {len(response.content)} bytes")
+
+    def report(self, label, samples, queries=None):
+        summary = summarize(samples)
+        line = f"{label:<28} p50 {summary['p50_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms"
+        if queries is not None:
+            line += f'  {queries:.2f} queries'
+        self.stdout.write(line)
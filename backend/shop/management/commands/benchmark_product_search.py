@@ -0,0 +1,117 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from newsletter.benchmarking import summarize, throwaway_database, time_calls
+from shop.catalog import get_catalog, invalidate_catalog
+from shop.models import Product
+from shop.search import SUGGEST_COLUMNS, install_search_index, search_products
+from shop.views import product_autocomplete
+
+
+SCENTS = ['heart', 'peony', 'lavender', 'vanilla', 'rose', 'jasmine', 'sandalwood', 'citrus', 'amber', 'cedar',
+          'coconut', 'honey', 'mint', 'spiced', 'ocean', 'berry', 'caramel', 'mocha', 'hazelnut', 'cinnamon']
+KINDS = ['candle', 'latte', 'jar', 'tealight', 'pillar', 'diffuser', 'gift set', 'wax melt', 'votive', 'mug']
+CATEGORIES = ['candles', 'latte', 'gifts', 'decor', 'seasonal']
+
+# (label, query, autocomplete?)
+QUERIES = [
+    ('suggest "l"', 'l', True),
+    ('suggest "la"', 'la', True),
+    ('suggest "lav"', 'lav', True),
+    ('suggest "lavender ca"', 'lavender ca', True),
+    ('search "candle"', 'candle', False),
+    ('search "lavender candle"', 'lavender candle', False),
+    ('search "honey jar gift"', 'honey jar gift', False),
+    ('search description word', None, False),
+    ('search no match', 'zzzzqx', False),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark product search and autocomplete on the FTS5 index against scanning the catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, nargs='+', default=[10000, 100000],
+                            help='Catalog sizes to benchmark at (default: 10000 100000)')
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Timed FTS5 searches per query (default: 200)')
+        parser.add_argument('--scan-iterations', type=int, default=5,
+                            help='Timed catalog scans per query (default: 5)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark builds its fixture in a throwaway SQLite database.')
+
+        with throwaway_database():
+            for count in sorted(options['products']):
+                word = self.build_fixture(count)
+                self.run_size(count, word, options)
+        invalidate_catalog()
+
+    def build_fixture(self, count):
+        """Fill the products table with count generated products; returns a word from a description."""
+        rng = random.Random(count)
+        vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9)))
+                      for _ in range(3000)]
+        Product.objects.all().delete()
+        start = time.perf_counter()
+        batch = []
+        for i in range(count):
+            scent, second, kind = rng.choice(SCENTS), rng.choice(SCENTS), rng.choice(KINDS)
+            batch.append(Product(
+                name=f'{scent.title()} {second} {kind} {i}', slug=f'bench-{i}',
+                description=' '.join(rng.choice(vocabulary) for _ in range(rng.randint(10, 40))),
+                price=Decimal(99 + i % 400), category=rng.choice(CATEGORIES),
+                rating=Decimal('4.5'), sort_order=i,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        self.stdout.write(f'\n{count} products: inserted with the index in {time.perf_counter() - start:.2f}s')
+
+        start = time.perf_counter()
+        install_search_index(connection)
+        self.stdout.write(f'Full index rebuild: {time.perf_counter() - start:.2f}s')
+        return Product.objects.order_by('?').values_list('description', flat=True).first().split()[0]
+
+    def run_size(self, count, word, options):
+        start = time.perf_counter()
+        get_catalog()
+        self.stdout.write(f'Catalog snapshot for the scan: {time.perf_counter() - start:.2f}s')
+
+        self.stdout.write(f"{'query':<26}{'FTS5 p50':>10}{'p99 ms':>9}{'scan p50 ms':>13}{'results':>9}")
+        for label, query, suggest in QUERIES:
+            query = query or word
+            columns = SUGGEST_COLUMNS if suggest else None
+            limit = 8 if suggest else 21
+
+            def search():
+                return search_products(query, limit=limit, columns=columns)
+            results = len(search())
+            fts = summarize(time_calls(search, options['iterations'], warmup=3))
+            with override_settings(SHOP_SEARCH_FTS=False):
+                scan = summarize(time_calls(search, options['scan_iterations'], warmup=1))
+            self.stdout.write(
+                f"{label:<26}{fts['p50_ms']:>10.3f}{fts['p99_ms']:>9.3f}{scan['p50_ms']:>13.1f}{results:>9}"
+            )
+
+        # Repeated queries are answered from the snapshot's search cache
+        request = RequestFactory().get('/api/products/autocomplete/', {'q': 'l'})
+        view = summarize(time_calls(lambda: product_autocomplete(request), options['iterations'] * 10, warmup=1))
+        self.stdout.write(f"autocomplete view \"l\", repeated: p50 {view['p50_ms']:.3f} ms, p99 {view['p99_ms']:.3f} ms")
+
+        # One product write, with the triggers updating its index row
+        product = Product.objects.order_by('?').first()
+
+        def rename():
+            product.name = f'Renamed {time.perf_counter_ns()}'
+            product.save(update_fields=['name', 'updated_at'])
+        write = summarize(time_calls(rename, 50, warmup=2))
+        self.stdout.write(f"Product save (index updated by trigger): p50 {write['p50_ms']:.3f} ms")
+        invalidate_catalog()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from shop.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the reserved stock of orders whose reservation has expired (what the background sweeper does).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Orders expired per transaction (default: SHOP_RESERVATION_SWEEP_BATCH)')
+
+    def handle(self, *args, **options):
+        released = release_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released the stock of {released} expired order(s)'))
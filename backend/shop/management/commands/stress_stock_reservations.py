@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import override_settings
+
+from newsletter.benchmarking import throwaway_database
+from shop.catalog import get_catalog, invalidate_catalog
+from shop.models import Order, OrderLine, Product
+from shop.reservations import cancel_order, confirm_order, release_expired, reserve
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress stock reservations with concurrent checkout threads and a sweeper on a throwaway '
+        'SQLite database, checking that no unit is oversold or lost.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16,
+                            help='Concurrent checkout threads (default: 16)')
+        parser.add_argument('--checkouts', type=int, default=300,
+                            help='Checkouts per thread (default: 300)')
+        parser.add_argument('--products', type=int, default=3,
+                            help='Products on sale (default: 3)')
+        parser.add_argument('--stock', type=int, default=1000,
+                            help='Units of each product (default: 1000)')
+        parser.add_argument('--ttl', type=float, default=0.5,
+                            help='Seconds a reservation is held (default: 0.5)')
+        parser.add_argument('--sweep-interval', type=float, default=0.1,
+                            help='Seconds between sweeps of expired reservations (default: 0.1)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This stress test runs on a throwaway SQLite database.')
+
+        # The test's own sweeper runs instead of the lazily started one
+        with throwaway_database(), override_settings(SHOP_RESERVATION_SWEEP_INTERVAL=None):
+            Product.objects.all().delete()
+            Product.objects.bulk_create(
+                Product(name=f'Flash Sale Candle {i}', price=Decimal(499), category='candles',
+                        stock=options['stock'], sort_order=i)
+                for i in range(options['products'])
+            )
+            ok = self.run(options)
+            connections.close_all()
+        invalidate_catalog()
+        if not ok:
+            raise CommandError('Stock was oversold or lost')
+
+    def run(self, options):
+        catalog = get_catalog()
+        ids = [product['id'] for product in catalog.products]
+        initial = dict(Product.objects.values_list('pk', 'stock'))
+        ttl = options['ttl']
+        self.stdout.write(
+            f"Profile {settings.DB_PROFILE!r}: {options['threads']} checkout threads x {options['checkouts']} "
+            f"checkouts of 1-2 products, {len(ids)} products x {options['stock']} units, "
+            f"{ttl}s reservations swept every {options['sweep_interval']}s"
+        )
+
+        def checkout(thread_index):
+            rng = random.Random(thread_index)
+            counts = Counter()
+            for _ in range(options['checkouts']):
+                cart = {str(pk): rng.randint(1, 3) for pk in rng.sample(ids, rng.randint(1, min(2, len(ids))))}
+                try:
+                    order, short = reserve(cart, catalog, ttl=ttl)
+                    if order is None:
+                        counts['sold out'] += 1
+                        continue
+                    counts['reserved'] += 1
+                    # Most customers pay, some cancel, the rest walk away
+                    roll = rng.random()
+                    if roll < 0.6:
+                        counts['confirmed' if confirm_order(order) else 'confirmed too late'] += 1
+                    elif roll < 0.8:
+                        counts['cancelled' if cancel_order(order) else 'cancelled too late'] += 1
+                    else:
+                        counts['abandoned'] += 1
+                except OperationalError as e:
+                    counts['locked' if 'locked' in str(e) else 'failed'] += 1
+                except Exception:
+                    counts['failed'] += 1
+            connections.close_all()
+            return counts
+
+        stop = threading.Event()
+        sweeps = Counter()
+
+        def sweep():
+            while not stop.wait(options['sweep_interval']):
+                try:
+                    sweeps['expired'] += release_expired()
+                    sweeps['sweeps'] += 1
+                except OperationalError as e:
+                    sweeps['locked' if 'locked' in str(e) else 'failed'] += 1
+            connections.close_all()
+
+        sweeper = threading.Thread(target=sweep, name='stress-sweeper')
+        sweeper.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(checkout, range(options['threads'])))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        sweeper.join()
+
+        # Let the last reservations run out, then sweep them
+        time.sleep(ttl)
+        sweeps['expired'] += release_expired()
+
+        counts = sum(results, Counter())
+        attempts = options['threads'] * options['checkouts']
+        self.stdout.write(
+            f"{attempts} checkouts in {elapsed:.2f}s ({attempts / elapsed:.0f}/s): "
+            f"{counts['reserved']} reserved ({counts['reserved'] / elapsed:.0f}/s), {counts['sold out']} sold out"
+        )
+        self.stdout.write(
+            f"Reserved orders: {counts['confirmed']} confirmed ({counts['confirmed too late']} too late), "
+            f"{counts['cancelled']} cancelled, {counts['abandoned']} abandoned; "
+            f"sweeper expired {sweeps['expired']} in {sweeps['sweeps']} sweeps"
+        )
+        locked = counts['locked'] + sweeps['locked']
+        failed = counts['failed'] + sweeps['failed']
+        self.stdout.write(f"{locked} 'database is locked' error(s), {failed} other error(s)")
+
+        left = dict(Product.objects.values_list('pk', 'stock'))
+        sold = dict(
+            OrderLine.objects.filter(order__status=Order.CONFIRMED).order_by()
+            .values_list('product_id').annotate(units=Sum('quantity'))
+        )
+        pending = Order.objects.filter(status=Order.PENDING).count()
+        self.stdout.write(f"{'product':<10}{'stock':>8}{'sold':>8}{'left':>8}")
+        ok = pending == 0
+        for pk in ids:
+            self.stdout.write(f"{pk:<10}{initial[pk]:>8}{sold.get(pk, 0):>8}{left[pk]:>8}")
+            ok = ok and left[pk] >= 0 and sold.get(pk, 0) + left[pk] == initial[pk]
+
+        if ok:
+            self.stdout.write(self.style.SUCCESS('No unit oversold or lost: sold + left = stock for every product'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Mismatch ({pending} order(s) still pending)'))
+        return ok
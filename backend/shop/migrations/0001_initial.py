@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(blank=True, max_length=200, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('category', models.CharField(db_index=True, max_length=50)),
+                ('image', models.CharField(blank=True, help_text='Site path, e.g. /products/heartcandle.jpg', max_length=255)),
+                ('note', models.CharField(blank=True, help_text='Shown under the price, e.g. "(x2)"', max_length=100)),
+                ('rating', models.DecimalField(blank=True, decimal_places=1, max_digits=2, null=True)),
+                ('featured', models.BooleanField(default=False, help_text='Shown on the home page')),
+                ('is_active', models.BooleanField(default=True, help_text='Listed in the shop')),
+                ('sort_order', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Product',
+                'verbose_name_plural': 'Products',
+                'ordering': ['sort_order', 'id'],
+            },
+        ),
+    ]
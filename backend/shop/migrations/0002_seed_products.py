@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+# The catalog previously hard-coded in product-images.js:
+# (name, image, price, category, featured, note, rating)
+PRODUCTS = [
+    ('Small bubble', '/products/smallbubble.jpg', 99, 'candles', True, '(x2)', 4.8),
+    ('Coconut spiced candle', '/products/coconutspicedcandle.jpg', 199, 'candles', True, '', 4.9),
+    ('Flower in bowl', '/products/flowerinbowl.jpg', 249, 'candles', True, '', 4.7),
+    ('Garden in a boat', '/products/gardeninaboat.jpg', 499, 'candles', True, '', 5.0),
+    ('Heart candle', '/products/heartcandle.jpg', 199, 'candles', False, '', 4.6),
+    ('Iced coffee latte', '/products/icedcoffeelatte.jpg', 220, 'latte', True, '', 4.8),
+    ('iced lavander latte', '/products/icedlavander.jpg', 220, 'latte', False, '', 4.5),
+    ('Iced Strawberry latte', '/products/icedstrawberrylatte.jpg', 220, 'latte', False, '', 4.7),
+    ('Ocean in a boat', '/products/oceaninaboat.jpg', 499, 'candles', False, '', 4.9),
+    ('Ocean jar candle', '/products/oceanjarcandle.jpg', 220, 'candles', False, '', 4.6),
+    ('Peony candle', '/products/peonycandle.jpg', 99, 'candles', False, '(CUSTOMISED COLOUR)', 4.8),
+    ('pink heart', '/products/pinkheart.jpg', 199, 'candles', False, '', 4.5),
+    ('red heart', '/products/redheart.jpg', 199, 'candles', False, '', 4.7),
+    ('Spiral candle', '/products/spiralcandle.jpg', 199, 'candles', False, '', 4.9),
+    ('Red Peony', '/products/roseinacage.jpg', 99, 'candles', False, '', 4.6),
+    ('Custom1', '/products/custom1.jpg', 99, 'candles', False, '', 4.8),
+    ('Large bubble', '/products/largebubble.jpg', 199, 'candles', False, '(x2)', 4.7),
+]
+
+
+def seed_products(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    if Product.objects.using(schema_editor.connection.alias).exists():
+        return
+    Product.objects.using(schema_editor.connection.alias).bulk_create([
+        Product(
+            name=name,
+            slug=slugify(name),
+            description=name,
+            price=Decimal(price),
+            category=category,
+            image=image,
+            note=note,
+            rating=Decimal(str(rating)),
+            featured=featured,
+            sort_order=index,
+        )
+        for index, (name, image, price, category, featured, note, rating) in enumerate(PRODUCTS)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='session_key',
+            field=models.CharField(blank=True, editable=False, help_text='Session that placed the order, whose cart is emptied when it is confirmed', max_length=40),
+        ),
+    ]
@@ -0,0 +1,208 @@
+import uuid
+
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet invalidating the catalog snapshot after bulk writes."""
+    
+    def update(self, **kwargs):
+        # Stock is not part of the catalog, and changes with every reservation
+        if kwargs.keys() <= {'stock'}:
+            return super().update(**kwargs)
+        # Keep updated_at current, so other processes notice the change
+        kwargs.setdefault('updated_at', timezone.now())
+        updated = super().update(**kwargs)
+        if updated:
+            invalidate_on_commit(self.db)
+        return updated
+    update.alters_data = True
+    
+    def delete(self):
+        deleted, counts = super().delete()
+        if deleted:
+            invalidate_on_commit(self.db)
+        return deleted, counts
+    delete.alters_data = True
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_slug()
+        created = super().bulk_create(objs, *args, **kwargs)
+        invalidate_on_commit(self.db)
+        return created
+
+
+class Product(models.Model):
+    """
+    A product in the shop catalog.
+    
+    Stock is only ever changed relative to its current value in the database
+    (shop.reservations and save()), so concurrent checkouts never overwrite
+    each other's reservations.
+    """
+    
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, unique=True, blank=True)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.CharField(max_length=50, db_index=True)
+    image = models.CharField(max_length=255, blank=True, help_text='Site path, e.g. /products/heartcandle.jpg')
+    note = models.CharField(max_length=100, blank=True, help_text='Shown under the price, e.g. "(x2)"')
+    rating = models.DecimalField(max_digits=2, decimal_places=1, null=True, blank=True)
+    featured = models.BooleanField(default=False, help_text='Shown on the home page')
+    is_active = models.BooleanField(default=True, help_text='Listed in the shop')
+    sort_order = models.IntegerField(default=0)
+    stock = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text='Units left to sell; blank if the product is not limited'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = ProductQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['sort_order', 'id']
+        verbose_name = 'Product'
+        verbose_name_plural = 'Products'
+    
+    def __str__(self):
+        return self.name
+    
+    def fill_slug(self):
+        """Derive the slug from the name when it is left blank."""
+        if not self.slug:
+            self.slug = slugify(self.name)[:200]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_stock = instance.__dict__.get('stock')
+        return instance
+    
+    def stock_change(self):
+        """
+        Return the expression writing self.stock as a change from the loaded value, or None if unchanged.
+        
+        Units reserved since the product was loaded stay reserved; stock
+        never drops below zero.
+        """
+        loaded = getattr(self, 'loaded_stock', None)
+        if 'stock' not in self.__dict__ or self.stock == loaded:
+            return None
+        if self.stock is None or loaded is None:
+            return Value(self.stock)
+        return Greatest(F('stock') + (self.stock - loaded), Value(0), output_field=models.PositiveIntegerField())
+    
+    def save(self, *args, **kwargs):
+        self.fill_slug()
+        using = kwargs.get('using') or self._state.db
+        stock = None
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            stock = self.stock_change()
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stock' and field.attname not in deferred
+            ]
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if stock is not None:
+                Product.objects.using(using).filter(pk=self.pk).update(stock=stock)
+                self.refresh_from_db(using=using, fields=['stock'])
+        self.loaded_stock = self.__dict__.get('stock')
+        invalidate_on_commit(using)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_on_commit(kwargs.get('using') or self._state.db)
+        return result
+
+
+def new_reference():
+    return uuid.uuid4().hex
+
+
+class Order(models.Model):
+    """
+    A checkout of the session cart, holding its units of stock.
+    
+    A pending order's stock is reserved until expires_at; confirming it
+    before then sells the units, cancelling it or letting it expire returns
+    them to stock (shop.reservations).
+    """
+    
+    PENDING = 'pending'
+    CONFIRMED = 'confirmed'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (CONFIRMED, 'Confirmed'),
+        (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    ]
+    
+    reference = models.CharField(
+        max_length=32, unique=True, default=new_reference, editable=False,
+        help_text='Unguessable id the customer uses to look the order up'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(help_text='Reserved stock is released after this unless confirmed')
+    completed_at = models.DateTimeField(null=True, blank=True, help_text='When it was confirmed, cancelled or expired')
+    session_key = models.CharField(
+        max_length=40, blank=True, editable=False,
+        help_text='Session that placed the order, whose cart is emptied when it is confirmed'
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The sweeper's lookup of expired pending orders
+            models.Index(fields=['status', 'expires_at'], name='shop_order_status_expiry'),
+            # A session's pending orders, replaced when it places another
+            models.Index(fields=['session_key', 'status'], name='shop_order_session_status'),
+        ]
+        verbose_name = 'Order'
+        verbose_name_plural = 'Orders'
+    
+    def __str__(self):
+        return f"{self.reference} ({self.status})"
+
+
+class OrderLine(models.Model):
+    """Units of one product in an order, at the price when it was placed."""
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='order_lines')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Order Line'
+        verbose_name_plural = 'Order Lines'
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
+
+
+def invalidate_on_commit(using):
+    """
+    Drop this process's catalog snapshot now and again once the transaction commits.
+    
+    The second drop discards a snapshot another request rebuilt from the
+    data as it was before the commit.
+    """
+    from .catalog import invalidate_catalog
+    
+    invalidate_catalog()
+    transaction.on_commit(invalidate_catalog, using=using)
@@ -0,0 +1,129 @@
+"""
+Server-rendered product detail pages.
+
+The page is sproduct.html, read, asset-rewritten and compiled by the same
+pipeline as the other site pages (newsletter.pages). The parts of it that
+depend on the product are marked with <!-- product:<slot> --> ...
+<!-- /product:<slot> --> comments, which a static copy of sproduct.html
+shows as they are. For the product pages each marked region is replaced
+by the slot's template fragment in PRODUCT_SLOTS, and the result compiled
+once per version of the page. The fragments go in after the page's own
+asset URLs were rewritten, so the product image is resolved to its hashed
+URL when the page is rendered instead.
+"""
+
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template
+from django.urls import reverse
+
+from newsletter.metrics import timed_template
+from newsletter.pages import get_page_template, hashed_asset_url, resolve_html_path
+
+
+PRODUCT_PAGE = 'sproduct.html'
+
+SLOT_RE = re.compile(r'<!-- product:(?P<slot>[\w-]+) -->.*?<!-- /product:(?P=slot) -->', re.DOTALL)
+
+# Template fragment rendered in place of each marked region of PRODUCT_PAGE
+PRODUCT_SLOTS = {
+    'head': (
+        '<title>{{ product.name }} - Wax and Warmth</title>\n'
+        '    <meta name="description" content="{{ summary }}">\n'
+        '    <link rel="canonical" href="{{ url }}">'
+    ),
+    'og': (
+        '<meta property="og:title" content="{{ product.name }} - Wax and Warmth">\n'
+        '    <meta property="og:description" content="{{ summary }}">'
+    ),
+    'breadcrumb': '<span style="color: #666;">{{ product.name }}</span>',
+    'image': (
+        '<img src="{{ image }}" alt="{{ product.name }}"\n'
+        '              class="product-main-image" id="mainimg">'
+    ),
+    'info': (
+        '<div class="product-category">{{ product.category|title|default:"Handcrafted Candles" }}</div>\n'
+        '            <h1 class="product-title" id="productName">{{ product.name }}</h1>\n'
+        '            <div class="product-price" id="productPrice">'
+        '₹{{ product.price|floatformat:"-2" }}{% if product.note %} {{ product.note }}{% endif %}</div>'
+    ),
+    'description': (
+        '<p class="product-description">\n'
+        '              {{ product.description|default:"A handcrafted candle, poured by hand with premium wax." }}\n'
+        '            </p>'
+    ),
+    'data': '{{ product|json_script:"product-data" }}',
+}
+
+# Length of the meta description taken from the product description
+SUMMARY_LENGTH = 160
+
+# Shown for products without an image
+DEFAULT_IMAGE = '/images/logo.jpg'
+
+# (page template, product template compiled from it)
+_compiled = (None, None)
+
+
+def compile_product_template(source):
+    """Replace the marked regions of the page source with their slot fragments and compile it."""
+    found = set()
+
+    def replace(match):
+        slot = match.group('slot')
+        if slot not in PRODUCT_SLOTS:
+            raise ImproperlyConfigured(f'{PRODUCT_PAGE} marks an unknown product slot {slot!r}')
+        found.add(slot)
+        return PRODUCT_SLOTS[slot]
+
+    source = SLOT_RE.sub(replace, source)
+    missing = set(PRODUCT_SLOTS) - found
+    if missing:
+        raise ImproperlyConfigured(f"{PRODUCT_PAGE} lacks the product slot(s) {', '.join(sorted(missing))}")
+    with timed_template():
+        return Template(source)
+
+
+def get_product_template():
+    """
+    Return the compiled product page template, or None if the page file is missing.
+
+    It is recompiled whenever the page pipeline hands out a new template,
+    that is when sproduct.html changes.
+    """
+    global _compiled
+    path, _ = resolve_html_path(PRODUCT_PAGE)
+    if path is None:
+        return None
+    page = get_page_template(path)
+    compiled_page, template = _compiled
+    if compiled_page is not page:
+        template = compile_product_template(page.source)
+        _compiled = (page, template)
+    return template
+
+
+def static_url(url):
+    """Return the URL of a site asset's content-hashed copy, or url if it has none (e.g. before collectstatic)."""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    return hashed_asset_url(url, getattr(staticfiles_storage, 'hashed_files', None)) or url
+
+
+def render_product_page(template, product):
+    """Render the detail page of a catalog product to bytes."""
+    if product['image']:
+        # The embedded data points at the same file as the <img>
+        product = {**product, 'image': static_url(product['image'])}
+    summary = product['description'] or f"{product['name']}, handcrafted by Wax and Warmth."
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH - 1].rsplit(' ', 1)[0] + '…'
+    context = Context({
+        'product': product,
+        'image': product['image'] or static_url(DEFAULT_IMAGE),
+        'summary': summary,
+        'url': reverse('shop:product_page', args=[product['slug']]),
+    })
+    with timed_template():
+        return template.render(context).encode('utf-8')
@@ -0,0 +1,240 @@
+"""
+Stock reservations for checkout.
+
+Placing an order takes its units out of Product.stock with a single
+conditional UPDATE over all its products (stock = stock - n WHERE stock >= n),
+so the database decides which of several concurrent checkouts of the last
+units succeeds and stock never goes negative; nothing is read and written
+back. The units stay reserved until the order is confirmed, cancelled, or
+SHOP_RESERVATION_TTL seconds have passed, after which a background sweeper,
+started with every serving process, returns the units of expired orders to
+stock, a batch of orders per transaction. Status changes are conditional UPDATEs as well (WHERE status =
+'pending'), so each order is confirmed, cancelled or expired exactly once.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Sum, When
+from django.utils import timezone
+
+from newsletter.db import serialized_write
+
+from .cart import CENT
+from .models import Order, OrderLine, Product
+
+
+logger = logging.getLogger(__name__)
+
+
+def reserve(cart, catalog, ttl=None, session_key=''):
+    """
+    Reserve the products of cart ({product id (str): quantity}) as a pending Order.
+
+    Returns (order, ids of products without enough stock); if any product
+    is short the order is None and nothing is reserved. Prices are taken
+    from the catalog snapshot; session_key records whose cart it was. A
+    session holds at most one pending order: the new one replaces (cancels)
+    the session's earlier pending orders, in the same transaction, so they
+    are kept if the new one cannot be reserved. Raises ValueError for an
+    empty cart or a product that is no longer listed.
+    """
+    if not cart:
+        raise ValueError('The cart is empty')
+    quantities = {}
+    prices = {}
+    for key, quantity in cart.items():
+        product = catalog.by_id.get(int(key))
+        if product is None:
+            raise ValueError(f'Product {key} is no longer available')
+        quantities[product['id']] = quantity
+        prices[product['id']] = Decimal(str(product['price']))
+    total = sum((prices[pk] * quantity).quantize(CENT) for pk, quantity in quantities.items())
+    ttl = settings.SHOP_RESERVATION_TTL if ttl is None else ttl
+
+    order = None
+    with serialized_write():
+        if session_key:
+            # Their units go back first, so re-placing the same cart never runs short
+            cancel_session_orders(session_key)
+        if take_stock(quantities) == len(quantities):
+            order = Order.objects.create(
+                total=total, expires_at=timezone.now() + timedelta(seconds=ttl), session_key=session_key or '',
+            )
+            OrderLine.objects.bulk_create(
+                OrderLine(order=order, product_id=pk, quantity=quantity, unit_price=prices[pk])
+                for pk, quantity in quantities.items()
+            )
+        else:
+            # Undo the products that did have enough
+            transaction.set_rollback(True)
+    if order is None:
+        return None, short_products(quantities)
+    # Normally already running since server startup (wsgi.py/asgi.py)
+    start_sweeper()
+    return order, []
+
+
+def take_stock(quantities):
+    """Take {product id: units} out of stock in one UPDATE; returns how many products had enough."""
+    enough = Q()
+    for pk, quantity in quantities.items():
+        enough |= Q(pk=pk) & (Q(stock__isnull=True) | Q(stock__gte=quantity))
+    return Product.objects.filter(enough, is_active=True).update(stock=Case(
+        *(When(pk=pk, then=F('stock') - quantity) for pk, quantity in quantities.items()),
+        default=F('stock'), output_field=PositiveIntegerField(),
+    ))
+
+
+def return_stock(quantities):
+    """Put {product id: units} back in stock in one UPDATE."""
+    if not quantities:
+        return 0
+    return Product.objects.filter(pk__in=quantities, stock__isnull=False).update(stock=Case(
+        *(When(pk=pk, then=F('stock') + quantity) for pk, quantity in quantities.items()),
+        default=F('stock'), output_field=PositiveIntegerField(),
+    ))
+
+
+def short_products(quantities):
+    """Return the ids of products that are unlisted or have fewer units than {product id: units} asks for."""
+    available = {
+        pk: stock for pk, stock in
+        Product.objects.filter(pk__in=quantities, is_active=True).values_list('pk', 'stock')
+    }
+    return sorted(
+        pk for pk, quantity in quantities.items()
+        if pk not in available or (available[pk] is not None and available[pk] < quantity)
+    )
+
+
+def confirm_order(order):
+    """Sell a pending order's reserved units; returns False if it is no longer pending or has expired."""
+    now = timezone.now()
+    with serialized_write():
+        confirmed = Order.objects.filter(pk=order.pk, status=Order.PENDING, expires_at__gt=now).update(
+            status=Order.CONFIRMED, completed_at=now,
+        )
+    if confirmed:
+        order.status, order.completed_at = Order.CONFIRMED, now
+    return bool(confirmed)
+
+
+def cancel_order(order):
+    """Return a pending order's units to stock; returns False if it is no longer pending."""
+    now = timezone.now()
+    with serialized_write():
+        cancelled = Order.objects.filter(pk=order.pk, status=Order.PENDING).update(
+            status=Order.CANCELLED, completed_at=now,
+        )
+        if cancelled:
+            return_stock(dict(order.lines.values_list('product_id', 'quantity')))
+    if cancelled:
+        order.status, order.completed_at = Order.CANCELLED, now
+    return bool(cancelled)
+
+
+def cancel_session_orders(session_key):
+    """Cancel a session's pending orders and return their units to stock; returns how many were cancelled."""
+    now = timezone.now()
+    with serialized_write():
+        pending = list(
+            Order.objects.select_for_update()
+            .filter(session_key=session_key, status=Order.PENDING).values_list('pk', flat=True)
+        )
+        if pending:
+            Order.objects.filter(pk__in=pending).update(status=Order.CANCELLED, completed_at=now)
+            return_stock(dict(
+                OrderLine.objects.filter(order_id__in=pending).order_by()
+                .values_list('product_id').annotate(units=Sum('quantity'))
+            ))
+    return len(pending)
+
+
+def release_expired(batch_size=None):
+    """
+    Expire pending orders past their expiry and return their units to stock.
+
+    Works through them batch_size (default SHOP_RESERVATION_SWEEP_BATCH)
+    orders per transaction, at four statements per batch; returns the
+    number of orders expired.
+    """
+    batch_size = batch_size or settings.SHOP_RESERVATION_SWEEP_BATCH
+    now = timezone.now()
+    released = 0
+    while True:
+        with serialized_write():
+            # Locked until commit (on SQLite the transaction already excludes
+            # other writers), so none of them is confirmed meanwhile
+            expired = list(
+                Order.objects.select_for_update()
+                .filter(status=Order.PENDING, expires_at__lte=now)
+                .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+            )
+            if expired:
+                Order.objects.filter(pk__in=expired).update(status=Order.EXPIRED, completed_at=now)
+                return_stock(dict(
+                    OrderLine.objects.filter(order_id__in=expired).order_by()
+                    .values_list('product_id').annotate(units=Sum('quantity'))
+                ))
+        released += len(expired)
+        if len(expired) < batch_size:
+            return released
+
+
+def serialize_order(order, lines):
+    """Return the API representation of an order and its OrderLines."""
+    status = order.status
+    if status == Order.PENDING and order.expires_at <= timezone.now():
+        # Not swept yet, but it can no longer be confirmed
+        status = Order.EXPIRED
+    return {
+        'reference': order.reference,
+        'status': status,
+        'expires_at': order.expires_at.isoformat(),
+        'items': [
+            {
+                'product_id': line.product_id,
+                'quantity': line.quantity,
+                'unit_price': float(line.unit_price),
+                'line_total': float((line.unit_price * line.quantity).quantize(CENT)),
+            }
+            for line in lines
+        ],
+        'total': float(order.total),
+    }
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_sweeper():
+    """Start this process's background sweeper of expired reservations, unless running or disabled."""
+    global _sweeper
+    if _sweeper is None and settings.SHOP_RESERVATION_SWEEP_INTERVAL is not None:
+        with _sweeper_lock:
+            if _sweeper is None:
+                thread = threading.Thread(target=_sweep_forever, name='stock-reservation-sweeper', daemon=True)
+                thread.start()
+                _sweeper = thread
+
+
+def _sweep_forever():
+    """Background loop releasing expired reservations every SHOP_RESERVATION_SWEEP_INTERVAL seconds."""
+    while True:
+        time.sleep(settings.SHOP_RESERVATION_SWEEP_INTERVAL or 1)
+        try:
+            released = release_expired()
+            if released:
+                logger.info(f"Released the stock of {released} expired order(s)")
+        except Exception as e:
+            # A locked database is retried on the next pass
+            logger.error(f"Stock reservation sweep error: {str(e)}")
+        finally:
+            close_old_connections()
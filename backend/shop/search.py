@@ -0,0 +1,184 @@
+"""
+Ranked product search and prefix autocomplete.
+
+On SQLite an FTS5 table indexes the name, description and category of every
+product, with diacritics folded ("creme" finds "Crème") and prefix indexes,
+so search-as-you-type prefixes are index lookups. Triggers on the products
+table update the index row by row with every write, raw SQL included; there
+is no rebuild when products change. Matches are ranked with BM25, a hit in
+the name counting more than one in the category, and one more than one in
+the description; the matching rows are read in the same query.
+
+Without FTS5 (or with SHOP_SEARCH_FTS off) the same searches scan the
+in-memory catalog snapshot. Django rebuilds a SQLite table, dropping its
+triggers, when a migration alters its columns; run
+`manage.py rebuild_product_search` after such a migration.
+"""
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connections
+
+from .catalog import PRODUCT_FIELDS, get_catalog, serialize_product
+from .models import Product
+
+
+SEARCH_TABLE = 'shop_product_fts'
+PRODUCT_TABLE = Product._meta.db_table
+SEARCH_COLUMNS = ('name', 'description', 'category')
+
+# BM25 weight of a match in each of SEARCH_COLUMNS
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0)
+
+# Autocomplete only looks at these columns
+SUGGEST_COLUMNS = ('name', 'category')
+
+# Later terms of longer queries are ignored
+MAX_TERMS = 8
+
+WORD = re.compile(r'\w+')
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+INSTALL_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"{_columns}, content='{PRODUCT_TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {PRODUCT_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {PRODUCT_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {_columns} ON {PRODUCT_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+_weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+_select = ', '.join(f'p.{field}' for field in PRODUCT_FIELDS)
+
+SEARCH_SQL = (
+    f"SELECT {_select} FROM {SEARCH_TABLE} JOIN {PRODUCT_TABLE} p ON p.id = {SEARCH_TABLE}.rowid "
+    f"WHERE {SEARCH_TABLE} MATCH %s AND p.is_active{{category}} "
+    f"ORDER BY bm25({SEARCH_TABLE}, {_weights}), p.sort_order, p.id LIMIT %s OFFSET %s"
+)
+
+
+def install_search_index(connection):
+    """
+    Create (or repair) the search index and its triggers, then rebuild it.
+
+    Returns False without changes if the database is not SQLite or lacks FTS5.
+    """
+    if connection.vendor != 'sqlite' or not fts5_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+    return True
+
+
+def uninstall_search_index(connection):
+    """Drop the search index and its triggers."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in UNINSTALL_SQL:
+            cursor.execute(sql)
+
+
+def fts5_supported(connection):
+    """Return True if this SQLite build has FTS5."""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.shop_fts_probe USING fts5(value)")
+        except DatabaseError:
+            return False
+        cursor.execute("DROP TABLE temp.shop_fts_probe")
+    return True
+
+
+def words(text):
+    """Split text into lowercase words with accents removed, as the index does."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return WORD.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def search_terms(query):
+    """Split a search query into the words it must match."""
+    return words(query)[:MAX_TERMS]
+
+
+def match_expression(terms, columns=None):
+    """
+    Turn search terms into an FTS5 MATCH expression.
+
+    Every term must match a word; the last one may be the start of a word,
+    as it is usually still being typed. columns restricts the match to
+    those columns.
+    """
+    phrases = ['"' + term + '"' for term in terms]
+    phrases[-1] += '*'
+    expression = ' AND '.join(phrases)
+    if columns:
+        expression = '{' + ' '.join(columns) + '} : (' + expression + ')'
+    return expression
+
+
+def search_products(query, category=None, limit=20, offset=0, columns=None):
+    """
+    Return the listed products matching every word of query, best match first.
+
+    The last word also matches longer words ("hea" finds "Heart"). columns
+    restricts the match to some of SEARCH_COLUMNS.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    connection = connections[Product.objects.db]
+    if connection.vendor == 'sqlite' and settings.SHOP_SEARCH_FTS:
+        sql = SEARCH_SQL.format(category=' AND p.category = %s' if category else '')
+        params = [match_expression(terms, columns)] + ([category] if category else []) + [limit, offset]
+        try:
+            rows = list(Product.objects.raw(sql, params))
+        except OperationalError as error:
+            # Fall back below if the index was never installed
+            if SEARCH_TABLE not in str(error):
+                raise
+        else:
+            return [serialize_product({field: getattr(row, field) for field in PRODUCT_FIELDS}) for row in rows]
+    return scan_products(terms, category, limit, offset, columns)
+
+
+def scan_products(terms, category=None, limit=20, offset=0, columns=None):
+    """search_products() over the in-memory catalog, for databases without FTS5."""
+    weights = dict(zip(SEARCH_COLUMNS, COLUMN_WEIGHTS))
+    columns = columns or SEARCH_COLUMNS
+    last = len(terms) - 1
+    ranked = []
+    for position, product in enumerate(get_catalog().filter(category)):
+        tokens = {column: words(product[column]) for column in columns}
+        score = 0.0
+        for index, term in enumerate(terms):
+            hits = [
+                weights[column] for column in columns
+                if any(token == term or (index == last and token.startswith(term)) for token in tokens[column])
+            ]
+            if not hits:
+                break
+            score += sum(hits)
+        else:
+            ranked.append((-score, position, product))
+    ranked.sort(key=lambda entry: entry[:2])
+    return [product for _, _, product in ranked[offset:offset + limit]]
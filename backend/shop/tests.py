@@ -0,0 +1,497 @@
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from newsletter.pages import clear_template_cache
+from newsletter.ratelimit import reset_rate_limits
+
+from .catalog import get_catalog, invalidate_catalog
+from .models import Order, Product
+from .pages import compile_product_template
+from .reservations import release_expired, reserve, take_stock
+from .search import search_products
+
+
+class ProductApiTests(TestCase):
+    """The product API must serve the catalog from memory and follow every write."""
+
+    def setUp(self):
+        invalidate_catalog()
+        Product.objects.all().delete()
+        self.candle = Product.objects.create(name='Heart Candle', price='199.00', category='candles', featured=True)
+        self.latte = Product.objects.create(name='Iced Latte', price='220.00', category='latte', rating='4.5')
+        Product.objects.create(name='Retired', price='99.00', category='candles', is_active=False)
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def get_names(self, **params):
+        response = self.client.get(reverse('shop:products'), params)
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()['products']]
+
+    def test_list_and_filters(self):
+        self.assertEqual(self.get_names(), ['Heart Candle', 'Iced Latte'])
+        self.assertEqual(self.get_names(category='latte'), ['Iced Latte'])
+        self.assertEqual(self.get_names(featured='true'), ['Heart Candle'])
+        self.assertEqual(self.get_names(category='candles', featured='0'), [])
+        self.assertEqual(self.client.get(reverse('shop:products'), {'featured': 'maybe'}).status_code, 400)
+
+    def test_detail(self):
+        response = self.client.get(reverse('shop:product_by_slug', args=['iced-latte']))
+        self.assertEqual(response.json(), {
+            'id': self.latte.pk, 'slug': 'iced-latte', 'name': 'Iced Latte', 'description': '',
+            'price': 220.0, 'category': 'latte', 'image': '', 'note': '', 'rating': 4.5, 'featured': False,
+        })
+        self.assertEqual(self.client.get(reverse('shop:product', args=[self.candle.pk])).json()['slug'], 'heart-candle')
+        retired = Product.objects.get(name='Retired')
+        self.assertEqual(self.client.get(reverse('shop:product', args=[retired.pk])).status_code, 404)
+
+    def test_cache_hits_skip_the_database(self):
+        self.client.get(reverse('shop:products'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('shop:products'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+    def test_etag_and_gzip(self):
+        response = self.client.get(reverse('shop:products'))
+        etag = response['ETag']
+        self.assertEqual(self.client.get(reverse('shop:products'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        gzipped = self.client.get(reverse('shop:products'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertNotEqual(gzipped['ETag'], etag)
+        self.assertEqual(self.client.get(reverse('shop:products'), HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip').status_code, 200)
+
+    def test_writes_invalidate_the_snapshot(self):
+        version = self.client.get(reverse('shop:products'))['X-Catalog-Version']
+        self.latte.price = '250.00'
+        self.latte.save()
+        response = self.client.get(reverse('shop:products'))
+        self.assertNotEqual(response['X-Catalog-Version'], version)
+        self.assertEqual(response.json()['products'][1]['price'], 250.0)
+
+        Product.objects.filter(pk=self.candle.pk).update(is_active=False)
+        self.assertEqual(self.get_names(), ['Iced Latte'])
+
+    def test_other_processes_writes_are_noticed(self):
+        self.get_names()
+        # A write this process did not see, as if made by another process
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE shop_product SET name = %s, updated_at = %s WHERE id = %s',
+                ['Renamed Latte', timezone.now() + timedelta(seconds=1), self.latte.pk],
+            )
+        with self.settings(SHOP_CATALOG_RECHECK_INTERVAL=None):
+            self.assertEqual(self.get_names(), ['Heart Candle', 'Iced Latte'])
+        with self.settings(SHOP_CATALOG_RECHECK_INTERVAL=0):
+            self.assertEqual(self.get_names(), ['Heart Candle', 'Renamed Latte'])
+
+
+class ProductSearchTests(TestCase):
+    """Search and autocomplete must rank matches and follow product writes."""
+
+    def setUp(self):
+        invalidate_catalog()
+        Product.objects.all().delete()
+        Product.objects.create(name='Lavender Candle', description='Calming soy wax', price='199.00', category='candles')
+        Product.objects.create(name='Iced Lavender Latte', description='With oat milk', price='220.00', category='latte')
+        Product.objects.create(name='Crème Brûlée Jar', description='Smells of lavender', price='249.00', category='candles')
+        Product.objects.create(name='Hidden Lavender', price='99.00', category='candles', is_active=False)
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def search(self, **params):
+        response = self.client.get(reverse('shop:search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()['products']]
+
+    def test_ranking_and_prefixes(self):
+        # Name matches rank above the description match; inactive products are hidden
+        self.assertEqual(self.search(q='lavender')[2], 'Crème Brûlée Jar')
+        self.assertEqual(len(self.search(q='lavender')), 3)
+        self.assertEqual(self.search(q='lavender lat'), ['Iced Lavender Latte'])
+        self.assertEqual(self.search(q='creme'), ['Crème Brûlée Jar'])
+        self.assertEqual(self.search(q='lavender', category='latte'), ['Iced Lavender Latte'])
+        self.assertEqual(self.search(q='"lavender" OR NEAR('), [])
+
+    def test_paging_and_validation(self):
+        response = self.client.get(reverse('shop:search'), {'q': 'lavender', 'limit': 2})
+        self.assertTrue(response.json()['has_more'])
+        response = self.client.get(reverse('shop:search'), {'q': 'lavender', 'limit': 2, 'offset': 2})
+        self.assertEqual(len(response.json()['products']), 1)
+        self.assertFalse(response.json()['has_more'])
+        self.assertEqual(self.client.get(reverse('shop:search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('shop:search'), {'q': 'wax', 'limit': 'ten'}).status_code, 400)
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse('shop:autocomplete'), {'q': 'Lav'})
+        suggestions = response.json()['suggestions']
+        # Only name and category are matched
+        self.assertEqual([suggestion['name'] for suggestion in suggestions], ['Lavender Candle', 'Iced Lavender Latte'])
+        self.assertEqual(set(suggestions[0]), {'id', 'slug', 'name', 'category', 'image'})
+        self.assertEqual(self.client.get(reverse('shop:autocomplete'), {'q': ''}).json()['suggestions'], [])
+
+    def test_repeated_searches_are_cached(self):
+        response = self.client.get(reverse('shop:search'), {'q': 'lavender'})
+        with self.assertNumQueries(0):
+            again = self.client.get(reverse('shop:search'), {'q': 'lavender'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_index_follows_writes(self):
+        product = Product.objects.get(name='Lavender Candle')
+        product.name = 'Rosemary Candle'
+        product.save()
+        self.assertEqual(self.search(q='rosem'), ['Rosemary Candle'])
+        Product.objects.filter(name='Hidden Lavender').update(is_active=True)
+        self.assertIn('Hidden Lavender', self.search(q='lavender'))
+        Product.objects.filter(name='Iced Lavender Latte').delete()
+        self.assertEqual(self.search(q='latte'), [])
+
+    def test_scan_fallback_matches(self):
+        for query in ('lavender', 'lavender lat', 'creme', 'oat'):
+            with self.settings(SHOP_SEARCH_FTS=True):
+                indexed = [product['name'] for product in search_products(query)]
+            with self.settings(SHOP_SEARCH_FTS=False):
+                scanned = [product['name'] for product in search_products(query)]
+            self.assertEqual(indexed, scanned, query)
+
+
+class ProductPageTests(TestCase):
+    """Product pages must render server-side, be cached per product and follow product writes."""
+
+    def setUp(self):
+        invalidate_catalog()
+        Product.objects.all().delete()
+        self.product = Product.objects.create(
+            name='Heart <Candle>', description='Hand-poured soy wax heart.', price='199.50',
+            category='candles', image='/products/heartcandle.jpg',
+        )
+        self.url = reverse('shop:product_page', args=[self.product.slug])
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def test_renders_the_product(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<title>Heart &lt;Candle&gt; - Wax and Warmth</title>')
+        self.assertContains(response, '<h1 class="product-title" id="productName">Heart &lt;Candle&gt;</h1>')
+        self.assertContains(response, '₹199.50')
+        self.assertContains(response, 'src="/products/heartcandle.jpg"')
+        self.assertContains(response, f'<link rel="canonical" href="{self.url}">')
+        self.assertContains(response, '<script id="product-data" type="application/json">')
+        self.assertNotContains(response, '<!-- product:')
+        self.assertEqual(self.client.get(reverse('shop:product_page', args=['missing'])).status_code, 404)
+
+    def test_image_uses_hashed_static_url(self):
+        with tempfile.TemporaryDirectory() as static_root:
+            with open(os.path.join(static_root, 'staticfiles.json'), 'w') as manifest:
+                json.dump({'version': '1.1', 'paths': {
+                    'products/heartcandle.jpg': 'products/heartcandle.0123456789ab.jpg',
+                    'images/logo.jpg': 'images/logo.ba9876543210.jpg',
+                }}, manifest)
+            with override_settings(STATIC_ROOT=static_root):
+                clear_template_cache()
+                invalidate_catalog()
+                response = self.client.get(self.url)
+                data = json.loads(re.search(
+                    r'<script id="product-data" type="application/json">(.*?)</script>', response.content.decode()
+                ).group(1))
+                self.assertEqual(data['image'], '/static/products/heartcandle.0123456789ab.jpg')
+                self.assertContains(response, f'src="{data["image"]}"')
+
+                Product.objects.filter(pk=self.product.pk).update(image='')
+                invalidate_catalog()
+                self.assertContains(self.client.get(self.url), 'src="/static/images/logo.ba9876543210.jpg"')
+        clear_template_cache()
+
+    def test_legacy_page_is_unchanged(self):
+        response = self.client.get(reverse('newsletter:sproduct'))
+        self.assertContains(response, '<h1 class="product-title" id="productName">Product Name</h1>')
+        self.assertNotContains(response, '<script id="product-data"')
+
+    def test_cached_and_conditional(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(self.client.head(self.url).status_code, 200)
+
+    def test_product_writes_rerender(self):
+        etag = self.client.get(self.url)['ETag']
+        self.product.price = '249.00'
+        self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '₹249')
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_slots_must_all_be_marked(self):
+        with self.assertRaises(ImproperlyConfigured):
+            compile_product_template('<!-- product:head --><title>x</title><!-- /product:head -->')
+
+
+class CartApiTests(TestCase):
+    """The cart must apply batches atomically, price on the server and not query per item."""
+
+    def setUp(self):
+        invalidate_catalog()
+        Product.objects.all().delete()
+        Product.objects.bulk_create(
+            Product(name=f'Candle {i}', price=f'{100 + i}.50', category='candles', sort_order=i) for i in range(30)
+        )
+        self.products = list(Product.objects.order_by('sort_order'))
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def post(self, *operations):
+        return self.client.post(reverse('shop:cart'), json.dumps({'operations': list(operations)}),
+                                content_type='application/json')
+
+    def test_batched_operations(self):
+        first, second, third = self.products[:3]
+        response = self.post(
+            {'op': 'add', 'product': first.pk, 'quantity': 2, 'price': 1},
+            {'op': 'add', 'product': second.slug},
+            {'op': 'add', 'product': third.pk, 'quantity': 5},
+            {'op': 'set', 'product': third.pk, 'quantity': 1},
+            {'op': 'add', 'product': first.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        cart = response.json()
+        # Prices come from the catalog, whatever the client sends
+        self.assertEqual([(item['name'], item['quantity'], item['line_total']) for item in cart['items']],
+                         [('Candle 0', 3, 301.5), ('Candle 1', 1, 101.5), ('Candle 2', 1, 102.5)])
+        self.assertEqual(cart['item_count'], 5)
+        self.assertEqual(cart['subtotal'], 505.5)
+
+        cart = self.post({'op': 'remove', 'product': second.pk}, {'op': 'set', 'product': third.pk, 'quantity': 0}).json()
+        self.assertEqual([item['name'] for item in cart['items']], ['Candle 0'])
+        self.assertEqual(self.client.get(reverse('shop:cart')).json()['item_count'], 3)
+        self.assertEqual(self.post({'op': 'clear'}).json()['items'], [])
+
+    def test_invalid_batches_change_nothing(self):
+        self.post({'op': 'add', 'product': self.products[0].pk})
+        for operation in ({'op': 'add', 'product': 999999}, {'op': 'set', 'product': self.products[1].pk, 'quantity': -1},
+                          {'op': 'add', 'product': self.products[1].pk, 'quantity': 100}, {'op': 'explode'},
+                          {'op': 'add', 'product': self.products[1].pk, 'quantity': '2'}):
+            response = self.post({'op': 'add', 'product': self.products[2].pk}, operation)
+            self.assertEqual(response.status_code, 400, operation)
+            self.assertTrue(response.json()['error'].startswith('operations[1]:'))
+        self.assertEqual(self.client.post(reverse('shop:cart'), 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(reverse('shop:cart'), '{}', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get(reverse('shop:cart')).json()['item_count'], 1)
+
+    def test_unlisted_products_drop_out(self):
+        self.post({'op': 'add', 'product': self.products[0].pk}, {'op': 'add', 'product': self.products[1].pk})
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        cart = self.client.get(reverse('shop:cart')).json()
+        self.assertEqual(cart['removed'], [self.products[0].pk])
+        self.assertEqual([item['product_id'] for item in cart['items']], [self.products[1].pk])
+        self.assertEqual(self.client.get(reverse('shop:cart')).json()['removed'], [])
+
+    def test_queries_do_not_grow_with_the_cart(self):
+        get_catalog()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('shop:cart')).json()['items'], [])
+        self.post({'op': 'add', 'product': self.products[0].pk})
+
+        counts = []
+        for size in (1, 25):
+            operations = [{'op': 'set', 'product': product.pk, 'quantity': 2} for product in self.products[:size]]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(*operations)
+            self.assertEqual(len(response.json()['items']), size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(SHOP_RESERVATION_SWEEP_INTERVAL=None)
+class StockReservationTests(TestCase):
+    """Orders must reserve stock atomically, never oversell, and return what is not sold."""
+
+    def setUp(self):
+        reset_rate_limits()
+        invalidate_catalog()
+        Product.objects.all().delete()
+        self.limited = Product.objects.create(name='Limited Candle', price='199.00', category='candles', stock=5)
+        self.scarce = Product.objects.create(name='Scarce Candle', price='99.50', category='candles', stock=1)
+        self.unlimited = Product.objects.create(name='Iced Latte', price='220.00', category='latte')
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def fill_cart(self, *items):
+        self.client.post(reverse('shop:cart'), json.dumps({'operations': [{'op': 'clear'}] + [
+            {'op': 'set', 'product': product.pk, 'quantity': quantity} for product, quantity in items
+        ]}), content_type='application/json')
+
+    def checkout(self):
+        return self.client.post(reverse('shop:orders'))
+
+    def act(self, reference, action):
+        return self.client.post(reverse('shop:order', args=[reference]), json.dumps({'action': action}),
+                                content_type='application/json')
+
+    def stock(self, product):
+        product.refresh_from_db(fields=['stock'])
+        return product.stock
+
+    def test_checkout_reserves_and_confirm_sells(self):
+        catalog = get_catalog()
+        self.fill_cart((self.limited, 3), (self.unlimited, 2))
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        order = response.json()
+        self.assertEqual(order['status'], 'pending')
+        self.assertEqual(order['total'], 1037.0)
+        self.assertEqual(self.stock(self.limited), 2)
+        self.assertIsNone(self.stock(self.unlimited))
+        # Stock is not part of the catalog, so reservations keep its snapshot
+        self.assertIs(get_catalog(), catalog)
+
+        response = self.act(order['reference'], 'confirm')
+        self.assertEqual(response.json()['status'], 'confirmed')
+        self.assertEqual(self.client.get(reverse('shop:cart')).json()['items'], [])
+        self.assertEqual(self.act(order['reference'], 'confirm').status_code, 409)
+        self.assertEqual(self.act(order['reference'], 'cancel').status_code, 409)
+        self.assertEqual(self.stock(self.limited), 2)
+
+    def test_confirm_empties_the_placing_cart(self):
+        self.fill_cart((self.limited, 1))
+        reference = self.checkout().json()['reference']
+        other = Client()
+        other.post(reverse('shop:cart'), json.dumps({'operations': [{'op': 'add', 'product': self.unlimited.pk}]}),
+                   content_type='application/json')
+        response = other.post(reverse('shop:order', args=[reference]), json.dumps({'action': 'confirm'}),
+                              content_type='application/json')
+        self.assertEqual(response.json()['status'], 'confirmed')
+        self.assertEqual(self.client.get(reverse('shop:cart')).json()['items'], [])
+        self.assertEqual(other.get(reverse('shop:cart')).json()['item_count'], 1)
+
+    def test_session_endpoints_need_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        body = json.dumps({'operations': [{'op': 'add', 'product': self.limited.pk}]})
+        self.assertEqual(client.post(reverse('shop:cart'), body, content_type='application/json').status_code, 403)
+        token = client.get(reverse('shop:cart')).cookies['csrftoken'].value
+        response = client.post(reverse('shop:cart'), body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['item_count'], 1)
+
+        self.assertEqual(client.post(reverse('shop:orders')).status_code, 403)
+        response = client.post(reverse('shop:orders'), HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+        url = reverse('shop:order', args=[response.json()['reference']])
+        body = json.dumps({'action': 'cancel'})
+        self.assertEqual(client.post(url, body, content_type='application/json').status_code, 403)
+        response = client.post(url, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['status'], 'cancelled')
+
+    def test_short_stock_reserves_nothing(self):
+        self.fill_cart((self.limited, 2), (self.scarce, 2))
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['products'], [self.scarce.pk])
+        self.assertEqual((self.stock(self.limited), self.stock(self.scarce)), (5, 1))
+        self.assertFalse(Order.objects.exists())
+
+        # The last unit goes to exactly one checkout
+        self.assertEqual(take_stock({self.scarce.pk: 1}), 1)
+        self.assertEqual(take_stock({self.scarce.pk: 1}), 0)
+        self.assertEqual(self.stock(self.scarce), 0)
+
+        self.fill_cart()
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertEqual(self.client.get(reverse('shop:order', args=['0' * 32])).status_code, 404)
+
+    def test_cancel_and_expiry_return_stock(self):
+        self.fill_cart((self.limited, 2))
+        reference = self.checkout().json()['reference']
+        self.assertEqual(self.act(reference, 'cancel').json()['status'], 'cancelled')
+        self.assertEqual(self.stock(self.limited), 5)
+        self.assertEqual(self.act(reference, 'refund').status_code, 400)
+
+        self.fill_cart((self.limited, 1), (self.scarce, 1))
+        with override_settings(SHOP_RESERVATION_TTL=0):
+            reference = self.checkout().json()['reference']
+        # Orders placed by other sessions
+        for _ in range(3):
+            reserve({str(self.limited.pk): 1}, get_catalog(), ttl=0)
+        self.assertEqual((self.stock(self.limited), self.stock(self.scarce)), (1, 0))
+        # Past its expiry an order reads as expired and cannot be confirmed, even before the sweep
+        self.assertEqual(self.client.get(reverse('shop:order', args=[reference])).json()['status'], 'expired')
+        self.assertEqual(self.act(reference, 'confirm').status_code, 409)
+
+        self.assertEqual(release_expired(batch_size=3), 4)
+        self.assertEqual((self.stock(self.limited), self.stock(self.scarce)), (5, 1))
+        self.assertEqual(Order.objects.filter(status=Order.EXPIRED).count(), 4)
+        self.assertEqual(release_expired(), 0)
+
+    def test_new_order_replaces_the_pending_one(self):
+        self.fill_cart((self.limited, 4))
+        first = self.checkout().json()['reference']
+        self.assertEqual(self.stock(self.limited), 1)
+        # Placing the same cart again re-reserves the units the first order held
+        second = self.checkout().json()['reference']
+        self.assertEqual(self.client.get(reverse('shop:order', args=[first])).json()['status'], 'cancelled')
+        self.assertEqual(self.stock(self.limited), 1)
+        self.assertEqual(Order.objects.filter(status=Order.PENDING).get().reference, second)
+
+        # Another session's pending order is left alone
+        other = Client()
+        other.post(reverse('shop:cart'), json.dumps({'operations': [{'op': 'add', 'product': self.limited.pk}]}),
+                   content_type='application/json')
+        self.assertEqual(other.post(reverse('shop:orders')).status_code, 201)
+        self.assertEqual(Order.objects.filter(status=Order.PENDING).count(), 2)
+
+        # A checkout that runs short keeps the pending order
+        self.fill_cart((self.limited, 5))
+        self.assertEqual(self.checkout().status_code, 409)
+        self.assertEqual(self.client.get(reverse('shop:order', args=[second])).json()['status'], 'pending')
+        self.assertEqual(self.stock(self.limited), 0)
+
+    def test_checkout_is_rate_limited(self):
+        limits = {'orders': [{'key': 'ip', 'rate': '1/m', 'burst': 2}]}
+        self.fill_cart((self.limited, 1))
+        with self.settings(NEWSLETTER_RATE_LIMITS=limits):
+            self.assertEqual(self.checkout().status_code, 201)
+            self.assertEqual(self.checkout().status_code, 201)
+            response = self.checkout()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(Order.objects.filter(status=Order.PENDING).count(), 1)
+
+    def test_save_changes_stock_by_the_edit(self):
+        product = Product.objects.get(pk=self.limited.pk)
+        take_stock({product.pk: 3})
+        # Loaded at 5, raised to 8 while 3 were reserved: 5 left
+        product.stock = 8
+        product.save()
+        self.assertEqual(product.stock, 5)
+        product.name = 'Renamed Candle'
+        product.save()
+        self.assertEqual(self.stock(self.limited), 5)
+
+        product = Product.objects.get(pk=self.limited.pk)
+        take_stock({product.pk: 4})
+        product.stock = 0
+        product.save()
+        self.assertEqual(self.stock(self.limited), 0)
+        product.stock = None
+        product.save()
+        self.assertIsNone(self.stock(self.limited))
+
@@ -0,0 +1,24 @@
+from django.urls import path
+from . import views
+
+app_name = 'shop'
+
+urlpatterns = [
+    # Product catalog API
+    path('api/products/', views.product_list, name='products'),
+    # Before the slug route, which would match them too
+    path('api/products/search/', views.product_search, name='search'),
+    path('api/products/autocomplete/', views.product_autocomplete, name='autocomplete'),
+    path('api/products/<int:product_id>/', views.product_detail, name='product'),
+    path('api/products/<slug:slug>/', views.product_detail, name='product_by_slug'),
+
+    # Session cart
+    path('api/cart/', views.cart, name='cart'),
+
+    # Orders, reserving stock until confirmed
+    path('api/orders/', views.orders, name='orders'),
+    path('api/orders/<str:reference>/', views.order, name='order'),
+
+    # Product detail pages
+    path('product/<slug:slug>/', views.product_page, name='product_page'),
+]
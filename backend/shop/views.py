@@ -0,0 +1,248 @@
+import json
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_http_methods, require_POST, require_safe
+
+from newsletter.ratelimit import rate_limit
+from wax_and_warmth.compression import negotiate_encoding
+
+from .cart import apply_operations, clear_stored_cart, get_cart, price_cart, save_cart
+from .catalog import get_catalog
+from .models import Order
+from .pages import PRODUCT_PAGE, get_product_template, render_product_page
+from .reservations import cancel_order, confirm_order, reserve, serialize_order
+from .search import SUGGEST_COLUMNS, search_products
+
+
+# Accepted values of the ?featured= filter
+FEATURED_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+# Default and largest ?limit= of search results and autocomplete suggestions
+SEARCH_LIMIT = (20, 50)
+SUGGEST_LIMIT = (8, 20)
+
+# Product fields returned with each suggestion
+SUGGEST_FIELDS = ('id', 'slug', 'name', 'category', 'image')
+
+
+def catalog_response(request, cached, version, content_type='application/json'):
+    """Serve a CachedResponse with ETag/304 handling and its gzip variant when accepted."""
+    encoding = negotiate_encoding(request, cached.variants)
+    # Each content coding is a distinct representation with its own ETag
+    etag = f'"{cached.etag}-{encoding}"' if encoding else f'"{cached.etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(cached.variants.get(encoding, cached.body), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['X-Catalog-Version'] = version
+    if cached.variants:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, public=True, max_age=settings.SHOP_CATALOG_MAX_AGE)
+    return response
+
+
+def int_param(request, name, default, maximum):
+    """Return a non-negative integer query parameter capped at maximum, or None if invalid."""
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    return min(value, maximum) if value >= 0 else None
+
+
+@require_GET
+def product_list(request):
+    """Listed products, optionally filtered by ?category= and ?featured=."""
+    
+    category = request.GET.get('category') or None
+    featured = request.GET.get('featured')
+    if featured is not None:
+        featured = FEATURED_VALUES.get(featured.lower())
+        if featured is None:
+            return JsonResponse({'error': 'featured must be true or false'}, status=400)
+    
+    catalog = get_catalog()
+    cached = catalog.response(('list', category, featured), lambda: {
+        'version': catalog.version,
+        'categories': catalog.categories,
+        'products': catalog.filter(category, featured),
+    })
+    return catalog_response(request, cached, catalog.version)
+
+
+@require_GET
+def product_detail(request, product_id=None, slug=None):
+    """A single listed product, by id or slug."""
+    
+    catalog = get_catalog()
+    if product_id is not None:
+        product = catalog.by_id.get(product_id)
+    else:
+        product = catalog.by_slug.get(slug)
+    if product is None:
+        return JsonResponse({'error': 'Product not found'}, status=404)
+    
+    cached = catalog.response(('product', product['id']), lambda: product)
+    return catalog_response(request, cached, catalog.version)
+
+
+@require_GET
+def product_search(request):
+    """Listed products matching ?q=, best match first; ?category=, ?limit= and ?offset= are optional."""
+    
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    limit = int_param(request, 'limit', *SEARCH_LIMIT)
+    offset = int_param(request, 'offset', 0, 10000)
+    if not limit or offset is None:
+        return JsonResponse({'error': 'limit and offset must be positive integers'}, status=400)
+    
+    category = request.GET.get('category') or None
+    
+    def search():
+        # One extra row tells whether there is another page
+        products = search_products(query, category, limit + 1, offset)
+        return {'query': query, 'products': products[:limit], 'has_more': len(products) > limit}
+    
+    catalog = get_catalog()
+    cached = catalog.search_response(('search', query, category, limit, offset), search)
+    return catalog_response(request, cached, catalog.version)
+
+
+@require_GET
+def product_autocomplete(request):
+    """Product name suggestions for a partly typed ?q=."""
+    
+    query = request.GET.get('q', '').strip()
+    limit = int_param(request, 'limit', *SUGGEST_LIMIT)
+    if not limit:
+        return JsonResponse({'error': 'limit must be a positive integer'}, status=400)
+    
+    def suggest():
+        products = search_products(query, limit=limit, columns=SUGGEST_COLUMNS)
+        return {
+            'query': query,
+            'suggestions': [{field: product[field] for field in SUGGEST_FIELDS} for product in products],
+        }
+    
+    catalog = get_catalog()
+    cached = catalog.search_response(('suggest', query, limit), suggest)
+    return catalog_response(request, cached, catalog.version)
+
+
+@require_safe
+def product_page(request, slug):
+    """Server-rendered detail page of a listed product."""
+    
+    catalog = get_catalog()
+    product = catalog.by_slug.get(slug)
+    if product is None:
+        raise Http404('Product not found')
+    
+    template = get_product_template()
+    if template is None:
+        return JsonResponse({'error': 'File not found', 'file': PRODUCT_PAGE}, status=404)
+    
+    # Rendered once per product, catalog snapshot and version of the page
+    cached = catalog.page_response(('page', product['id'], template), lambda: render_product_page(template, product))
+    return catalog_response(request, cached, catalog.version, content_type='text/html; charset=utf-8')
+
+
+@ensure_csrf_cookie
+@require_http_methods(['GET', 'POST'])
+def cart(request):
+    """
+    The session's cart; POST {"operations": [...]} applies a batch of changes and returns the result.
+    
+    Reading the cart sets the csrftoken cookie; POSTs to the cart and order
+    endpoints send it back in an X-CSRFToken header.
+    """
+    
+    catalog = get_catalog()
+    stored = get_cart(request.session)
+    items = stored
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            operations = data.get('operations') if isinstance(data, dict) else None
+            items = apply_operations(stored, operations, catalog)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data.'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    
+    data, missing = price_cart(items, catalog)
+    if missing:
+        items = {key: quantity for key, quantity in items.items() if int(key) not in missing}
+    if items != stored:
+        save_cart(request.session, items)
+    data['removed'] = missing
+    
+    response = JsonResponse(data)
+    add_never_cache_headers(response)
+    return response
+
+
+@require_POST
+@rate_limit('orders')
+def orders(request):
+    """
+    Place the session's cart as an order, reserving its stock for SHOP_RESERVATION_TTL seconds.
+
+    The new order replaces the session's pending one, so a session holds at most one reservation.
+    """
+    
+    catalog = get_catalog()
+    try:
+        order, short = reserve(get_cart(request.session), catalog, session_key=request.session.session_key)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if order is None:
+        return JsonResponse({'error': 'Not enough stock', 'products': short}, status=409)
+    
+    response = JsonResponse(serialize_order(order, order.lines.all()), status=201)
+    add_never_cache_headers(response)
+    return response
+
+
+@ensure_csrf_cookie
+@require_http_methods(['GET', 'POST'])
+def order(request, reference):
+    """An order and its status; POST {"action": "confirm" | "cancel"} sells or releases its reserved stock."""
+    
+    order = Order.objects.filter(reference=reference).first()
+    if order is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data.'}, status=400)
+        action = data.get('action') if isinstance(data, dict) else None
+        if action == 'confirm':
+            if not confirm_order(order):
+                return JsonResponse({'error': 'The order is not pending or its reservation has expired'}, status=409)
+            # Empty the cart that was checked out, whichever session confirms
+            if order.session_key == request.session.session_key:
+                save_cart(request.session, {})
+            elif order.session_key:
+                clear_stored_cart(order.session_key)
+        elif action == 'cancel':
+            if not cancel_order(order):
+                return JsonResponse({'error': 'The order is not pending'}, status=409)
+        else:
+            return JsonResponse({'error': 'action must be confirm or cancel'}, status=400)
+    
+    response = JsonResponse(serialize_order(order, order.lines.all()))
+    add_never_cache_headers(response)
+    return response
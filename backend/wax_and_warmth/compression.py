@@ -0,0 +1,104 @@
+"""
+Precompressed (gzip/brotli) response variants and Accept-Encoding negotiation.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only gzip variants are produced without it
+    brotli = None
+
+
+# Content codings in order of preference, with the suffix of their sibling file
+VARIANT_SUFFIXES = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+# Codings this process can produce
+AVAILABLE_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+# Text assets worth compressing, and the size below which it is not worth it
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.html', '.svg', '.json', '.txt', '.xml', '.map', '.ico',
+}
+MIN_COMPRESS_SIZE = 256
+
+
+def is_compressible(path):
+    """Return True if files with this name get precompressed variants."""
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress(data, encoding):
+    """Compress bytes with the given content coding at maximum level."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+def compress_variants(data):
+    """Return {encoding: compressed bytes} for each variant smaller than data."""
+    variants = {}
+    if len(data) < MIN_COMPRESS_SIZE:
+        return variants
+    for encoding in AVAILABLE_ENCODINGS:
+        compressed = compress(data, encoding)
+        if len(compressed) < len(data):
+            variants[encoding] = compressed
+    return variants
+
+
+def accepted_encodings(header):
+    """
+    Return (accepted, refused): the content codings an Accept-Encoding header
+    allows, and those it explicitly refuses with q=0.
+    """
+    accepted = set()
+    refused = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+        else:
+            refused.add(coding)
+    return accepted - refused, refused
+
+
+def negotiate_encoding(request, available):
+    """Pick the preferred coding in available that the request accepts, or None."""
+    if not available:
+        return None
+    accepted, refused = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    for encoding in VARIANT_SUFFIXES:
+        if encoding not in available or encoding in refused:
+            continue
+        # "*" covers every coding not listed explicitly
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def find_file_variants(file_path):
+    """Return {encoding: path} for precompressed siblings of file_path on disk."""
+    if not is_compressible(file_path):
+        return {}
+    return {
+        encoding: file_path + suffix
+        for encoding, suffix in VARIANT_SUFFIXES.items()
+        if os.path.isfile(file_path + suffix)
+    }
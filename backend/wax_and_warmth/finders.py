@@ -0,0 +1,63 @@
+"""
+Static files finder limited to the site's own assets.
+
+The site's CSS, JavaScript and media live in the repository root next to the
+backend directory, so pointing STATICFILES_DIRS at the root would also collect
+(and publish under /static/) the database, settings, spool and profiles.
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.utils import get_files
+from django.core.files.storage import FileSystemStorage
+
+from newsletter.pages import ASSET_EXTENSIONS
+
+
+def is_asset_name(name):
+    return os.path.splitext(name)[1].lower() in ASSET_EXTENSIONS
+
+
+class SiteAssetFinder(BaseFinder):
+    """
+    Finds asset files (by extension) at the top of STATIC_SITE_DIR and inside
+    the STATIC_SITE_ASSET_DIRS subdirectories; nothing else is collectable.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.location = str(settings.STATIC_SITE_DIR)
+        self.asset_dirs = tuple(settings.STATIC_SITE_ASSET_DIRS)
+        self.storage = FileSystemStorage(location=self.location)
+
+    def is_collectable(self, path):
+        path = os.path.normpath(path).replace(os.sep, '/')
+        if path.startswith('../') or not is_asset_name(path):
+            return False
+        top, sep, _ = path.partition('/')
+        return not sep or top in self.asset_dirs
+
+    def find(self, path, find_all=False, **kwargs):
+        find_all = self._check_deprecated_find_param(find_all=find_all, **kwargs)
+        matches = []
+        if self.is_collectable(path):
+            absolute_path = os.path.join(self.location, path)
+            if os.path.isfile(absolute_path):
+                if not find_all:
+                    return absolute_path
+                matches.append(absolute_path)
+        return matches
+
+    def list(self, ignore_patterns):
+        _, files = self.storage.listdir('')
+        for name in files:
+            if self.is_collectable(name):
+                yield name, self.storage
+        for directory in self.asset_dirs:
+            if not os.path.isdir(os.path.join(self.location, directory)):
+                continue
+            for path in get_files(self.storage, ignore_patterns, directory):
+                if is_asset_name(path):
+                    yield path, self.storage
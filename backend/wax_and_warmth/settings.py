@@ -42,15 +42,18 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'corsheaders',
     'newsletter',
+    'shop',
 ]
 
 MIDDLEWARE = [
+    'newsletter.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'newsletter.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +89,35 @@ DATABASES = {
     }
 }
 
+# DJANGO_DB_PROFILE=production tunes SQLite for concurrent traffic: WAL journal,
+# pragmas applied to every new connection (newsletter.db.apply_sqlite_pragmas),
+# persistent connections, BEGIN IMMEDIATE transactions and an in-process write
+# lock around write paths (newsletter.db.serialized_write).
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'default')
+
+SQLITE_PRAGMAS = {}
+SQLITE_WRITE_LOCK = False
+
+if DB_PROFILE == 'production':
+    # Applied in order; busy_timeout first so switching to WAL waits for locks
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,  # milliseconds
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,  # KiB
+        'mmap_size': 268435456,  # bytes
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_WRITE_LOCK = True
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -122,12 +154,129 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = BASE_DIR / 'staticfiles_build' / 'static'
-
-STATICFILES_DIRS = [
-    BASE_DIR.parent,  # This points to the main project directory with CSS, JS, images
+# Collected outside the source tree so collectstatic never walks its own output
+STATIC_ROOT = Path(os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR.parent.parent / 'wax_and_warmth_static'))
+
+# Only the site's assets are collectable: files with an asset extension at the
+# top of the site directory and in the asset subdirectories, never backend/
+STATIC_SITE_DIR = BASE_DIR.parent
+STATIC_SITE_ASSET_DIRS = ['images', 'products', 'testi', 'vids', 'derived']
+STATICFILES_FINDERS = [
+    'wax_and_warmth.finders.SiteAssetFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
 ]
 
+# Compiled HTML page templates are cached per process and recompiled when the
+# file's mtime/size changes. Frozen mode skips that check entirely (production).
+# The page cache renders each page once and only splices in the CSRF token.
+HTML_TEMPLATE_CACHE_ENABLED = True
+HTML_PAGE_CACHE_ENABLED = True
+HTML_TEMPLATE_CACHE_FROZEN = os.environ.get('DJANGO_TEMPLATE_CACHE_FROZEN', 'False') == 'True'
+
+# collectstatic copies assets under content-hashed names and writes a manifest
+# used to rewrite asset references in the HTML pages (see wax_and_warmth.storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'wax_and_warmth.storage.HashedManifestStorage',
+    },
+}
+
+# Spooled signups are fsync'd to an append-only log and acknowledged at once;
+# a background thread flushes them into the database in batches.
+NEWSLETTER_SPOOL_ENABLED = os.environ.get('DJANGO_NEWSLETTER_SPOOL', 'False') == 'True'
+NEWSLETTER_SPOOL_DIR = BASE_DIR / 'spool'
+NEWSLETTER_SPOOL_FLUSH_INTERVAL = 2.0  # seconds
+
+# Route the pages, subscribe API and stats to native async views (for ASGI
+# deployments; under WSGI the sync views avoid an event loop per request)
+NEWSLETTER_ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', 'False') == 'True'
+
+# Token-bucket rate limits per view scope, keyed by client IP and/or the
+# submitted email. Rates are "<tokens>/<s|m|h|d>"; burst is the bucket size.
+# The 'memory' store is per process; 'cache' shares buckets through CACHES.
+NEWSLETTER_RATE_LIMIT_ENABLED = os.environ.get('DJANGO_RATE_LIMIT', 'True') == 'True'
+NEWSLETTER_RATE_LIMIT_STORE = os.environ.get('DJANGO_RATE_LIMIT_STORE', 'memory')
+# Reverse proxies in front of the site that append to X-Forwarded-For (e.g. 1
+# behind nginx or Vercel). The client IP is taken that many entries from the
+# right of the header; with 0 it is REMOTE_ADDR and the header is ignored.
+NEWSLETTER_TRUSTED_PROXY_COUNT = int(os.environ.get('DJANGO_TRUSTED_PROXY_COUNT', '0'))
+NEWSLETTER_RATE_LIMITS = {
+    'subscribe': [
+        {'key': 'ip', 'rate': '10/m', 'burst': 10},
+        {'key': 'email', 'rate': '5/h', 'burst': 3},
+    ],
+    'subscribe_api': [
+        {'key': 'ip', 'rate': '10/m', 'burst': 10},
+        {'key': 'email', 'rate': '5/h', 'burst': 3},
+    ],
+    'unsubscribe': [
+        {'key': 'ip', 'rate': '10/m', 'burst': 10},
+    ],
+    # Placing shop orders, which reserves stock
+    'orders': [
+        {'key': 'ip', 'rate': '5/m', 'burst': 5},
+    ],
+}
+
+# Signups check a per-process Bloom filter of subscribed emails before
+# writing, so repeat signups are answered with a read instead of a failed INSERT.
+NEWSLETTER_DUPLICATE_FILTER_ENABLED = True
+NEWSLETTER_DUPLICATE_FILTER_ERROR_RATE = 0.01
+
+# Signup analytics responses are cached server-side and by the browser
+NEWSLETTER_ANALYTICS_CACHE_TIMEOUT = 60  # seconds
+
+# The subscriptions changelist takes its counts from the maintained counters
+# instead of COUNT(*) and seeks to deep pages by key instead of OFFSET.
+NEWSLETTER_ADMIN_ESTIMATED_COUNTS = True
+NEWSLETTER_ADMIN_KEYSET_PAGINATION = True
+
+# Admin search uses the SQLite FTS5 trigram index over email and IP address
+# (terms of 3+ characters) instead of LIKE '%term%' scans; bare domains, which
+# match too many rows for the index to pay off, still scan.
+NEWSLETTER_ADMIN_FTS_SEARCH = True
+
+# Per-view latency histograms, query counts/time, page render time and
+# response sizes, served in Prometheus format at /newsletter-metrics/ to staff
+# or to requests with "Authorization: Bearer <NEWSLETTER_METRICS_TOKEN>".
+# Server-Timing headers expose the same timings to staff (to everyone with DEBUG).
+NEWSLETTER_METRICS_ENABLED = os.environ.get('DJANGO_METRICS', 'True') == 'True'
+NEWSLETTER_SERVER_TIMING = os.environ.get('DJANGO_SERVER_TIMING', 'True') == 'True'
+NEWSLETTER_METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+# Staff can profile a request with ?profile=1 (top functions as text) or
+# ?profile=save (a pstats file in NEWSLETTER_PROFILE_DIR, newest kept)
+NEWSLETTER_PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', 'True') == 'True'
+NEWSLETTER_PROFILE_DIR = BASE_DIR / 'profiles'
+NEWSLETTER_PROFILE_RETENTION = 20
+
+# The product API serves an in-memory catalog snapshot per process, dropped
+# on every product write; other processes re-check for changes at most this
+# often (seconds; None never re-checks, 0 checks on every request).
+SHOP_CATALOG_RECHECK_INTERVAL = 1.0
+SHOP_CATALOG_MAX_AGE = 60  # seconds browsers/CDNs may reuse a response
+
+# Product search and autocomplete use the SQLite FTS5 index, ranked by BM25,
+# instead of scanning the catalog snapshot.
+SHOP_SEARCH_FTS = True
+
+# Placing an order reserves its stock for SHOP_RESERVATION_TTL seconds. A
+# background sweeper in every serving process returns the stock of unconfirmed orders every
+# SHOP_RESERVATION_SWEEP_INTERVAL seconds (None disables it; run
+# `manage.py release_expired_reservations` instead), this many orders per
+# transaction.
+SHOP_RESERVATION_TTL = 15 * 60
+SHOP_RESERVATION_SWEEP_INTERVAL = 30.0
+SHOP_RESERVATION_SWEEP_BATCH = 500
+
+# Resized WebP/JPEG derivatives written by `manage.py generate_image_derivatives`
+IMAGE_DERIVATIVE_SOURCES = ['images', 'products', 'testi']
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+IMAGE_DERIVATIVES_DIR = BASE_DIR.parent / 'derived'
+
 # Media files for user uploads (if any)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -0,0 +1,140 @@
+"""
+Streaming file responses with conditional GET and byte-range support.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .compression import find_file_variants, negotiate_encoding
+
+
+# Bytes read per iteration when streaming part of a file
+CHUNK_SIZE = 64 * 1024
+
+# Cache-Control for content-hashed files, whose content never changes
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    """Build a validator from a file's mtime and size."""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (missing, malformed or
+    multi-range) and False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(file_path, start, length):
+    """Yield length bytes of a file starting at offset start."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _set_common_headers(response, etag, last_modified, cache_control, variants=None, encoding=None):
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    response['Access-Control-Allow-Origin'] = '*'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if variants:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def serve_file(request, file_path, cache_control='no-cache', content_type=None):
+    """
+    Serve a file without loading it into memory.
+
+    Picks a precompressed .br/.gz sibling when the client accepts it, answers
+    304 for matching If-None-Match/If-Modified-Since, 206 for a satisfiable
+    single byte range and 416 for an unsatisfiable one; anything else streams
+    the whole file through FileResponse (sendfile-friendly).
+    """
+    if not content_type:
+        content_type, _ = mimetypes.guess_type(file_path)
+        content_type = content_type or 'application/octet-stream'
+
+    # Byte ranges always refer to the identity (uncompressed) representation
+    variants = find_file_variants(file_path)
+    encoding = None
+    if variants and 'Range' not in request.headers:
+        encoding = negotiate_encoding(request, variants)
+    if encoding:
+        file_path = variants[encoding]
+    headers = {'variants': variants, 'encoding': encoding}
+
+    stat = os.stat(file_path)
+    etag = file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        return _set_common_headers(conditional, etag, last_modified, cache_control, **headers)
+
+    # Only honor Range when If-Range (if any) still matches this version
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if request.method == 'GET' and (not if_range or if_range in (etag, last_modified)):
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _set_common_headers(response, etag, last_modified, cache_control, **headers)
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_file_range(file_path, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(length)
+        return _set_common_headers(response, etag, last_modified, cache_control, **headers)
+
+    response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    # FileResponse names the download after the open file; assets are not downloads
+    del response['Content-Disposition']
+    return _set_common_headers(response, etag, last_modified, cache_control, **headers)
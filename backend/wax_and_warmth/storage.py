@@ -0,0 +1,84 @@
+"""
+Static files storage producing content-hashed names and a manifest on collectstatic.
+"""
+
+import glob
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.management.base import CommandError
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashedManifestStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also verifies the root HTML pages.
+
+    After hashing, every local asset referenced from a root HTML page must be
+    present in the manifest, otherwise collectstatic (and the build) fails.
+    References in CSS to files that do not exist are left untouched instead
+    of aborting the build, and names missing from the manifest (e.g. before
+    collectstatic has run) resolve to their unhashed URL.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def lenient_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError as e:
+                logger.warning(f"Leaving unresolved reference in {name}: {e}")
+                return matchobj['matched']
+
+        return lenient_converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        missing = find_missing_page_assets(self.hashed_files)
+        if missing:
+            details = ', '.join(f'{page}: {name}' for page, name in missing)
+            yield 'HTML pages', None, CommandError(
+                f"HTML pages reference assets missing from the manifest: {details}"
+            )
+
+
+def find_missing_page_assets(manifest):
+    """Return (page, asset) pairs for root HTML page assets absent from manifest."""
+    from newsletter.pages import SITE_DIR, iter_asset_references
+
+    missing = []
+    for page_path in sorted(glob.glob(os.path.join(SITE_DIR, '*.html'))):
+        with open(page_path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        page = os.path.basename(page_path)
+        for name in iter_asset_references(html):
+            if name not in manifest:
+                missing.append((page, name))
+    return missing
+
+
+_hashed_names = None
+
+
+def is_hashed_name(path):
+    """Return True if path is a content-hashed name from the static manifest."""
+    global _hashed_names
+    if _hashed_names is None:
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        _hashed_names = frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    return path in _hashed_names
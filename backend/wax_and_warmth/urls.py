@@ -15,13 +15,18 @@ Including another URLconf.
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls')).
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.static import serve
-from django.http import HttpResponse, Http404
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.utils._os import safe_join
 import os
-import mimetypes
+
+from .finders import is_asset_name
+from .static_files import IMMUTABLE_CACHE_CONTROL, serve_file
+from .storage import is_hashed_name
 
 def serve_static_with_headers(request, path):
     """Serve static files with proper headers."""
@@ -31,26 +36,28 @@ def serve_static_with_headers(request, path):
     if not os.path.exists(file_path) or not os.path.isfile(file_path):
         raise Http404("File not found")
     
-    # Get MIME type
-    content_type, _ = mimetypes.guess_type(file_path)
-    if not content_type:
-        content_type = 'application/octet-stream'
-    
-    # Read file content
-    with open(file_path, 'rb') as f:
-        content = f.read()
+    # Stream the file, revalidating with ETag/Last-Modified on every use
+    return serve_file(request, file_path, cache_control='no-cache')
+
+def serve_collected_static(request, path):
+    """Serve assets collected into STATIC_ROOT; content-hashed names never expire."""
+    if not is_asset_name(path):
+        raise Http404("File not found")
+    try:
+        file_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
     
-    # Create response with proper headers
-    response = HttpResponse(content, content_type=content_type)
-    response['Access-Control-Allow-Origin'] = '*'
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
+    if not os.path.isfile(file_path):
+        raise Http404("File not found")
     
-    return response
+    cache_control = IMMUTABLE_CACHE_CONTROL if is_hashed_name(path) else 'no-cache'
+    return serve_file(request, file_path, cache_control=cache_control)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    re_path(r'^static/(?P<path>.+)$', serve_collected_static),
+    path('', include('shop.urls')),
     path('', include('newsletter.urls')),  # Include newsletter URLs at root level
 ]
 
@@ -70,4 +77,6 @@ if settings.DEBUG:
                 lambda request, path: serve_static_with_headers(request, f'testi/{path}')),
         re_path(r'^vids/(?P<path>.*)$', 
                 lambda request, path: serve_static_with_headers(request, f'vids/{path}')),
+        re_path(r'^derived/(?P<path>.*)$', 
+                lambda request, path: serve_static_with_headers(request, f'derived/{path}')),
     ]
\ No newline at end of file
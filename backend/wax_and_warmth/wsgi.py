@@ -13,4 +13,14 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wax_and_warmth.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Load the signup duplicate filter and start the signup spool flusher and the
+# stock reservation sweeper in the background before traffic arrives
+from newsletter.dedup import warm_email_filter  # noqa: E402
+from newsletter.spool import start_spool_flusher  # noqa: E402
+from shop.reservations import start_sweeper  # noqa: E402
+
+warm_email_filter()
+start_spool_flusher()
+start_sweeper()
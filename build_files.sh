@@ -1,11 +1,16 @@
 #!/bin/bash
 
 # Build script for Vercel deployment
+set -e
 echo "Building project..."
 
 # Install Python dependencies
 pip install -r backend/requirements.txt
 
-# Collect static files
+# Collect static files under content-hashed names (fails if an HTML page
+# references an asset missing from the manifest)
 cd backend
-python manage.py collectstatic --noinput --clear
\ No newline at end of file
+python manage.py collectstatic --noinput --clear
+
+# Precompress text assets (.gz, plus .br when brotli is installed)
+python manage.py compress_static
\ No newline at end of file
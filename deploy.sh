@@ -14,5 +14,6 @@ python manage.py migrate --noinput
 
 echo "Collecting static files..."
 python manage.py collectstatic --noinput --clear
+python manage.py compress_static
 
 echo "Deployment preparation complete!"
\ No newline at end of file